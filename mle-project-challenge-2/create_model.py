@@ -1,10 +1,19 @@
+import argparse
+import datetime
 import json
 import pathlib
 import pickle
+import resource
+import sys
+import time
+import warnings
 from typing import List
 from typing import Tuple
 
 import pandas
+from sklearn import cluster
+from sklearn import compose
+from sklearn import decomposition
 from sklearn import model_selection
 from sklearn import neighbors
 from sklearn import pipeline
@@ -12,6 +21,10 @@ from sklearn import preprocessing
 from sklearn import metrics
 import numpy as np
 
+# Shared with the API's scoring jobs, which live in src/
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / 'src'))
+from csvfile import count_rows  # noqa: E402
+
 SALES_PATH = "data/kc_house_data.csv"  # path to CSV with home sale data
 DEMOGRAPHICS_PATH = "data/zipcode_demographics.csv"  # path to CSV with demographics
 # List of columns (subset) that will be taken from home sale data
@@ -20,6 +33,25 @@ SALES_COLUMN_SELECTION = [
     'sqft_above', 'sqft_basement', 'zipcode'
 ]
 OUTPUT_DIR = "model"  # Directory where output artifacts will be saved
+CHUNK_ROWS = 20_000  # Sales rows parsed at a time by the chunked loader
+PROFILE_BINS = 10  # Quantile bins per feature in the drift reference profile
+GEO_CELL_KM = 1.0  # Grid cell size of the geospatial candidate index
+FALLBACK_SIZE_BUCKETS = 5  # sqft_living quantile buckets of the fallback table
+# Fewer training sales in a zipcode bucket fall back to the zipcode median
+FALLBACK_MIN_SALES = 5
+KM_PER_DEGREE = 111.195
+# Largest hold-out prediction difference accepted for a float32 artifact
+MAX_RELATIVE_DIFF = 0.05
+# Largest hold-out R2 loss accepted for a condensed neighbor set
+MAX_R2_DROP = 0.02
+LATENCY_QUERIES = 200  # Single-house predictions timed per model
+# Sale attributes stored per training row for neighbor explanations
+NEIGHBOR_ATTRIBUTES = [
+    ('id', np.int64), ('price', np.float64), ('bedrooms', np.float32),
+    ('bathrooms', np.float32), ('sqft_living', np.float32),
+    ('sqft_lot', np.float32), ('floors', np.float32), ('zipcode', np.int32),
+    ('lat', np.float64), ('long', np.float64)
+]
 
 
 def load_data(
@@ -54,6 +86,500 @@ def load_data(
     return x, y
 
 
+def load_data_chunked(
+    sales_path: str, demographics_path: str, sales_column_selection: List[str],
+    chunk_rows: int = CHUNK_ROWS, dtype: str = 'float64',
+    attributes: List[Tuple[str, type]] = (), row_order: np.ndarray = None
+) -> Tuple[pandas.DataFrame, pandas.Series, pandas.DataFrame]:
+    """Load the same features and target as `load_data` with bounded memory.
+
+    The feature matrix is preallocated in `dtype` from a row count, the
+    sales file is parsed `chunk_rows` at a time with only the selected
+    columns (features in `dtype`, zipcodes as int32), and each chunk's
+    demographics are gathered by zipcode from a direct-address table
+    straight into its rows of the matrix. Peak memory is the matrix plus
+    one chunk, instead of the parsed file plus a merged copy.
+
+    Args:
+        sales_path: path to CSV file with home sale data
+        demographics_path: path to CSV file with demographics
+        sales_column_selection: list of columns from sales data to be used as
+            features
+        chunk_rows: sales rows parsed per chunk
+        dtype: floating point type of the feature matrix
+        attributes: (column, type) pairs of further sales columns to collect
+            in the same pass, e.g. the neighbor side table's
+        row_order: file row held by each output row, e.g. the training rows
+            followed by the hold-out rows, so that a split is two slices
+            instead of copies (default: file order)
+
+    Returns:
+        Tuple of a feature DataFrame (backed by the preallocated matrix, with
+        the columns `load_data` produces), the float64 price Series and a
+        DataFrame of the `attributes` columns, all in `row_order`.
+        Sales in zipcodes without demographics get NaN demographics, as in
+        the left join of `load_data`.
+    """
+    demographics = pandas.read_csv(demographics_path)
+    demographic_zipcodes = demographics.pop('zipcode').to_numpy(dtype=np.int64)
+    # One extra all-NaN row for unknown zipcodes
+    demographic_values = np.vstack([
+        demographics.to_numpy(dtype=dtype),
+        np.full((1, demographics.shape[1]), np.nan, dtype=dtype)])
+    base = demographic_zipcodes.min()
+    slots = np.full(demographic_zipcodes.max() - base + 1, len(demographic_zipcodes),
+                    dtype=np.int32)
+    slots[demographic_zipcodes - base] = np.arange(len(demographic_zipcodes),
+                                                   dtype=np.int32)
+
+    # read_csv returns selected columns in file order; keep that order
+    header = pandas.read_csv(sales_path, nrows=0).columns
+    sales_features = [c for c in header
+                      if c in sales_column_selection and c not in ('price', 'zipcode')]
+    n_rows = count_rows(sales_path) if row_order is None else len(row_order)
+    n_sales = len(sales_features)
+    x = np.empty((n_rows, n_sales + demographics.shape[1]), dtype=dtype)
+    y = np.empty(n_rows, dtype=np.float64)
+    collected = {name: np.empty(n_rows, dtype=column_type)
+                 for name, column_type in attributes}
+    # Output row of each file row
+    destination = None
+    if row_order is not None:
+        destination = np.empty(n_rows, dtype=np.int64)
+        destination[row_order] = np.arange(n_rows)
+
+    column_types = dict(attributes)
+    # Features parse in `dtype` unless an attribute needs more precision
+    column_types.update({c: dtype for c in sales_features
+                         if np.dtype(column_types.get(c, dtype)).itemsize <=
+                         np.dtype(dtype).itemsize})
+    column_types.update(price=np.float64, zipcode=np.int32)
+    start = 0
+    for chunk in pandas.read_csv(sales_path,
+                                 usecols=list(dict.fromkeys(
+                                     list(sales_column_selection) + list(collected))),
+                                 dtype=column_types, chunksize=chunk_rows):
+        end = start + len(chunk)
+        rows_out = slice(start, end) if destination is None else destination[start:end]
+        y[rows_out] = chunk['price'].to_numpy()
+        offsets = chunk['zipcode'].to_numpy() - base
+        known = (offsets >= 0) & (offsets < len(slots))
+        rows = np.full(len(offsets), len(demographic_zipcodes), dtype=np.int32)
+        rows[known] = slots[offsets[known]]
+        if destination is None:
+            x[start:end, :n_sales] = chunk[sales_features].to_numpy()
+            np.take(demographic_values, rows, axis=0, out=x[start:end, n_sales:])
+        else:
+            x[rows_out, :n_sales] = chunk[sales_features].to_numpy()
+            x[rows_out, n_sales:] = demographic_values[rows]
+        for name, values in collected.items():
+            values[rows_out] = chunk[name].to_numpy()
+        start = end
+    if start != n_rows:
+        raise ValueError(f"{sales_path}: counted {n_rows} rows but parsed {start}")
+
+    columns = sales_features + list(demographics.columns)
+    return (pandas.DataFrame(x, columns=columns, copy=False),
+            pandas.Series(y, name='price', copy=False),
+            pandas.DataFrame(collected, copy=False))
+
+
+def export_demographics(demographics_path: str,
+                        output_path: pathlib.Path,
+                        dtype: str = 'float64') -> None:
+    """Write the demographics table as a binary file for fast API startup.
+
+    Args:
+        demographics_path: path to CSV file with demographics
+        output_path: destination .npz file; holds `zipcodes`, `columns` and a
+            `values` matrix with one row per zipcode
+        dtype: floating point type of `values`, matching the model artifact
+    """
+    demographics = pandas.read_csv(demographics_path, dtype={'zipcode': str})
+    zipcodes = demographics.pop('zipcode').to_numpy(dtype=str)
+    np.savez(output_path,
+             zipcodes=zipcodes,
+             columns=np.array(demographics.columns, dtype=str),
+             values=demographics.to_numpy(dtype=dtype))
+
+
+def _histogram_profile(values: np.ndarray, n_bins: int) -> dict:
+    """Quantile bin edges of `values` and the share of values in each bin."""
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    edges = np.unique(np.quantile(values, quantiles))
+    counts = np.bincount(np.searchsorted(edges, values, side='right'),
+                         minlength=len(edges) + 1)
+    return {"edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist()}
+
+
+def build_reference_profile(model, x_train: pandas.DataFrame,
+                            x_test: pandas.DataFrame,
+                            zipcodes_train: pandas.Series,
+                            input_features: List[str],
+                            n_bins: int = PROFILE_BINS) -> dict:
+    """Summarise the training distribution for drift monitoring in the API.
+
+    Args:
+        model: trained model, used for the reference prediction distribution
+        x_train: training features
+        x_test: hold-out features, whose predictions form the reference
+            distribution of predicted prices
+        zipcodes_train: zipcode of each training row
+        input_features: request-provided features to profile
+        n_bins: number of quantile bins per feature
+
+    Returns:
+        Dictionary with per-feature and prediction histograms and zipcode
+        frequencies
+    """
+    zipcode_counts = zipcodes_train.value_counts(normalize=True)
+    return {
+        "n_rows": len(x_train),
+        "features": {f: _histogram_profile(x_train[f].to_numpy(dtype=np.float64), n_bins)
+                     for f in input_features},
+        "prediction": _histogram_profile(model.predict(x_test), n_bins),
+        "zipcodes": {str(z): float(p) for z, p in zipcode_counts.items()},
+    }
+
+
+def build_neighbor_table(sales_train: pandas.DataFrame,
+                         members: np.ndarray = None,
+                         prototype_prices: np.ndarray = None) -> np.ndarray:
+    """Compact per-row side table for explaining KNN predictions.
+
+    Args:
+        sales_train: raw sales rows in the same order as the training matrix
+        members: for a condensed neighbor set, the number of sales merged
+            into each row (stored as a `members` field)
+        prototype_prices: for a condensed neighbor set, the mean price the
+            model averages for each row (stored as `prototype_price`; the
+            `price` field keeps the representative sale's own price)
+
+    Returns:
+        Structured array with one record per training row, in the order the
+        KNN index stores them
+    """
+    dtype = NEIGHBOR_ATTRIBUTES + ([('members', np.int32)] if members is not None else []) \
+        + ([('prototype_price', np.float64)] if prototype_prices is not None else [])
+    table = np.empty(len(sales_train), dtype=dtype)
+    for name, _ in NEIGHBOR_ATTRIBUTES:
+        table[name] = sales_train[name].to_numpy()
+    if members is not None:
+        table['members'] = members
+    if prototype_prices is not None:
+        table['prototype_price'] = prototype_prices
+    return table
+
+
+def build_geo_index(lat: np.ndarray, long: np.ndarray,
+                    cell_km: float = GEO_CELL_KM) -> dict:
+    """Grid index of training sales by location for geospatial search.
+
+    Args:
+        lat: latitude of each training row, in training order
+        long: longitude of each training row, in training order
+        cell_km: approximate side of a grid cell in kilometres
+
+    Returns:
+        Dictionary of arrays for the API's GeoIndex: row locations, grid
+        origin, cell size in degrees, grid shape and CSR cell offsets into
+        the training rows sorted by cell
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    long = np.asarray(long, dtype=np.float64)
+    lat_step = cell_km / KM_PER_DEGREE
+    long_step = lat_step / np.cos(np.radians(lat.mean()))
+    origin = np.array([lat.min(), long.min()])
+    cell_i = ((lat - origin[0]) // lat_step).astype(np.int64)
+    cell_j = ((long - origin[1]) // long_step).astype(np.int64)
+    shape = np.array([cell_i.max() + 1, cell_j.max() + 1])
+    cells = cell_i * shape[1] + cell_j
+    counts = np.bincount(cells, minlength=int(shape.prod()))
+    return {
+        "lat": lat,
+        "long": long,
+        "origin": origin,
+        "step": np.array([lat_step, long_step]),
+        "shape": shape,
+        "cell_start": np.concatenate([[0], np.cumsum(counts)]).astype(np.int32),
+        "rows": np.argsort(cells, kind='stable').astype(np.int32),
+    }
+
+
+def build_fallback_table(sales_train: pandas.DataFrame,
+                         n_buckets: int = FALLBACK_SIZE_BUCKETS,
+                         min_sales: int = FALLBACK_MIN_SALES) -> dict:
+    """Median sale price per zipcode and living area bucket, for degraded mode.
+
+    Args:
+        sales_train: raw training sales with price, sqft_living and zipcode
+        n_buckets: number of sqft_living quantile buckets
+        min_sales: buckets with fewer sales use the zipcode's overall median
+
+    Returns:
+        Dictionary of arrays for the API's FallbackTable: sorted zipcodes,
+        bucket edges, the (zipcode + all, bucket) median prices, the median
+        of each zipcode and of all sales, and the sales behind each median
+    """
+    sqft = sales_train['sqft_living'].to_numpy(dtype=np.float64)
+    price = sales_train['price'].to_numpy(dtype=np.float64)
+    edges = np.unique(np.quantile(sqft, np.linspace(0, 1, n_buckets + 1)[1:-1]))
+    buckets = np.searchsorted(edges, sqft, side='right')
+    zipcodes, rows = np.unique(sales_train['zipcode'].to_numpy(dtype=np.int64),
+                               return_inverse=True)
+    frame = pandas.DataFrame({'row': rows, 'bucket': buckets, 'price': price})
+    cells = frame.groupby(['row', 'bucket'])['price'].agg(['median', 'size'])
+    zipcode_prices = np.append(frame.groupby('row')['price'].median().to_numpy(),
+                               np.median(price))
+    counts = np.zeros((len(zipcodes), len(edges) + 1), dtype=np.int32)
+    medians = np.full((len(zipcodes), len(edges) + 1), np.nan)
+    index = cells.index.to_frame().to_numpy().T
+    counts[tuple(index)] = cells['size'].to_numpy()
+    medians[tuple(index)] = cells['median'].to_numpy()
+    sparse = counts < min_sales
+    medians[sparse] = np.broadcast_to(zipcode_prices[:-1, None], medians.shape)[sparse]
+    overall = frame.groupby('bucket')['price'].median().reindex(
+        range(len(edges) + 1)).fillna(np.median(price)).to_numpy()
+    return {
+        "zipcodes": zipcodes,
+        "edges": edges,
+        "prices": np.vstack([medians, overall]),
+        "zipcode_prices": zipcode_prices,
+        "counts": counts,
+    }
+
+
+def evaluate_fallback(table: dict, sales_test: pandas.DataFrame) -> dict:
+    """Hold-out error of the fallback table's prices, to compare with the model."""
+    zipcodes = sales_test['zipcode'].to_numpy(dtype=np.int64)
+    rows = np.searchsorted(table['zipcodes'], zipcodes)
+    rows[rows == len(table['zipcodes'])] = 0
+    rows[table['zipcodes'][rows] != zipcodes] = len(table['zipcodes'])
+    buckets = np.searchsorted(table['edges'], sales_test['sqft_living'].to_numpy(),
+                              side='right')
+    predicted = table['prices'][rows, buckets]
+    actual = sales_test['price'].to_numpy(dtype=np.float64)
+    return {
+        "test_r2_score": float(metrics.r2_score(actual, predicted)),
+        "mean_absolute_error": float(metrics.mean_absolute_error(actual, predicted)),
+    }
+
+
+def build_preprocessor(columns: List[str], demographic_columns: List[str],
+                       components: int = 0):
+    """Unfitted input stage of the model pipeline.
+
+    Args:
+        columns: feature columns in training order
+        demographic_columns: the columns that come from the demographics table
+        components: principal components kept of the scaled demographics;
+            0 scales every feature and projects nothing
+
+    Returns:
+        A RobustScaler, or a ColumnTransformer that scales the house
+        columns and reduces the scaled demographics columns to `components`
+        principal components (by position, so the fitted pipeline accepts
+        arrays as well as DataFrames)
+    """
+    if not components:
+        return preprocessing.RobustScaler()
+    house = [i for i, c in enumerate(columns) if c not in demographic_columns]
+    demographics = [i for i, c in enumerate(columns) if c in demographic_columns]
+    return compose.ColumnTransformer([
+        ('house', preprocessing.RobustScaler(), house),
+        ('demographics', pipeline.make_pipeline(
+            preprocessing.RobustScaler(),
+            decomposition.PCA(components, svd_solver='full')), demographics),
+    ])
+
+
+def fit_model(x_train: pandas.DataFrame, y_train: pandas.Series,
+              dtype: str = 'float64', preprocessor=None):
+    """Fit the scaler + KNN pipeline with features held in `dtype`.
+
+    `preprocessor` replaces the scaler, e.g. with the demographics
+    projection of `build_preprocessor`.
+    """
+    if preprocessor is None:
+        preprocessor = preprocessing.RobustScaler()
+    return pipeline.make_pipeline(preprocessor,
+                                  neighbors.KNeighborsRegressor()).fit(
+                                      x_train.astype(dtype), y_train)
+
+
+def condense_training_set(x_train: pandas.DataFrame, y_train: pandas.Series,
+                          sales_train: pandas.DataFrame, factor: float, scaler,
+                          random_state: int = 42):
+    """Merge similar training sales into prototypes, `factor` sales per prototype.
+
+    Sales are clustered per zipcode with k-means in the scaled feature space
+    (demographics are constant within a zipcode, so clusters differ in house
+    features only). Each cluster becomes one prototype with the mean
+    features and mean price of its sales, and the sale nearest its centre
+    represents it in the side table and geo index.
+
+    Args:
+        x_train: training features
+        y_train: training prices
+        sales_train: raw training sales (zipcode, id, location...)
+        factor: average number of sales merged into one prototype
+        scaler: fitted input stage of the model pipeline (scaler or
+            demographics projection; both are affine)
+
+    Returns:
+        Tuple of prototype features, prototype prices, the representative
+        sale of each prototype and the number of sales it merges
+    """
+    scaled = np.asarray(scaler.transform(x_train), dtype=np.float64)
+    zipcodes = sales_train['zipcode'].to_numpy()
+    cluster_ids = np.empty(len(x_train), dtype=np.int64)
+    n_clusters = 0
+    for zipcode in np.unique(zipcodes):
+        rows = np.flatnonzero(zipcodes == zipcode)
+        k = max(1, int(round(len(rows) / factor)))
+        labels = cluster.KMeans(k, n_init=1, random_state=random_state).fit_predict(
+            scaled[rows]) if k < len(rows) else np.arange(len(rows))
+        # Renumber so empty clusters leave no gaps
+        _, labels = np.unique(labels, return_inverse=True)
+        cluster_ids[rows] = n_clusters + labels
+        n_clusters += labels.max() + 1
+
+    x_proto = x_train.astype(np.float64).groupby(cluster_ids).mean()
+    y_proto = y_train.groupby(cluster_ids).mean()
+    members = np.bincount(cluster_ids)
+    # Representative: the sale closest to its cluster centre (scaling is affine)
+    centres = np.asarray(scaler.transform(x_proto.astype(x_train.dtypes.iloc[0])),
+                         dtype=np.float64)
+    distance = ((scaled - centres[cluster_ids]) ** 2).sum(axis=1)
+    order = np.lexsort((distance, cluster_ids))
+    first = order[np.searchsorted(cluster_ids[order], np.arange(n_clusters))]
+    representatives = sales_train.iloc[first].reset_index(drop=True)
+    return (x_proto.reset_index(drop=True), y_proto.reset_index(drop=True),
+            representatives, members)
+
+
+def fit_condensed_model(x_train: pandas.DataFrame, y_train: pandas.Series,
+                        sales_train: pandas.DataFrame, factor: float,
+                        dtype: str = 'float64', preprocessor=None):
+    """Fit the scaler + KNN pipeline with KNN over a condensed neighbor set.
+
+    The scaler (or `preprocessor`) is fitted on all training rows, as in
+    the full model, and the KNN regressor on the prototypes of
+    `condense_training_set`.
+
+    Returns:
+        Tuple of the fitted pipeline, the representative sales of the
+        neighbor set, the number of sales each prototype merges and each
+        prototype's price
+    """
+    if preprocessor is None:
+        preprocessor = preprocessing.RobustScaler()
+    scaler = preprocessor.fit(x_train.astype(dtype))
+    x_proto, y_proto, representatives, members = condense_training_set(
+        x_train, y_train, sales_train, factor, scaler)
+    knn = neighbors.KNeighborsRegressor().fit(
+        scaler.transform(x_proto.astype(dtype)), y_proto)
+    return (pipeline.make_pipeline(scaler, knn), representatives, members,
+            y_proto.to_numpy())
+
+
+def query_latency(model, x_test, queries: int = LATENCY_QUERIES) -> dict:
+    """Median single-house and batch prediction time, as the API calls it."""
+    rows = np.asarray(x_test)
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        model.predict(rows[:1])
+        single = []
+        for i in range(min(queries, len(rows))):
+            started = time.perf_counter()
+            model.predict(rows[i:i + 1])
+            single.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        model.predict(rows)
+        batch = time.perf_counter() - started
+    return {"single_ms_p50": float(np.median(single) * 1000),
+            "batch_rows_per_second": float(len(rows) / batch)}
+
+
+def _model_report(model, x_test: pandas.DataFrame, y_test: pandas.Series) -> dict:
+    """Hold-out accuracy, neighbor set shape, query speed and size of a model."""
+    predictions = model.predict(x_test)
+    return {
+        "neighbor_rows": int(model[-1].n_samples_fit_),
+        "neighbor_dimensions": int(model[-1].n_features_in_),
+        "test_r2_score": float(metrics.r2_score(y_test, predictions)),
+        "mean_absolute_error": float(metrics.mean_absolute_error(y_test, predictions)),
+        **query_latency(model, x_test),
+        "model_bytes": len(pickle.dumps(model)),
+    }
+
+
+def compare_condensed(full_model, model, x_test: pandas.DataFrame,
+                      y_test: pandas.Series, factor: float) -> dict:
+    """Accuracy, query latency and size of a condensed model vs the full one.
+
+    Returns:
+        Dictionary with the requested factor and, for `full` and
+        `condensed`, neighbor rows, hold-out R2 and MAE, single-house and
+        batch prediction speed and pickled size
+    """
+    return {"factor": factor,
+            "full": _model_report(full_model, x_test, y_test),
+            "condensed": _model_report(model, x_test, y_test)}
+
+
+def compare_projection(full_model, model, x_test: pandas.DataFrame,
+                       y_test: pandas.Series) -> dict:
+    """Accuracy and neighbor search cost of a demographics projection.
+
+    The API projects the demographics once per zipcode at load time, so a
+    request pays the scaling of its house fields and the KNN search over
+    the projected dimensions. Speed is therefore measured on the KNN step
+    with inputs transformed beforehand (`knn_single_ms_p50`,
+    `knn_batch_rows_per_second`), besides the whole pipeline.
+
+    Returns:
+        Dictionary with the number of components, the demographics variance
+        they explain and, for `full` and `projected`, the `_model_report`
+        plus KNN-only speed
+    """
+    pca = model[0].named_transformers_['demographics'][-1]
+    report = {"components": int(pca.n_components_),
+              "explained_variance": float(pca.explained_variance_ratio_.sum())}
+    for name, m in (("full", full_model), ("projected", model)):
+        knn = query_latency(m[-1], m[:-1].transform(x_test))
+        report[name] = {**_model_report(m, x_test, y_test),
+                        **{f"knn_{key}": value for key, value in knn.items()}}
+    return report
+
+
+def compare_precision(reference_model, model, x_test: pandas.DataFrame,
+                      dtype: str) -> dict:
+    """Compare hold-out predictions of a reduced precision model with float64.
+
+    Args:
+        reference_model: model fitted on float64 features
+        model: the same model fitted on `dtype` features
+        x_test: float64 hold-out features
+        dtype: floating point type of `model`
+
+    Returns:
+        Dictionary with the maximum and mean relative prediction difference
+        and the number of hold-out rows whose prediction changed
+    """
+    reference = reference_model.predict(x_test)
+    reduced = model.predict(x_test.astype(dtype))
+    relative = np.abs(reduced - reference) / np.maximum(np.abs(reference), 1.0)
+    return {
+        "dtype": dtype,
+        "max_relative_diff": float(relative.max()),
+        "mean_relative_diff": float(relative.mean()),
+        "rows_changed": int(np.count_nonzero(relative)),
+        "rows": len(relative),
+    }
+
+
 def evaluate_model(model, x_train, y_train, x_test, y_test) -> dict:
     """Evaluate the model performance and return metrics.
     
@@ -119,21 +645,164 @@ def evaluate_model(model, x_train, y_train, x_test, y_test) -> dict:
     return evaluation_results
 
 
+def parse_args():
+    """Parse command line options for alternative model variants."""
+    parser = argparse.ArgumentParser(
+        description="Train the house price model and export its artifacts.")
+    parser.add_argument('--extra-features', default='',
+                        help="comma-separated sales columns to add to the "
+                             "base selection, e.g. grade,sqft_living15,view")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help="directory for the model artifacts")
+    parser.add_argument('--version', default=None,
+                        help="artifact version (default: UTC timestamp)")
+    parser.add_argument('--geo-cell-km', type=float, default=GEO_CELL_KM,
+                        help="cell size of the geospatial candidate index")
+    parser.add_argument('--dtype', choices=['float64', 'float32'],
+                        default='float64',
+                        help="floating point type of the stored neighbor "
+                             "matrix, demographics and API query rows")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="sales rows per chunk of the memory-lean loader; "
+                             "0 loads with pandas merge instead")
+    parser.add_argument('--condense', type=float, default=1.0,
+                        help="merge similar training sales of a zipcode into "
+                             "prototypes, this many sales per prototype on "
+                             "average (1 keeps every sale)")
+    parser.add_argument('--demographic-components', type=int, default=0,
+                        help="project the scaled zipcode demographics onto "
+                             "this many principal components (0 keeps every "
+                             "demographics column)")
+    parser.add_argument('--max-r2-drop', type=float, default=MAX_R2_DROP,
+                        help="largest hold-out R2 loss vs the full model "
+                             "accepted for a condensed or projected artifact")
+    parser.add_argument('--max-relative-diff', type=float,
+                        default=MAX_RELATIVE_DIFF,
+                        help="largest relative hold-out prediction difference "
+                             "from float64 accepted for a float32 artifact")
+    return parser.parse_args()
+
+
 def main():
     """Load data, train model, and export artifacts."""
-    x, y = load_data(SALES_PATH, DEMOGRAPHICS_PATH, SALES_COLUMN_SELECTION)
-    x_train, x_test, y_train, y_test = model_selection.train_test_split(
-        x, y, random_state=42)
+    args = parse_args()
+    extra_features = [f.strip() for f in args.extra_features.split(',') if f.strip()]
+    sales_columns = SALES_COLUMN_SELECTION + [
+        f for f in extra_features if f not in SALES_COLUMN_SELECTION]
+    version = args.version or datetime.datetime.now(
+        datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+
+    # Split by row numbers: the chunked loader writes the training rows
+    # first, so x_train and x_test are slices of one matrix, not copies
+    train_rows, test_rows = model_selection.train_test_split(
+        np.arange(count_rows(SALES_PATH)), random_state=42)
+    n_train = len(train_rows)
+    # Features load in float64 even for a --dtype float32 artifact: the
+    # precision check needs a reference fitted on unrounded values, and
+    # fit_model casts its own copy for the reduced precision model
+    if args.chunk_rows:
+        # Identifying columns of each sale collected alongside the features
+        x, y, sales = load_data_chunked(
+            SALES_PATH, DEMOGRAPHICS_PATH, sales_columns, args.chunk_rows, 'float64',
+            NEIGHBOR_ATTRIBUTES, np.concatenate([train_rows, test_rows]))
+    else:
+        x, y = load_data(SALES_PATH, DEMOGRAPHICS_PATH, sales_columns)
+        sales = pandas.read_csv(SALES_PATH,
+                                usecols=[name for name, _ in NEIGHBOR_ATTRIBUTES],
+                                dtype=dict(NEIGHBOR_ATTRIBUTES))
+        order = np.concatenate([train_rows, test_rows])
+        x, y, sales = (frame.iloc[order].reset_index(drop=True)
+                       for frame in (x, y, sales))
+    x_train, x_test = x.iloc[:n_train], x.iloc[n_train:]
+    y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
+    sales_train, sales_test = sales.iloc[:n_train], sales.iloc[n_train:]
+    zipcodes_train = sales_train['zipcode'].astype(str)
+
+    model = fit_model(x_train, y_train)
+
+    # Reduced precision artifacts must predict like the float64 model
+    precision_check = None
+    if args.dtype != 'float64':
+        reference_model = model
+        model = fit_model(x_train, y_train, args.dtype)
+        precision_check = compare_precision(reference_model, model, x_test,
+                                            args.dtype)
+        print(f"\n{args.dtype} vs float64 on hold-out: max relative diff "
+              f"{precision_check['max_relative_diff']:.6f}, "
+              f"{precision_check['rows_changed']} of "
+              f"{precision_check['rows']} predictions changed")
+        if precision_check['max_relative_diff'] > args.max_relative_diff:
+            raise SystemExit(
+                f"{args.dtype} predictions differ from float64 by up to "
+                f"{precision_check['max_relative_diff']:.6f} "
+                f"(limit {args.max_relative_diff}); artifact not written")
+        x_train = x_train.astype(args.dtype)
+        x_test = x_test.astype(args.dtype)
+
+    # Projected and condensed models are both held to the plain model: each
+    # step's R2 loss is measured from it, not from the step before
+    baseline_model = model
 
-    model = pipeline.make_pipeline(preprocessing.RobustScaler(),
-                                   neighbors.KNeighborsRegressor()).fit(
-                                       x_train, y_train)
+    # Demographics projection: the KNN searches over the house features and
+    # a few principal components of the (collinear) demographics columns
+    demographic_columns = list(pandas.read_csv(DEMOGRAPHICS_PATH, nrows=0)
+                               .columns.drop('zipcode'))
+    projection = None
+    if args.demographic_components:
+        if not 0 < args.demographic_components <= len(demographic_columns):
+            raise SystemExit(f"--demographic-components must be between 1 and "
+                             f"{len(demographic_columns)}")
+        model = fit_model(x_train, y_train, args.dtype, build_preprocessor(
+            list(x_train.columns), demographic_columns, args.demographic_components))
+        projection = compare_projection(baseline_model, model, x_test, y_test)
+        full, projected = projection['full'], projection['projected']
+        print(f"\nDemographics projection: {projection['components']} components "
+              f"explain {projection['explained_variance']:.3%} of the scaled "
+              f"demographics; {full['neighbor_dimensions']} -> "
+              f"{projected['neighbor_dimensions']} dimensions")
+        for key in ('test_r2_score', 'mean_absolute_error', 'knn_single_ms_p50',
+                    'knn_batch_rows_per_second', 'model_bytes'):
+            decimals = 4 if key == 'test_r2_score' else 2
+            print(f"  {key:<26} {full[key]:>14,.{decimals}f} -> "
+                  f"{projected[key]:>14,.{decimals}f}")
+        r2_drop = full['test_r2_score'] - projected['test_r2_score']
+        if r2_drop > args.max_r2_drop:
+            raise SystemExit(
+                f"Projected model loses {r2_drop:.4f} hold-out R2 "
+                f"(limit {args.max_r2_drop}); artifact not written")
+
+    # Condensed neighbor set: rows of the KNN index are prototypes, each
+    # represented by one sale in the side table and geo index
+    condensation = None
+    members = None
+    prototype_prices = None
+    neighbor_sales = sales_train
+    if args.condense > 1:
+        model, neighbor_sales, members, prototype_prices = fit_condensed_model(
+            x_train, y_train, sales_train, args.condense, args.dtype,
+            build_preprocessor(list(x_train.columns), demographic_columns,
+                               args.demographic_components))
+        condensation = compare_condensed(baseline_model, model, x_test, y_test,
+                                         args.condense)
+        full, condensed = condensation['full'], condensation['condensed']
+        print(f"\nCondensed neighbor set: {full['neighbor_rows']} -> "
+              f"{condensed['neighbor_rows']} rows")
+        for key in ('test_r2_score', 'mean_absolute_error', 'single_ms_p50',
+                    'batch_rows_per_second', 'model_bytes'):
+            decimals = 4 if key == 'test_r2_score' else 2
+            print(f"  {key:<24} {full[key]:>14,.{decimals}f} -> "
+                  f"{condensed[key]:>14,.{decimals}f}")
+        r2_drop = full['test_r2_score'] - condensed['test_r2_score']
+        if r2_drop > args.max_r2_drop:
+            raise SystemExit(
+                f"Condensed model loses {r2_drop:.4f} hold-out R2 "
+                f"(limit {args.max_r2_drop}); artifact not written")
 
     # Evaluate the model performance
     evaluation_results = evaluate_model(model, x_train, y_train, x_test, y_test)
 
-    output_dir = pathlib.Path(OUTPUT_DIR)
-    output_dir.mkdir(exist_ok=True)
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     # Output model artifacts: pickled model and JSON list of features
     pickle.dump(model, open(output_dir / "model.pkl", 'wb'))
@@ -145,6 +814,47 @@ def main():
               open(output_dir / "model_evaluation.json", 'w'), 
               indent=2)
 
+    # Zipcode x size median prices for the API's latency-budget fallback
+    fallback_table = build_fallback_table(sales_train)
+    np.savez(output_dir / "fallback_prices.npz", **fallback_table)
+    fallback_check = evaluate_fallback(fallback_table, sales_test)
+    print(f"Fallback table on hold-out: R2 {fallback_check['test_r2_score']:.4f}, "
+          f"MAE ${fallback_check['mean_absolute_error']:,.2f}")
+
+    # Version and provenance, read by the API's model registry
+    json.dump({
+        "version": version,
+        "sales_columns": sales_columns,
+        "trained_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "test_r2_score": evaluation_results["test_r2_score"],
+        # Floating point type the API uses for query rows and demographics
+        "dtype": args.dtype,
+        "precision_check": precision_check,
+        "fallback_check": fallback_check,
+        "condensation": condensation,
+        "demographic_projection": projection,
+    }, open(output_dir / "model_metadata.json", 'w'), indent=2)
+
+    # Training distribution for the API's drift monitor
+    input_features = [c for c in sales_columns if c not in ('price', 'zipcode')]
+    json.dump(build_reference_profile(model, x_train, x_test, zipcodes_train,
+                                      input_features),
+              open(output_dir / "reference_profile.json", 'w'))
+
+    # Neighbor side table, memory-mapped by the API for /explain
+    np.save(output_dir / "neighbors.npy",
+            build_neighbor_table(neighbor_sales, members, prototype_prices))
+
+    # Lat/long grid over the training rows for the API's geospatial mode
+    np.savez(output_dir / "geo_index.npz",
+             **build_geo_index(neighbor_sales['lat'], neighbor_sales['long'],
+                               args.geo_cell_km))
+
+    # Prebuilt demographics table for the API's fast-startup mode
+    export_demographics(DEMOGRAPHICS_PATH, output_dir / "demographics.npz",
+                        args.dtype)
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
 
 if __name__ == "__main__":
     main()
@@ -1,78 +1,711 @@
 """
 Production REST API for Sound Realty House Price Prediction
 """
+import time
+_process_started = time.perf_counter()
+
 import json
-import pickle
-import pandas as pd
-from flask import Flask, request, jsonify
+import warnings
+import shutil
+import socket
+import tempfile
+import threading
+import numpy as np
+from flask import Flask, Response, request, jsonify, g, send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-from flasgger import Swagger
+
+from csvfile import read_header
+from fast_startup import PhaseTimer, LazySwagger
+from jobs import JobRunner, JobStore, STATES, write_records
+from memory import (TraceRunning, collect_arrays, memory_report, rss_bytes, summary_line,
+                    trace_allocations)
+from capacity import CapacityLimiter, available_cpus
+from capture import TrafficCapture
+from prediction_cache import PredictionCache
+from prescore import Rescorer
+from registry import ModelRegistry, parse_registry_spec
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from shadow import ShadowScorer, TrafficSplit, parse_weights
+from singleflight import SingleFlight
+from warmup import Warmup
+from profiling import RequestProfiler, parse_networks
+from tracing import Tracer
+from uds import BinaryPredictionService, UnixSocketServer
+from validation import ValidationError, validate_location
+
+# Models to serve as "name=dir,name=dir" (dirs relative to the project root);
+# the first is the default. Requests pick a model by path or header.
+MODEL_REGISTRY = os.environ.get('MODEL_REGISTRY', 'default=model')
+MODEL_HEADER = 'X-Model-Name'
+
+# SHADOW_MODEL re-scores SHADOW_SAMPLE_RATE of requests in the background;
+# AB_SPLIT ("name=weight,...") routes requests that do not pick a model.
+# X-Split-Key makes the A/B assignment sticky.
+SHADOW_MODEL = os.environ.get('SHADOW_MODEL', '')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_MAX_WORKERS = int(os.environ.get('SHADOW_MAX_WORKERS', '1'))
+SHADOW_MAX_PENDING = int(os.environ.get('SHADOW_MAX_PENDING', '64'))
+AB_SPLIT = os.environ.get('AB_SPLIT', '')
+SPLIT_KEY_HEADER = 'X-Split-Key'
+
+# Drift monitoring against model/reference_profile.json; scores are
+# recomputed every DRIFT_INTERVAL_SECONDS and counts decay by DRIFT_DECAY
+DRIFT_ENABLED = os.environ.get('DRIFT_ENABLED', '1') == '1'
+DRIFT_INTERVAL_SECONDS = float(os.environ.get('DRIFT_INTERVAL_SECONDS', '60'))
+DRIFT_DECAY = float(os.environ.get('DRIFT_DECAY', '1'))
+
+# FAST_STARTUP=1 loads demographics from model/demographics.npz and defers
+# flasgger until /apidocs is first requested
+FAST_STARTUP = os.environ.get('FAST_STARTUP', '0') == '1'
+
+# Warmup runs synthetic predictions before /ready reports ready
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '1') == '1'
+WARMUP_MAX_ROUNDS = int(os.environ.get('WARMUP_MAX_ROUNDS', '200'))
+WARMUP_WINDOW = int(os.environ.get('WARMUP_WINDOW', '20'))
+WARMUP_TOLERANCE = float(os.environ.get('WARMUP_TOLERANCE', '0.1'))
+WARMUP_BATCH_SIZE = int(os.environ.get('WARMUP_BATCH_SIZE', '64'))
+
+# Sampling profiler: PROFILE_SAMPLE_RATE of requests, plus any request carrying
+# the debug header from PROFILE_TRUSTED_NETWORKS (comma-separated CIDRs)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '1'))
+PROFILE_TRUSTED_NETWORKS = parse_networks(os.environ.get('PROFILE_TRUSTED_NETWORKS', ''))
+PROFILE_HEADER = 'X-Debug-Profile'
+
+# Every /admin/* endpoint answers only callers from PROFILE_TRUSTED_NETWORKS.
+# Behind PROXY_FIX_HOPS reverse proxies (nginx: 1) the caller is taken from
+# X-Forwarded-For; leave 0 where clients can reach the API directly, or they
+# could claim any address
+PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', '0'))
+
+# Request traces are logged as JSON lines; errors and other 5xx responses are
+# always logged, capped at TRACE_ERROR_LOGS_PER_SEC, and SERVER_TIMING=1 adds
+# a Server-Timing header
+TRACE_LOG_SAMPLE_RATE = float(os.environ.get('TRACE_LOG_SAMPLE_RATE', '1'))
+TRACE_ERROR_LOGS_PER_SEC = float(os.environ.get('TRACE_ERROR_LOGS_PER_SEC', '10'))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+
+# Central coverage of the ?interval=true price interval
+INTERVAL_LEVEL = float(os.environ.get('INTERVAL_LEVEL', '0.8'))
+
+# Default search radius of ?geo=true; fewer than k sales inside it falls
+# back to the global search
+GEO_RADIUS_KM = float(os.environ.get('GEO_RADIUS_KM', '2'))
+
+# Capacity: MAX_CONCURRENT prediction requests run at once, up to MAX_QUEUE
+# more wait (at most QUEUE_TIMEOUT_SECONDS) and the rest get a 503; /ready
+# fails while READY_MAX_QUEUE_DEPTH (default MAX_QUEUE / 2) are waiting.
+# The default is one prediction per CPU of the container, shared between the
+# WEB_WORKERS gunicorn processes
+MAX_CONCURRENT = int(os.environ.get('MAX_CONCURRENT') or max(
+    available_cpus() // int(os.environ.get('WEB_WORKERS', '1')), 1))
+MAX_QUEUE = int(os.environ.get('MAX_QUEUE', '32'))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get('QUEUE_TIMEOUT_SECONDS', '1'))
+READY_MAX_QUEUE_DEPTH = int(os.environ['READY_MAX_QUEUE_DEPTH']) \
+    if os.environ.get('READY_MAX_QUEUE_DEPTH') else None
+
+# Latency budget in milliseconds from the X-Latency-Budget-Ms header (or
+# DEFAULT_LATENCY_BUDGET_MS, 0 for none). A request that cannot get a capacity
+# slot or finish the model call within it gets the model's zipcode x size
+# median price (fallback_prices.npz), flagged "degraded": true
+DEFAULT_LATENCY_BUDGET_MS = float(os.environ.get('DEFAULT_LATENCY_BUDGET_MS', '0'))
+LATENCY_BUDGET_HEADER = 'X-Latency-Budget-Ms'
+
+# Plain single-house predictions cached per replica (0 disables); the
+# X-Prediction-Cache response header reports hit or miss
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+CACHE_HEADER = 'X-Prediction-Cache'
+
+# Concurrent identical plain predictions share one model call
+SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT', '1') == '1'
+
+# Traffic capture for replay.py: CAPTURE_SAMPLE_RATE of prediction requests
+# go to rotating files in CAPTURE_DIR (empty disables), at most CAPTURE_BUFFER
+# waiting for the writer thread, CAPTURE_MAX_FILES of CAPTURE_FILE_MB per process
+CAPTURE_DIR = os.environ.get('CAPTURE_DIR', '')
+CAPTURE_SAMPLE_RATE = float(os.environ.get('CAPTURE_SAMPLE_RATE', '1'))
+CAPTURE_BUFFER = int(os.environ.get('CAPTURE_BUFFER', '1024'))
+CAPTURE_FILE_MB = float(os.environ.get('CAPTURE_FILE_MB', '64'))
+CAPTURE_MAX_FILES = int(os.environ.get('CAPTURE_MAX_FILES', '10'))
+
+# Asynchronous scoring jobs (POST /jobs) stored under JOB_DIR (empty disables),
+# shared by every worker using it. Each worker scores its jobs in JOB_WORKERS
+# background processes (niceness +JOB_NICE), JOB_CHUNK_ROWS rows at a time;
+# at most JOB_MAX_ACTIVE jobs may be queued or running in JOB_DIR, uploads are
+# limited to JOB_MAX_UPLOAD_MB and finished jobs kept JOB_RETENTION_HOURS.
+# Active jobs whose lease (renewed every JOB_LEASE_SECONDS / 3 by their
+# worker and scoring process) ran out are marked failed.
+JOB_DIR = os.environ.get('JOB_DIR', '')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+JOB_NICE = int(os.environ.get('JOB_NICE', '10'))
+JOB_CHUNK_ROWS = int(os.environ.get('JOB_CHUNK_ROWS', '10000'))
+JOB_MAX_ACTIVE = int(os.environ.get('JOB_MAX_ACTIVE', '8'))
+JOB_MAX_UPLOAD_MB = float(os.environ.get('JOB_MAX_UPLOAD_MB', '256'))
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', '24'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+
+# Binary protocol for co-located callers (uds.py) on the Unix domain socket
+# UDS_PATH (empty disables). Under gunicorn the master binds it once and
+# every worker accepts on the inherited socket (UDS_FD).
+UDS_PATH = os.environ.get('UDS_PATH', '')
+
+# Per-component memory report at startup and on GET /admin/memory;
+# ALLOCATION_TRACING=1 lets trusted callers trace prepare_features
+# allocations with tracemalloc (POST /admin/memory/allocations)
+ALLOCATION_TRACING = os.environ.get('ALLOCATION_TRACING', '0') == '1'
+
+# POST /admin/reload reloads the worker that handles it and rewrites
+# RELOAD_SIGNAL_FILE; the other workers poll its mtime every
+# RELOAD_POLL_SECONDS (0 disables) and reload the same models. The default
+# file is per gunicorn master, so it reaches the workers of one replica only
+RELOAD_SIGNAL_FILE = os.environ.get('RELOAD_SIGNAL_FILE') or os.path.join(
+    tempfile.gettempdir(), f'soundrealty-reload-{os.getppid()}.json')
+RELOAD_POLL_SECONDS = float(os.environ.get('RELOAD_POLL_SECONDS', '2'))
+
+PORT = int(os.environ.get('PORT', '5005'))
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+startup_timer = PhaseTimer(_process_started)
+startup_timer.record('imports', time.perf_counter() - _process_started)
+# Interpreter plus libraries, before any model is loaded
+memory_baseline = {"imports": rss_bytes()}
 
 app = Flask(__name__)
-Swagger(app)
+with startup_timer.phase('swagger'):
+    if FAST_STARTUP:
+        app.wsgi_app = LazySwagger(app)
+    else:
+        from flasgger import Swagger
+        Swagger(app)
+if PROXY_FIX_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_HOPS)
 
 # Global variables
-model = None
-model_features = None
-demographics_data = None
+registry = None
+shadow = None
+job_runner = None
+traffic_split = None
+metrics = MetricsRegistry()
+predictions_total = metrics.counter(
+    'predictions_total', 'Predicted houses by model and endpoint')
+ab_assignments_total = metrics.counter(
+    'ab_assignments_total', 'Requests routed by the A/B split, by model')
+warmup = Warmup(max_rounds=WARMUP_MAX_ROUNDS, window=WARMUP_WINDOW,
+                tolerance=WARMUP_TOLERANCE, batch_size=WARMUP_BATCH_SIZE)
+tracer = Tracer(log_sample_rate=TRACE_LOG_SAMPLE_RATE,
+                error_logs_per_sec=TRACE_ERROR_LOGS_PER_SEC,
+                server_timing=SERVER_TIMING)
+profiler = RequestProfiler(sample_rate=PROFILE_SAMPLE_RATE,
+                           interval_ms=PROFILE_INTERVAL_MS,
+                           trusted_networks=PROFILE_TRUSTED_NETWORKS)
+capacity = CapacityLimiter(MAX_CONCURRENT, MAX_QUEUE, QUEUE_TIMEOUT_SECONDS,
+                           READY_MAX_QUEUE_DEPTH)
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE) if PREDICTION_CACHE_SIZE else None
+rescorer = Rescorer()
+prescored_lookups_total = metrics.counter(
+    'prescored_lookups_total', 'Price-by-id lookups by model and result')
+budgeted_requests_total = metrics.counter(
+    'budgeted_requests_total', 'Prediction requests with a latency budget, by model')
+degraded_responses_total = metrics.counter(
+    'degraded_responses_total',
+    'Budgeted requests answered from the fallback table, by model and reason')
+metrics.gauge('requests_in_flight', 'Prediction requests being processed',
+              lambda: capacity.in_flight)
+metrics.gauge('request_queue_depth', 'Prediction requests waiting for capacity',
+              lambda: capacity.queue_depth)
+metrics.counter('requests_shed_total', 'Prediction requests rejected at capacity',
+                lambda: capacity.shed)
+metrics.counter('requests_degraded_total',
+                'Budgeted prediction requests answered from the fallback at capacity',
+                lambda: capacity.degraded)
+if prediction_cache is not None:
+    metrics.counter('prediction_cache_requests_total', 'Prediction cache lookups by result',
+                    lambda: [({"result": "hit"}, prediction_cache.hits),
+                             ({"result": "miss"}, prediction_cache.misses)])
+    metrics.gauge('prediction_cache_entries', 'Cached predictions',
+                  lambda: len(prediction_cache))
+single_flight = SingleFlight() if SINGLE_FLIGHT else None
+if single_flight is not None:
+    metrics.counter('singleflight_calls_total',
+                    'Plain predictions by whether they computed or shared a result',
+                    lambda: [({"role": "leader"}, single_flight.leaders),
+                             ({"role": "follower"}, single_flight.followers)])
+    metrics.gauge('singleflight_collapse_ratio',
+                  'Share of plain predictions served by a concurrent identical one',
+                  lambda: single_flight.collapse_ratio)
+capture = TrafficCapture(CAPTURE_DIR, sample_rate=CAPTURE_SAMPLE_RATE,
+                         max_buffer=CAPTURE_BUFFER,
+                         max_file_bytes=int(CAPTURE_FILE_MB * (1 << 20)),
+                         max_files=CAPTURE_MAX_FILES) if CAPTURE_DIR else None
+if capture is not None:
+    metrics.counter('capture_records_total', 'Captured requests by outcome',
+                    lambda: [({"outcome": "written"}, capture.written),
+                             ({"outcome": "dropped"}, capture.dropped)])
+
+# Endpoints subject to the capacity limiter and the A/B split
+PREDICTION_ENDPOINTS = {'predict_price', 'predict_price_simple', 'predict_price_batch'}
+
+@app.before_request
+def start_trace():
+    g.trace = tracer.start(request.headers.get(REQUEST_ID_HEADER))
+
+@app.after_request
+def finish_trace(response):
+    trace = g.get('trace')
+    if trace is not None:
+        response.headers[REQUEST_ID_HEADER] = trace.request_id
+        if tracer.server_timing:
+            response.headers['Server-Timing'] = trace.server_timing()
+        if g.get('cache_status'):
+            response.headers[CACHE_HEADER] = g.cache_status
+        tracer.finish(trace, request.method, request.path, response.status_code)
+    return response
+
+# Registered before admission so shed requests are captured too
+if capture is not None:
+    @app.before_request
+    def capture_request():
+        if request.endpoint in PREDICTION_ENDPOINTS:
+            capture.maybe_capture(request.method, request.full_path.rstrip('?'),
+                                  request.headers, request.get_data(cache=True))
+
+def at_capacity():
+    return jsonify({"error": "Server at capacity, retry shortly"}), 503, \
+        {'Retry-After': '1'}
+
+def latency_budget():
+    """Latency budget of the request in seconds, or None without one."""
+    value = request.headers.get(LATENCY_BUDGET_HEADER)
+    if value is None:
+        return DEFAULT_LATENCY_BUDGET_MS / 1000 if DEFAULT_LATENCY_BUDGET_MS > 0 else None
+    try:
+        budget_ms = float(value)
+    except ValueError:
+        budget_ms = float('nan')
+    if not budget_ms > 0:
+        raise ValueError(f"{LATENCY_BUDGET_HEADER} must be a positive number")
+    return budget_ms / 1000
+
+@app.before_request
+def admit_request():
+    if request.endpoint not in PREDICTION_ENDPOINTS:
+        return None
+    try:
+        budget = latency_budget()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if budget is None:
+        if not capacity.acquire():
+            return at_capacity()
+    else:
+        g.deadline = time.perf_counter() + budget
+        # Waiting past the budget is pointless; the view answers degraded
+        # when the model has a fallback table, else 503
+        if not capacity.acquire(min(budget, QUEUE_TIMEOUT_SECONDS), fallback=True):
+            g.degraded = 'capacity'
+            return None
+    g.admitted = True
+
+@app.teardown_request
+def release_capacity(exc):
+    if g.get('admitted'):
+        capacity.release()
+    elif g.get('degraded') == 'capacity':
+        # Shed unless the view answered from the fallback table
+        capacity.turned_away(degraded=g.get('answered_degraded', False))
+
+def internal_error(exc):
+    """Log an unexpected exception and build the 500 response."""
+    trace = g.get('trace')
+    if trace is not None:
+        tracer.log_exception(trace, request.method, request.path, exc)
+    return jsonify({
+        "error": "Internal server error",
+        "request_id": trace.request_id if trace is not None else None
+    }), 500
+
+# Hooks are only registered when profiling is configured
+if profiler.enabled:
+    @app.before_request
+    def start_profiling():
+        if profiler.should_profile(request.remote_addr, request.headers.get(PROFILE_HEADER)):
+            g.profiled = True
+            profiler.begin(threading.get_ident())
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        if g.get('profiled'):
+            profiler.end(threading.get_ident())
+
+@app.before_request
+def guard_admin():
+    # Also covers per-model routes such as /models/<name>/admin/...
+    if '/admin/' in request.path and not profiler.is_trusted(request.remote_addr):
+        return jsonify({"error": "Forbidden"}), 403
+
+def reload_specs(specs):
+    """Reload (name, dir) models from disk and rescore stale pre-scored tables."""
+    global shadow
+    for model_name, model_dir in specs:
+        entry = registry.load(model_name, model_dir)
+        rescorer.ensure_fresh(entry)
+        if shadow is not None and shadow.candidate.name == model_name:
+            shadow.candidate = entry
+
+
+class ReloadWatcher:
+    """Propagates /admin/reload to the other workers through a signal file."""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._seen = self._mtime()
+        self._lock = threading.Lock()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def signal(self, names):
+        """Ask the other workers to reload `names` (this one already has)."""
+        with self._lock:
+            with open(self.path + f'.{os.getpid()}', 'w') as f:
+                json.dump({"models": names, "pid": os.getpid()}, f)
+            os.replace(self.path + f'.{os.getpid()}', self.path)
+            self._seen = self._mtime()
+
+    def start(self):
+        threading.Thread(target=self._run, name='reload-watcher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                mtime = self._mtime()
+                if mtime is None or mtime == self._seen:
+                    continue
+                self._seen = mtime
+            try:
+                with open(self.path) as f:
+                    names = set(json.load(f)["models"])
+                reload_specs([(n, d) for n, d in parse_registry_spec(MODEL_REGISTRY)
+                              if n in names])
+                print(f"Reloaded models {sorted(names)} on reload signal")
+            except Exception as e:
+                print(f"Reload on signal failed: {type(e).__name__}: {e}")
+
+
+reload_watcher = ReloadWatcher(RELOAD_SIGNAL_FILE, RELOAD_POLL_SECONDS)
 
 def load_model_artifacts():
     """Load model and data on startup."""
-    global model, model_features, demographics_data
+    global registry
     
     # Auto-detect paths (Docker vs local)
-    if os.path.exists('./model/model.pkl'):
-        model_path = './model/model.pkl'
-        features_path = './model/model_features.json'
-        demographics_path = './data/zipcode_demographics.csv'
-    else:
-        model_path = '../model/model.pkl'
-        features_path = '../model/model_features.json'
-        demographics_path = '../data/zipcode_demographics.csv'
+    base_dir = '.' if os.path.exists('./model/model.pkl') else '..'
+    registry = ModelRegistry(base_dir,
+                             os.path.join(base_dir, 'data', 'zipcode_demographics.csv'),
+                             prefer_binary=FAST_STARTUP, timer=startup_timer,
+                             drift_options={"interval": DRIFT_INTERVAL_SECONDS,
+                                            "decay": DRIFT_DECAY}
+                                           if DRIFT_ENABLED else None)
     
     # Load everything
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    with open(features_path, 'r') as f:
-        model_features = json.load(f)
-    demographics_data = pd.read_csv(demographics_path, dtype={'zipcode': str})
-    demographics_data.set_index('zipcode', inplace=True)
-    
-    print(f"Model loaded with {len(model_features)} features")
-
-def prepare_features(house_data):
-    """Prepare features for prediction."""
-    # Normalize data types (handle floats, strings, etc.)
-    normalized_data = {}
-    for key, value in house_data.items():
-        if value is None:
-            normalized_data[key] = 0
-        elif key == 'zipcode':
-            # Handle zipcode as string or float
-            normalized_data[key] = str(int(float(value)))
+    for name, model_dir in parse_registry_spec(MODEL_REGISTRY):
+        rescorer.ensure_fresh(registry.load(name, model_dir))
+    configure_experiments()
+    configure_drift_metrics()
+    configure_budget_metrics()
+    if JOB_DIR:
+        configure_jobs()
+    if RELOAD_POLL_SECONDS > 0:
+        reload_watcher.start()
+
+def configure_experiments():
+    """Set up shadow scoring and the A/B split from configuration."""
+    global shadow, traffic_split
+    if SHADOW_MODEL:
+        shadow = ShadowScorer(registry.get(SHADOW_MODEL),
+                              sample_rate=SHADOW_SAMPLE_RATE,
+                              max_workers=SHADOW_MAX_WORKERS,
+                              max_pending=SHADOW_MAX_PENDING)
+        outcomes = lambda: [({"outcome": k}, getattr(shadow, k))
+                            for k in ('submitted', 'dropped', 'failed')]
+        comparison = lambda: [({"stat": k}, v) for k, v in shadow.stats.summary().items()
+                              if k != 'count']
+        metrics.counter('shadow_requests_total',
+                        'Shadow scoring requests by outcome', outcomes)
+        metrics.counter('shadow_compared_total',
+                        'Predictions compared against the candidate',
+                        lambda: shadow.stats.count)
+        metrics.gauge('shadow_error', 'Candidate minus primary prediction statistics',
+                      comparison)
+    if AB_SPLIT:
+        weights = parse_weights(AB_SPLIT)
+        for name in weights:
+            registry.get(name)
+        traffic_split = TrafficSplit(weights)
+
+def configure_drift_metrics():
+    """Expose drift scores of every monitored model as gauges."""
+    def samples(key):
+        result = []
+        for name, entry in registry.entries.items():
+            if entry.drift is None:
+                continue
+            scores = entry.drift.scores()
+            groups = [(f, v) for f, v in scores['features'].items()]
+            groups += [('prediction', scores['prediction']), ('zipcode', scores['zipcode'])]
+            result += [({"model": name, "feature": f}, v[key])
+                       for f, v in groups if key in v]
+        return result
+    metrics.gauge('drift_psi', 'Population stability index vs training profile',
+                  lambda: samples('psi'))
+    metrics.gauge('drift_ks', 'Max binned CDF distance vs training profile',
+                  lambda: samples('ks'))
+    metrics.counter('drift_observations_total', 'Requests observed by the drift monitor',
+                    lambda: [({"model": name}, entry.drift.observations)
+                             for name, entry in registry.entries.items()
+                             if entry.drift is not None])
+
+def configure_jobs():
+    """Set up the scoring job runner over JOB_DIR and its metrics."""
+    global job_runner
+    store = JobStore(JOB_DIR, lease_seconds=JOB_LEASE_SECONDS)
+    # Jobs left active by a worker that exited can never finish
+    store.expire()
+    job_runner = JobRunner(store, JOB_WORKERS,
+                           ('', registry.demographics_csv, FAST_STARTUP),
+                           chunk_rows=JOB_CHUNK_ROWS, nice=JOB_NICE)
+    metrics.gauge('jobs_active', 'Scoring jobs queued or running in JOB_DIR',
+                  lambda: len(store.active_ids()))
+    metrics.counter('jobs_submitted_total', 'Scoring jobs accepted by this worker',
+                    lambda: job_runner.submitted)
+    metrics.counter('jobs_finished_total', 'Scoring jobs of this worker by final state',
+                    lambda: [({"state": state}, n) for state, n in job_runner.finished.items()])
+
+def configure_budget_metrics():
+    """Expose the fallback rate and expected model call time per model."""
+    def fallback_ratio(name):
+        budgeted = budgeted_requests_total.value(model=name)
+        degraded = sum(degraded_responses_total.value(model=name, reason=reason)
+                       for reason in ('capacity', 'budget'))
+        return degraded / budgeted if budgeted else 0.0
+    metrics.gauge('fallback_ratio',
+                  'Share of budgeted requests answered from the fallback table',
+                  lambda: [({"model": name}, fallback_ratio(name))
+                           for name in registry.entries])
+    metrics.gauge('expected_model_call_seconds',
+                  'Moving estimate of a single-house model call, used for budgets',
+                  lambda: [({"model": name}, entry.latency.expected())
+                           for name, entry in registry.entries.items()])
+
+def memory_components():
+    """Arrays (or size estimates) of each memory component, for memory_report."""
+    components = {}
+    # Shared tables first: feature plans may reference their values
+    for i, table in enumerate(registry.demographics_tables):
+        components[f"demographics:{i}"] = collect_arrays(table)
+    for name, entry in registry.entries.items():
+        model = entry.model
+        if entry.neighbors is not None:
+            components[f"model:{name}"] = collect_arrays(model[:-1])
+            components[f"neighbor_index:{name}"] = collect_arrays(model[-1])
+            if entry.neighbors.side_table is not None:
+                components[f"neighbor_side_table:{name}"] = [entry.neighbors.side_table]
         else:
-            # Convert to appropriate numeric type
-            try:
-                float_val = float(value)
-                normalized_data[key] = int(float_val) if float_val.is_integer() else float_val
-            except (ValueError, TypeError):
-                normalized_data[key] = 0
-    
-    # Get zipcode and demographics
-    zipcode = normalized_data['zipcode']
-    if zipcode not in demographics_data.index:
-        raise ValueError(f"Zipcode {zipcode} not found in demographics data")
-    
-    # Combine house data with demographics
-    zipcode_demographics = demographics_data.loc[zipcode].to_dict()
-    house_features = {k: v for k, v in normalized_data.items() if k != 'zipcode'}
-    combined_features = {**house_features, **zipcode_demographics}
-    
-    # Create DataFrame in correct order
-    feature_df = pd.DataFrame([combined_features])
-    feature_df = feature_df.reindex(columns=model_features, fill_value=0)
-    
-    return feature_df
+            components[f"model:{name}"] = collect_arrays(model)
+        components[f"feature_plan:{name}"] = collect_arrays(entry.feature_plan)
+        if entry.geo is not None:
+            components[f"geo_index:{name}"] = collect_arrays(entry.geo)
+        if entry.prescored is not None:
+            components[f"prescored:{name}"] = collect_arrays(entry.prescored)
+    if prediction_cache is not None:
+        components["prediction_cache"] = (prediction_cache.nbytes(),
+                                          f"{len(prediction_cache)} entries")
+    if capture is not None:
+        components["capture_buffer"] = (capture.buffered_bytes(), "queued records")
+    return components
+
+def start_uds_server():
+    """Serve the binary protocol on UDS_PATH with the loaded registry."""
+    def observe(entry, features, zipcodes, predictions):
+        predictions_total.inc(len(predictions), model=entry.name, endpoint='uds')
+        if entry.drift is not None:
+            entry.drift.observe_batch(features, zipcodes, predictions)
+
+    service = BinaryPredictionService(registry, capacity, MAX_BATCH_SIZE, observe)
+    if os.environ.get('UDS_FD'):
+        server = UnixSocketServer(service, listening_socket=socket.socket(
+            fileno=int(os.environ['UDS_FD'])))
+    else:
+        server = UnixSocketServer(service, UDS_PATH)
+    server.start()
+    metrics.counter('uds_responses_total', 'Unix socket protocol responses by status',
+                    lambda: [({"status": str(status)}, n)
+                             for status, n in service.responses.items()])
+    print(f"Binary protocol listening on {UDS_PATH}")
+    return server
+
+def resolve_model(model_name=None):
+    """Pick the model for a request: path segment, header, A/B split, default.
+
+    Only prediction requests take part in the A/B split; feature lists,
+    price lookups, jobs and admin routes use the default model.
+    """
+    model_name = model_name or request.headers.get(MODEL_HEADER)
+    if model_name is None and traffic_split is not None and \
+            request.endpoint in PREDICTION_ENDPOINTS:
+        model_name = traffic_split.choose(request.headers.get(SPLIT_KEY_HEADER))
+        ab_assignments_total.inc(model=model_name)
+    try:
+        return registry.get(model_name)
+    except KeyError:
+        return None
+
+def unknown_model(model_name=None):
+    """Build the 404 response for an unknown model name."""
+    return jsonify({
+        "error": f"Unknown model: {model_name or request.headers.get(MODEL_HEADER)}",
+        "models": list(registry.entries)
+    }), 404
+
+def query_flag(name):
+    """True if a boolean query parameter such as ?explain=true is set."""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+def geo_options(house_data):
+    """Location and radius for ?geo=true, or None when not requested."""
+    if not query_flag('geo'):
+        return None
+    location = validate_location(house_data)
+    try:
+        radius_km = float(request.args.get('radius_km', GEO_RADIUS_KM))
+    except ValueError:
+        raise ValueError("radius_km must be a number")
+    if not radius_km > 0:
+        raise ValueError("radius_km must be positive")
+    return location, radius_km
+
+def degrade_reason(entry, rows=1):
+    """Why a budgeted request gets fallback prices instead of the model, or None.
+
+    `capacity` when no capacity slot freed up within the budget, `budget`
+    when the time left is below the model's expected call time. Called
+    after admission, so time spent queued for the slot counts against the
+    budget.
+    """
+    deadline = g.get('deadline')
+    if deadline is None:
+        return None
+    budgeted_requests_total.inc(model=entry.name)
+    if g.get('degraded'):
+        return g.degraded
+    if entry.fallback is not None:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or remaining < entry.latency.expected(rows):
+            return 'budget'
+    return None
+
+def fallback_prices(entry, houses, reason):
+    """Fallback table prices for validated houses of a degraded request."""
+    degraded_responses_total.inc(model=entry.name, reason=reason)
+    g.answered_degraded = True
+    sqft_living = [house.get('sqft_living') for house in houses]
+    return entry.fallback.lookup(
+        [int(float(house['zipcode'])) for house in houses],
+        [np.nan if value is None else float(value) for value in sqft_living])
+
+def budget_fields(reason):
+    """Response fields of a budgeted request (none without a budget)."""
+    if g.get('deadline') is None:
+        return {}
+    if reason is None:
+        return {"degraded": False}
+    return {"degraded": True, "degraded_reason": reason, "source": "fallback_table"}
+
+def predict_with_neighbors(entry, features, trace, explain=False, interval=False,
+                           batch=False, geo=None):
+    """Predict, querying the KNN index directly when neighbor details are needed.
+
+    Args:
+        geo: optional ((lat, long), radius_km) restricting a single-row search
+            to nearby training sales
+
+    Returns:
+        Tuple of (predictions array, dict of extra response fields)
+    """
+    extra = {}
+    started = time.perf_counter()
+    with trace.span('predict'):
+        if not (explain or interval or geo):
+            if batch or (prediction_cache is None and single_flight is None):
+                predictions = entry.model.predict(features)
+                entry.latency.observe(len(features), time.perf_counter() - started)
+                return predictions, extra
+            key = PredictionCache.key(entry, features)
+            if prediction_cache is not None:
+                predictions = prediction_cache.get(key)
+                g.cache_status = 'miss' if predictions is None else 'hit'
+                if predictions is not None:
+                    return predictions, extra
+            shared = False
+            if single_flight is None:
+                predictions = entry.model.predict(features)
+            else:
+                predictions, shared = single_flight.do(
+                    key, lambda: entry.model.predict(features))
+            # The caller that computed the prediction caches it
+            if prediction_cache is not None and not shared:
+                prediction_cache.put(key, predictions)
+            entry.latency.observe(1, time.perf_counter() - started)
+            return predictions, extra
+        if entry.neighbors is None:
+            raise ValueError(f"Model {entry.name} does not support neighbor queries")
+        # One neighbor search serves the prediction, explanation and interval
+        found = None
+        if geo is not None:
+            if entry.geo is None:
+                raise ValueError(f"Model {entry.name} has no geo index")
+            location, radius_km = geo
+            candidates = entry.geo.candidates(*location, radius_km)
+            found = entry.neighbors.query_candidates(features, candidates)
+            extra["geo"] = {"radius_km": radius_km, "candidates": len(candidates),
+                            "fallback": found is None}
+        if found is None:
+            found = entry.neighbors.query(features)
+        distances, indices = found
+        predictions = entry.neighbors.predict_from(distances, indices)
+        entry.latency.observe(len(features), time.perf_counter() - started)
+    if interval:
+        bounds = entry.neighbors.intervals(distances, indices, INTERVAL_LEVEL)
+        if batch:
+            extra["price_intervals"] = {"level": INTERVAL_LEVEL,
+                                        **{name: values.tolist()
+                                           for name, values in bounds.items()}}
+        else:
+            extra["price_interval"] = {"level": INTERVAL_LEVEL,
+                                       **{name: float(values[0])
+                                          for name, values in bounds.items()}}
+    if explain:
+        extra["explanation"] = {
+            "method": "k_nearest_neighbors",
+            "k": indices.shape[1],
+            "neighbors": entry.neighbors.explain(distances[0], indices[0])
+        }
+    return predictions, extra
+
+def validation_error(e, **extra):
+    """Build the 400 response for a failed validation."""
+    return jsonify({"error": str(e), "field_errors": e.errors, **extra}), 400
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -84,14 +717,71 @@ def health_check():
     """
     return jsonify({
         "status": "healthy",
-        "model_loaded": model is not None
+        "model_loaded": bool(registry and registry.entries),
+        "models": {name: entry.version for name, entry in registry.entries.items()},
+        "capacity": capacity.snapshot(),
+        "startup_mode": "fast" if FAST_STARTUP else "standard",
+        "startup_timings_ms": startup_timer.report()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint; ready once warmup latency has stabilized and while
+    the request queue is below READY_MAX_QUEUE_DEPTH.
+    ---
+    responses:
+      200:
+        description: Ready to serve traffic
+      503:
+        description: Still warming up, or saturated
+    """
+    ready = warmup.ready and not capacity.saturated
+    body = {
+        "ready": ready,
+        "warmup": warmup.report,
+        "capacity": capacity.snapshot()
+    }
+    return jsonify(body), (200 if ready else 503)
+
 @app.route('/predict', methods=['POST'])
-def predict_price():
+@app.route('/models/<model_name>/predict', methods=['POST'])
+@app.route('/explain', methods=['POST'], defaults={'explain': True})
+@app.route('/models/<model_name>/explain', methods=['POST'], defaults={'explain': True})
+def predict_price(model_name=None, explain=False):
     """Main prediction endpoint.
+    
+    `/explain` (or `?explain=true`) adds the k comparable sales the KNN model
+    averaged and `?interval=true` a price interval from their prices, both from
+    the same neighbor search used for the prediction. `?geo=true` restricts
+    that search to training sales within `radius_km` of the house's
+    `lat`/`long`. With an `X-Latency-Budget-Ms` the response says whether it
+    is `degraded` (a zipcode x size median price, without the extras).
     ---
     parameters:
+      - in: query
+        name: explain
+        type: boolean
+        required: false
+      - in: query
+        name: interval
+        type: boolean
+        required: false
+      - in: query
+        name: geo
+        type: boolean
+        required: false
+      - in: query
+        name: radius_km
+        type: number
+        required: false
+      - in: header
+        name: X-Model-Name
+        type: string
+        required: false
+      - in: header
+        name: X-Latency-Budget-Ms
+        type: number
+        required: false
       - in: body
         name: house
         required: true
@@ -118,38 +808,86 @@ def predict_price():
       200:
         description: Predicted price
     """
+    trace = g.trace
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
     try:
         # Validate JSON request
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
             
-        house_data = request.get_json()
-        
-        # Check for required zipcode
-        if 'zipcode' not in house_data:
-            return jsonify({"error": "Missing required field: zipcode"}), 400
+        with trace.span('parse'):
+            house_data = request.get_json()
         
         # Make prediction
-        features_df = prepare_features(house_data)
-        prediction = model.predict(features_df)[0]
+        features = entry.prepare_features(house_data, trace)
+        reason = degrade_reason(entry)
+        if reason is not None:
+            if entry.fallback is None:
+                return at_capacity()
+            prediction = fallback_prices(entry, [house_data], reason)[0]
+            extra = {}
+        else:
+            predictions, extra = predict_with_neighbors(
+                entry, features, trace, explain=explain or query_flag('explain'),
+                interval=query_flag('interval'), geo=geo_options(house_data))
+            prediction = predictions[0]
+            predictions_total.inc(model=entry.name, endpoint='predict')
+            if entry.drift is not None:
+                entry.drift.observe(features[0], house_data['zipcode'], prediction)
+            if shadow is not None:
+                shadow.maybe_submit(entry.name, house_data, prediction)
+        extra.update(budget_fields(reason))
         
-        return jsonify({
-            "predicted_price": float(prediction),
-            "currency": "USD",
-            "zipcode": house_data['zipcode'],
-            "status": "success"
-        })
+        with trace.span('serialize'):
+            return jsonify({
+                "predicted_price": float(prediction),
+                "currency": "USD",
+                "model": entry.name,
+                "model_version": entry.version,
+                "zipcode": house_data['zipcode'],
+                "status": "success",
+                **extra
+            })
         
+    except ValidationError as e:
+        return validation_error(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": "Internal server error"}), 500
+        return internal_error(e)
 
 @app.route('/predict/simple', methods=['POST'])
-def predict_price_simple():
+@app.route('/models/<model_name>/predict/simple', methods=['POST'])
+def predict_price_simple(model_name=None):
     """Simplified prediction endpoint.
     ---
     parameters:
+      - in: query
+        name: explain
+        type: boolean
+        required: false
+      - in: query
+        name: interval
+        type: boolean
+        required: false
+      - in: query
+        name: geo
+        type: boolean
+        required: false
+      - in: query
+        name: radius_km
+        type: number
+        required: false
+      - in: header
+        name: X-Model-Name
+        type: string
+        required: false
+      - in: header
+        name: X-Latency-Budget-Ms
+        type: number
+        required: false
       - in: body
         name: house
         required: true
@@ -176,62 +914,603 @@ def predict_price_simple():
       200:
         description: Predicted price (simple)
     """
+    trace = g.trace
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
     try:
         # Validate JSON request
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
             
-        house_data = request.get_json()
+        with trace.span('parse'):
+            house_data = request.get_json()
         
-        # Required core features
-        core_features = ['bedrooms', 'bathrooms', 'sqft_living', 'sqft_lot', 
-                        'floors', 'sqft_above', 'sqft_basement', 'zipcode']
+        # Make prediction; the simple schema requires all core features
+        features = entry.prepare_features(house_data, trace, simple=True)
+        reason = degrade_reason(entry)
+        if reason is not None:
+            if entry.fallback is None:
+                return at_capacity()
+            prediction = fallback_prices(entry, [house_data], reason)[0]
+            extra = {}
+        else:
+            predictions, extra = predict_with_neighbors(
+                entry, features, trace, explain=query_flag('explain'),
+                interval=query_flag('interval'), geo=geo_options(house_data))
+            prediction = predictions[0]
+            predictions_total.inc(model=entry.name, endpoint='simple')
+            if entry.drift is not None:
+                entry.drift.observe(features[0], house_data['zipcode'], prediction)
+            if shadow is not None:
+                shadow.maybe_submit(entry.name, house_data, prediction, simple=True)
+        extra.update(budget_fields(reason))
         
-        # Check all required features
-        missing = [f for f in core_features if f not in house_data]
-        if missing:
+        with trace.span('serialize'):
             return jsonify({
-                "error": f"Missing required features: {missing}",
-                "required_features": core_features
-            }), 400
+                "predicted_price": float(prediction),
+                "currency": "USD",
+                "endpoint": "simple",
+                "model": entry.name,
+                "model_version": entry.version,
+                "zipcode": house_data['zipcode'],
+                "status": "success",
+                **extra
+            })
         
-        # Use only core features
-        core_data = {k: house_data[k] for k in core_features}
+    except ValidationError as e:
+        return validation_error(e, required_features=entry.simple_features)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return internal_error(e)
+
+@app.route('/predict/batch', methods=['POST'])
+@app.route('/models/<model_name>/predict/batch', methods=['POST'])
+def predict_price_batch(model_name=None):
+    """Batch prediction endpoint.
+    ---
+    parameters:
+      - in: query
+        name: interval
+        type: boolean
+        required: false
+      - in: header
+        name: X-Model-Name
+        type: string
+        required: false
+      - in: header
+        name: X-Latency-Budget-Ms
+        type: number
+        required: false
+      - in: body
+        name: houses
+        required: true
+        schema:
+          type: object
+          properties:
+            houses:
+              type: array
+              items:
+                type: object
+    responses:
+      200:
+        description: Predicted prices, in request order; "degraded" true
+          when a latency budget forced fallback table prices
+      400:
+        description: Validation errors keyed by row index
+    """
+    trace = g.trace
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
+    try:
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
         
-        # Make prediction
-        features_df = prepare_features(core_data)
-        prediction = model.predict(features_df)[0]
+        with trace.span('parse'):
+            body = request.get_json()
+            houses = body.get('houses') if isinstance(body, dict) else body
+        
+        if not isinstance(houses, list) or not houses:
+            return jsonify({"error": "Request must contain a non-empty 'houses' list"}), 400
+        if len(houses) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch size exceeds limit of {MAX_BATCH_SIZE}"}), 400
         
-        return jsonify({
-            "predicted_price": float(prediction),
-            "currency": "USD",
-            "endpoint": "simple",
-            "zipcode": house_data['zipcode'],
-            "status": "success"
-        })
+        features = entry.prepare_features_batch(houses, trace)
+        reason = degrade_reason(entry, len(houses))
+        if reason is not None:
+            if entry.fallback is None:
+                return at_capacity()
+            predictions = fallback_prices(entry, houses, reason)
+            extra = {}
+        else:
+            predictions, extra = predict_with_neighbors(
+                entry, features, trace, interval=query_flag('interval'), batch=True)
+            predictions_total.inc(len(houses), model=entry.name, endpoint='batch')
+            if entry.drift is not None:
+                entry.drift.observe_batch(features, [h['zipcode'] for h in houses],
+                                          predictions)
+            if shadow is not None:
+                shadow.maybe_submit(entry.name, houses, predictions, batch=True)
+        extra.update(budget_fields(reason))
         
+        with trace.span('serialize'):
+            return jsonify({
+                "predicted_prices": predictions.tolist(),
+                "currency": "USD",
+                "model": entry.name,
+                "model_version": entry.version,
+                "count": len(houses),
+                "status": "success",
+                **extra
+            })
+    
+    except ValidationError as e:
+        return validation_error(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return internal_error(e)
+
+@app.route('/price/<int:house_id>', methods=['GET'])
+@app.route('/models/<model_name>/price/<int:house_id>', methods=['GET'])
+def get_prescored_price(house_id, model_name=None):
+    """Price of an inventory house by id from the pre-scored table.
+    ---
+    parameters:
+      - in: path
+        name: house_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Pre-scored predicted price
+      404:
+        description: Unknown house id or model
+      503:
+        description: No current pre-scored table (absent or being rescored)
+    """
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
+    table = entry.prescored
+    if table is None:
+        prescored_lookups_total.inc(model=entry.name, result="unavailable")
+        return jsonify({"error": f"No pre-scored prices for model {entry.name}",
+                        "prescore": rescorer.status.get(entry.name)}), 503, {'Retry-After': '5'}
+    price = table.lookup(house_id)
+    if price is None:
+        prescored_lookups_total.inc(model=entry.name, result="unknown_id")
+        return jsonify({"error": f"House {house_id} is not in the pre-scored inventory"}), 404
+    prescored_lookups_total.inc(model=entry.name, result="hit")
+    return jsonify({
+        "id": house_id,
+        "predicted_price": round(price, 2),
+        "currency": "USD",
+        "model": entry.name,
+        "model_version": entry.version,
+        "source": "prescored"
+    })
+
+def jobs_disabled():
+    return jsonify({"error": "Scoring jobs are disabled (set JOB_DIR)"}), 404
+
+def describe_job(job):
+    """A job record with its progress and links, for responses."""
+    rows = job.get('rows')
+    if rows:
+        progress = job['rows_done'] / rows
+    else:
+        progress = 1.0 if job['state'] == 'succeeded' else 0.0
+    job_id = job['id']
+    return {**job, "progress": round(progress, 4),
+            "cancel_requested": job_runner.store.cancel_requested(job_id),
+            "links": {"status": f"/jobs/{job_id}", "result": f"/jobs/{job_id}/result",
+                      "cancel": f"/jobs/{job_id}/cancel"}}
+
+@app.route('/jobs', methods=['POST'])
+@app.route('/models/<model_name>/jobs', methods=['POST'])
+def submit_job(model_name=None):
+    """Submit an asynchronous scoring job.
+
+    The input is a CSV file (multipart field `file`, or a `text/csv` body)
+    with a header row, a `zipcode` column, house field columns and an
+    optional `id` column, or JSON houses as for /predict/batch without the
+    batch size limit.
+    ---
+    parameters:
+      - in: formData
+        name: file
+        type: file
+        required: false
+      - in: header
+        name: X-Model-Name
+        type: string
+        required: false
+    responses:
+      202:
+        description: Job accepted; poll links.status for progress
+      400:
+        description: No usable input, or no zipcode column
+      404:
+        description: Jobs are disabled, or unknown model
+      413:
+        description: Upload larger than JOB_MAX_UPLOAD_MB
+      429:
+        description: JOB_MAX_ACTIVE jobs are already queued or running
+    """
+    if job_runner is None:
+        return jobs_disabled()
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
+    if (request.content_length or 0) > JOB_MAX_UPLOAD_MB * (1 << 20):
+        return jsonify({"error": f"Upload exceeds {JOB_MAX_UPLOAD_MB:g} MB"}), 413
+    store = job_runner.store
+    store.prune(JOB_RETENTION_HOURS * 3600)
+    # Reads only the active jobs, so that a dead worker's jobs stop counting
+    store.expire()
+    if len(store.active_ids()) >= JOB_MAX_ACTIVE:
+        return jsonify({"error": f"{JOB_MAX_ACTIVE} jobs are already active, retry later"}), \
+            429, {'Retry-After': '30'}
+    try:
+        if 'file' in request.files:
+            write_input = request.files['file'].save
+        elif request.mimetype == 'text/csv':
+            def write_input(path):
+                with open(path, 'wb') as f:
+                    shutil.copyfileobj(request.stream, f, 1 << 20)
+        elif request.is_json:
+            body = request.get_json()
+            houses = body.get('houses') if isinstance(body, dict) else body
+            if not isinstance(houses, list) or not houses or \
+                    not all(isinstance(h, dict) for h in houses):
+                raise ValueError("Request must contain a non-empty 'houses' list of objects")
+            write_input = lambda path: write_records(path, houses)
+        else:
+            raise ValueError("Send a CSV file (multipart 'file' or text/csv) or JSON houses")
+
+        def write_checked(path):
+            write_input(path)
+            if 'zipcode' not in read_header(path):
+                raise ValueError("Input must have a header row with a zipcode column")
+
+        job = store.create(entry.name, entry.version, write_checked)
+        job_runner.submit(job['id'], entry)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return internal_error(e)
+    return jsonify(describe_job(job)), 202, {'Location': f"/jobs/{job['id']}"}
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Scoring jobs in JOB_DIR, newest first.
+    ---
+    responses:
+      200:
+        description: Job counts by state and the 100 newest jobs
+    """
+    if job_runner is None:
+        return jobs_disabled()
+    jobs = job_runner.store.jobs()
+    counts = dict.fromkeys(STATES, 0)
+    for job in jobs:
+        counts[job['state']] += 1
+    return jsonify({"counts": counts,
+                    "jobs": [describe_job(job) for job in jobs[:100]]})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and progress of a scoring job.
+    ---
+    responses:
+      200:
+        description: State, rows done of rows, invalid rows and their errors
+      404:
+        description: Unknown job
+    """
+    if job_runner is None:
+        return jobs_disabled()
+    job = job_runner.store.read(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(describe_job(job))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running scoring job.
+    ---
+    responses:
+      202:
+        description: Cancelled, or cancellation requested (running jobs stop
+          after their current chunk)
+      404:
+        description: Unknown job
+      409:
+        description: The job has already finished
+    """
+    if job_runner is None:
+        return jobs_disabled()
+    job = job_runner.store.read(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job['state'] not in ('queued', 'running'):
+        return jsonify({"error": f"Job is {job['state']}", "job": describe_job(job)}), 409
+    return jsonify(describe_job(job_runner.cancel(job_id))), 202
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Results of a succeeded scoring job.
+
+    Streams CSV (input row, id if given, predicted price; empty for invalid
+    rows) by default, or sends one result column as a .npy file.
+    ---
+    parameters:
+      - in: query
+        name: format
+        type: string
+        required: false
+        description: csv (default) or npy
+      - in: query
+        name: column
+        type: string
+        required: false
+        description: npy column, predicted_price (default), valid or id
+    responses:
+      200:
+        description: Result rows in input order
+      404:
+        description: Unknown job
+      409:
+        description: The job has not succeeded
+    """
+    if job_runner is None:
+        return jobs_disabled()
+    store = job_runner.store
+    job = store.read(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job['state'] != 'succeeded':
+        return jsonify({"error": f"Job is {job['state']}", "job": describe_job(job)}), 409
+    result_format = request.args.get('format', 'csv')
+    if result_format == 'npy':
+        column = request.args.get('column', 'predicted_price')
+        if column not in store.result_columns(job_id):
+            return jsonify({"error": f"Unknown column: {column}",
+                            "columns": store.result_columns(job_id)}), 400
+        return send_file(store.result_path(job_id, column),
+                         mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f"{job_id}-{column}.npy")
+    if result_format != 'csv':
+        return jsonify({"error": "format must be csv or npy"}), 400
+    return Response(store.iter_result_csv(job_id), mimetype='text/csv',
+                    headers={'Content-Disposition':
+                             f'attachment; filename="{job_id}.csv"'})
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_models():
+    """Reload model artifacts from disk and rescore stale pre-scored tables.
+    ---
+    parameters:
+      - in: query
+        name: model
+        type: string
+        required: false
+        description: Reload only this model (default all)
+    responses:
+      200:
+        description: Reloaded models and their pre-score status
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+      404:
+        description: Unknown model
+    """
+    specs = parse_registry_spec(MODEL_REGISTRY)
+    name = request.args.get('model')
+    if name is not None:
+        specs = [(n, d) for n, d in specs if n == name]
+        if not specs:
+            return unknown_model(name)
+    try:
+        reload_specs(specs)
+        reload_watcher.signal([n for n, _ in specs])
+    except Exception as e:
+        return internal_error(e)
+    return jsonify({
+        "models": {n: registry.get(n).version for n, _ in specs},
+        "prescore": {n: rescorer.status.get(n) for n, _ in specs},
+        "worker_pid": os.getpid(),
+    })
+
+@app.route('/admin/profile', methods=['GET'])
+def get_profile():
+    """Aggregated request profiles in collapsed flame-graph format.
+    ---
+    parameters:
+      - in: query
+        name: reset
+        type: boolean
+        required: false
+    responses:
+      200:
+        description: Collapsed stacks, one "frame;frame;frame count" per line
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+    """
+    body = profiler.collapsed()
+    if request.args.get('reset', '').lower() in ('1', 'true'):
+        profiler.reset()
+    return body, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics.
+    ---
+    responses:
+      200:
+        description: Metrics in Prometheus text format
+    """
+    return metrics.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+@app.route('/admin/drift', methods=['GET'])
+def get_drift_report():
+    """Input and prediction drift scores per model.
+    ---
+    responses:
+      200:
+        description: PSI and KS scores vs the training reference profile
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+    """
+    return jsonify({
+        name: entry.drift.scores(force=True) if entry.drift is not None else None
+        for name, entry in registry.entries.items()
+    })
+
+@app.route('/admin/shadow', methods=['GET'])
+def get_shadow_report():
+    """Shadow scoring and A/B split summary.
+    ---
+    responses:
+      200:
+        description: Aggregated candidate vs primary comparison
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+    """
+    return jsonify({
+        "shadow": shadow.summary() if shadow is not None else None,
+        "ab_split": dict(zip(traffic_split.names, traffic_split.cumulative))
+                    if traffic_split is not None else None,
+    })
+
+@app.route('/admin/memory', methods=['GET'])
+def get_memory_report():
+    """Resident memory of this worker broken down by component.
+    ---
+    responses:
+      200:
+        description: Process totals (shared vs private), startup baseline and
+          per-component bytes, resident, shared and private pages
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+    """
+    report = memory_report(memory_components(), memory_baseline)
+    report["pid"] = os.getpid()
+    return jsonify(report)
+
+@app.route('/admin/memory/allocations', methods=['POST'])
+@app.route('/models/<model_name>/admin/memory/allocations', methods=['POST'])
+def trace_feature_allocations(model_name=None):
+    """Trace prepare_features allocations for a house with tracemalloc.
+    ---
+    parameters:
+      - in: query
+        name: calls
+        type: integer
+        required: false
+        description: prepare_features calls traced (default 100)
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+    responses:
+      200:
+        description: Peak transient bytes per call and per span, and the
+          source lines of memory still allocated per call
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+      404:
+        description: ALLOCATION_TRACING is off, or unknown model
+      409:
+        description: Another allocation trace is running in this worker
+    """
+    if not ALLOCATION_TRACING:
+        return jsonify({"error": "Allocation tracing is disabled (ALLOCATION_TRACING=1)"}), 404
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
+    try:
+        house_data = request.get_json()
+        if not isinstance(house_data, dict):
+            raise ValueError("Request body must be a JSON object")
+        calls = int(request.args.get('calls', 100))
+        if not 0 < calls <= 10000:
+            raise ValueError("calls must be between 1 and 10000")
+        # Validate once outside the trace so errors surface as 400
+        entry.prepare_features(house_data)
+        return jsonify({"model": entry.name, **trace_allocations(
+            lambda trace: entry.prepare_features(house_data, trace), calls)})
+    except TraceRunning as e:
+        return jsonify({"error": str(e)}), 409
+    except ValidationError as e:
+        return validation_error(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        return jsonify({"error": "Internal server error"}), 500
+        return internal_error(e)
+
+@app.route('/admin/capture', methods=['GET'])
+def get_capture_report():
+    """Traffic capture status.
+    ---
+    responses:
+      200:
+        description: Captured, dropped and written request counts
+      403:
+        description: Caller is not in PROFILE_TRUSTED_NETWORKS
+    """
+    return jsonify({"capture": capture.summary() if capture is not None else None})
 
 @app.route('/features', methods=['GET'])
-def get_required_features():
+@app.route('/models/<model_name>/features', methods=['GET'])
+def get_required_features(model_name=None):
     """Return required features.
     ---
     responses:
       200:
         description: List of required features
     """
+    entry = resolve_model(model_name)
+    if entry is None:
+        return unknown_model(model_name)
     return jsonify({
-        "simple_endpoint_features": ['bedrooms', 'bathrooms', 'sqft_living', 'sqft_lot', 
-                                   'floors', 'sqft_above', 'sqft_basement', 'zipcode'],
-        "model_features": model_features,
+        "model": entry.name,
+        "model_version": entry.version,
+        "simple_endpoint_features": entry.simple_features,
+        "model_features": entry.model_features,
         "note": "Demographics are automatically added based on zipcode"
     })
 
+@app.route('/models', methods=['GET'])
+def list_models():
+    """List loaded models.
+    ---
+    responses:
+      200:
+        description: Loaded models, their versions and required features
+    """
+    return jsonify({
+        "default": registry.default_name,
+        "models": registry.describe()
+    })
+
 # Load model on startup
 load_model_artifacts()
+startup_timer.record('total', time.perf_counter() - _process_started)
+print(startup_timer.log_line())
+memory_baseline["models"] = rss_bytes()
+uds_server = start_uds_server() if UDS_PATH else None
+print(summary_line(memory_report(memory_components(), memory_baseline)))
+if WARMUP_ENABLED:
+    warmup.start({name: (entry.prepare_features, entry.model)
+                  for name, entry in registry.entries.items()},
+                 registry.get().demographics.zipcodes.tolist())
+else:
+    warmup.ready = True
+    warmup.report = {"status": "disabled"}
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5005, debug=False)
+    app.run(host='0.0.0.0', port=PORT, debug=False, threaded=True)
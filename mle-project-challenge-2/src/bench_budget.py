@@ -0,0 +1,88 @@
+"""
+Benchmark latency-budgeted predictions under overload: a closed loop of
+keep-alive clients, more than the API's MAX_CONCURRENT, posting /predict
+with and without an X-Latency-Budget-Ms header, against a running API
+
+Reports status codes, the share of degraded (fallback table) answers and
+client-side latency percentiles for each budget.
+
+Usage: python bench_budget.py [--url http://localhost:5005] [--clients 16]
+                              [--duration 10] [--budgets none,50,20]
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+
+
+def client_loop(url, houses, offset, budget_ms, stop_at, results):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    headers = {'Content-Type': 'application/json'}
+    if budget_ms is not None:
+        headers['X-Latency-Budget-Ms'] = str(budget_ms)
+    i = offset
+    while time.perf_counter() < stop_at:
+        # Distinct lot sizes keep every request out of the prediction cache
+        house = dict(houses[i % len(houses)], sqft_lot=1000 + i)
+        i += 1
+        started = time.perf_counter()
+        conn.request('POST', '/predict', json.dumps(house), headers)
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - started
+        degraded = response.status == 200 and json.loads(body).get('degraded', False)
+        results.append((response.status, degraded, elapsed))
+    conn.close()
+
+
+def run(url, houses, clients, duration, budget_ms):
+    results = []
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=client_loop,
+                                args=(url, houses, n * 100000, budget_ms, stop_at, results))
+               for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default='http://localhost:5005')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--budgets', default='none,50,20',
+                        help="comma-separated budgets in ms; 'none' sends no header")
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, 'future_unseen_examples.csv')) as f:
+        houses = list(csv.DictReader(f))
+    print(f"{args.clients} clients, {args.duration:.0f}s per budget")
+    print(f"{'budget ms':>9} {'requests':>9} {'200':>7} {'503':>7} {'degraded':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for budget in args.budgets.split(','):
+        budget_ms = None if budget == 'none' else float(budget)
+        results = run(args.url, houses, args.clients, args.duration, budget_ms)
+        statuses = Counter(status for status, _, _ in results)
+        latencies = sorted(elapsed for _, _, elapsed in results)
+        degraded = sum(1 for _, d, _ in results if d)
+        ok = statuses.get(200, 0)
+        print(f"{budget:>9} {len(results):>9} {ok:>7} {statuses.get(503, 0):>7} "
+              f"{degraded / max(ok, 1):>9.1%} "
+              f"{latencies[len(latencies) // 2] * 1000:>8.1f} "
+              f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} "
+              f"{latencies[-1] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark zipcode demographics lookups: pandas .loc vs the direct-address
+DemographicsTable
+
+Usage: python bench_demographics.py [batch_size]
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from demographics import load_demographics_csv
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+REPEATS = 7
+
+
+def allocated_bytes(fn):
+    """Peak bytes allocated during one call of `fn`."""
+    fn()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+class DictIndex:
+    """The previous zipcode -> row dict lookup, for comparison."""
+
+    def __init__(self, zipcodes):
+        self._index = {z: row for row, z in enumerate(zipcodes.tolist())}
+
+    def row_index(self, zipcode):
+        return self._index.get(zipcode)
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    path = os.path.join(DATA_DIR, 'zipcode_demographics.csv')
+
+    # Legacy app: DataFrame indexed by string zipcode
+    frame = pd.read_csv(path, dtype={'zipcode': str}).set_index('zipcode')
+    table = load_demographics_csv(path)
+    index = DictIndex(table.zipcodes)
+
+    rng = np.random.default_rng(0)
+    batch = rng.choice(table.zipcodes, size=batch_size)
+    zipcode = int(batch[0])
+    zipcode_str = str(zipcode)
+
+    def pandas_lookup():
+        if zipcode_str in frame.index:
+            return frame.loc[zipcode_str].to_dict()
+
+    print(f"Demographics: {len(table)} zipcodes x {len(table.columns)} columns, "
+          f"direct-address span {len(table.slots)}")
+    print(f"{'memory':<34} pandas {frame.memory_usage(deep=True).sum() / 1024:7.1f} KiB  "
+          f"table {table.nbytes / 1024:7.1f} KiB")
+
+    single = {
+        "pandas .loc + to_dict": pandas_lookup,
+        "dict index": lambda: index.row_index(zipcode),
+        "direct address": lambda: table.row_index(zipcode),
+    }
+    for name, fn in single.items():
+        seconds = min(timeit.repeat(fn, number=10000, repeat=REPEATS)) / 10000
+        print(f"single {name:<27} {seconds * 1e9:9.0f} ns  "
+              f"{allocated_bytes(fn):7d} B allocated")
+
+    def values_take(rows):
+        return table.values.take(rows, axis=0)
+
+    cases = {
+        "dict index loop": lambda: values_take([index.row_index(z)
+                                                for z in batch.tolist()]),
+        "direct address gather": lambda: table.values.take(table.row_indices(batch)[0],
+                                                          axis=0),
+    }
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=100, repeat=REPEATS)) / 100
+        print(f"batch  {name:<27} {seconds * 1e6:9.1f} us  "
+              f"{seconds / batch_size * 1e9:6.0f} ns/row (rows incl. gather)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark geospatial candidate search against the global KNN search
+
+Scores hold-out sales (kc_house_data.csv rows not in the training set) one
+request at a time, globally and within several radii, on the training set
+and on synthetically grown copies of it (each sale replicated with small
+feature and location jitter).
+
+Usage: python bench_geo.py [n_queries]
+"""
+import csv
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import Pipeline
+
+from bench_validation import MODEL_DIR
+from geo import load_geo_index, GeoIndex
+from neighbors import NeighborQuery
+from registry import ModelRegistry
+
+# Builds grown geo indices the way create_model.py does
+sys.path.insert(0, os.path.dirname(os.path.abspath(MODEL_DIR)))
+from create_model import build_geo_index  # noqa: E402
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+RADII_KM = (1.0, 2.0, 5.0)
+GROWTH = (1, 4, 16)
+
+
+def load_holdout(training_ids, n_queries):
+    """Hold-out sales as request bodies with their locations and prices."""
+    with open(os.path.join(DATA_DIR, 'kc_house_data.csv')) as f:
+        rows = [row for row in csv.DictReader(f) if int(row['id']) not in training_ids]
+    rng = np.random.default_rng(0)
+    rows = [rows[i] for i in rng.choice(len(rows), size=n_queries, replace=False)]
+    prices = np.array([float(row['price']) for row in rows])
+    locations = [(float(row['lat']), float(row['long'])) for row in rows]
+    return rows, prices, locations
+
+
+def grow(model, geo, factor, rng):
+    """Neighbor query and geo index over `factor` jittered copies of the data."""
+    knn = model[-1]
+    if factor == 1:
+        return NeighborQuery(model), geo
+    fit_x = np.concatenate([knn._fit_X] + [
+        knn._fit_X + rng.normal(0, 0.05, knn._fit_X.shape) for _ in range(factor - 1)])
+    lat = np.concatenate([geo.lat] + [geo.lat + rng.normal(0, 0.002, len(geo.lat))
+                                      for _ in range(factor - 1)])
+    long = np.concatenate([geo.long] + [geo.long + rng.normal(0, 0.002, len(geo.long))
+                                        for _ in range(factor - 1)])
+    grown_knn = KNeighborsRegressor(n_neighbors=knn.n_neighbors, weights=knn.weights)
+    grown_knn.fit(fit_x, np.tile(knn._y, factor))
+    grown = Pipeline(model.steps[:-1] + [('knn', grown_knn)])
+    return NeighborQuery(grown), GeoIndex(**build_geo_index(lat, long))
+
+
+def r2(predictions, prices):
+    return 1 - ((prices - predictions) ** 2).sum() / ((prices - prices.mean()) ** 2).sum()
+
+
+def main():
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    registry = ModelRegistry(os.path.dirname(os.path.abspath(MODEL_DIR)),
+                             os.path.join(DATA_DIR, 'zipcode_demographics.csv'))
+    entry = registry.load('default', os.path.basename(MODEL_DIR))
+    geo = load_geo_index(entry.path)
+    training_ids = set(entry.neighbors.side_table['id'].tolist())
+    rows, prices, locations = load_holdout(training_ids, n_queries)
+    features = entry.prepare_features_batch(
+        [{f: row[f] for f in entry.simple_features} for row in rows])
+
+    rng = np.random.default_rng(0)
+    print(f"{n_queries} hold-out queries, one request each")
+    print(f"{'train rows':>10} {'search':>8} {'ms/query':>9} {'candidates':>11} "
+          f"{'fallback':>9} {'R2':>7} {'MAE':>10} {'vs global':>10}")
+    for factor in GROWTH:
+        neighbors, grid = grow(entry.model, geo, factor, rng)
+        results = {}
+        for radius in (None,) + RADII_KM:
+            predictions = np.empty(n_queries)
+            candidates = fallbacks = 0
+            start = time.perf_counter()
+            for i in range(n_queries):
+                row = features[i:i + 1]
+                found = None
+                if radius is not None:
+                    rows_near = grid.candidates(*locations[i], radius)
+                    candidates += len(rows_near)
+                    found = neighbors.query_candidates(row, rows_near)
+                    fallbacks += found is None
+                if found is None:
+                    found = neighbors.query(row)
+                predictions[i] = neighbors.predict_from(*found)[0]
+            elapsed = (time.perf_counter() - start) / n_queries
+            results[radius] = predictions
+            label = "global" if radius is None else f"{radius:g} km"
+            agreement = np.abs(predictions / results[None] - 1).mean()
+            print(f"{len(grid):>10} {label:>8} {elapsed * 1000:>9.3f} "
+                  f"{candidates / n_queries if radius else len(grid):>11.0f} "
+                  f"{fallbacks / n_queries:>9.1%} {r2(predictions, prices):>7.4f} "
+                  f"{np.abs(predictions - prices).mean():>10,.0f} {agreement:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
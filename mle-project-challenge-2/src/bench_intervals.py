@@ -0,0 +1,50 @@
+"""
+Benchmark price intervals: plain model.predict vs one neighbor query serving
+both the prediction and its interval
+
+Usage: python bench_intervals.py [batch_size]
+"""
+import os
+import sys
+import timeit
+import warnings
+
+from bench_validation import MODEL_DIR, load_examples
+from registry import ModelRegistry
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+REPEATS = 30
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    registry = ModelRegistry(os.path.dirname(os.path.abspath(MODEL_DIR)),
+                             os.path.join(DATA_DIR, 'zipcode_demographics.csv'))
+    entry = registry.load('default', os.path.basename(MODEL_DIR))
+    neighbors = entry.neighbors
+    houses = load_examples(batch_size)
+    batch = entry.prepare_features_batch(houses)
+    row = batch[:1]
+
+    def with_interval(rows):
+        distances, indices = neighbors.query(rows)
+        neighbors.predict_from(distances, indices)
+        neighbors.intervals(distances, indices)
+
+    for label, rows, number in (("single row", row, 200), (f"batch of {batch_size}", batch, 5)):
+        # Interleaved so both cases see the same machine noise
+        plain = interval = float('inf')
+        for _ in range(REPEATS):
+            plain = min(plain, timeit.timeit(lambda: entry.model.predict(rows),
+                                             number=number) / number)
+            interval = min(interval, timeit.timeit(lambda: with_interval(rows),
+                                                   number=number) / number)
+        print(f"{label:<16} predict {plain * 1000:8.3f} ms  "
+              f"predict+interval {interval * 1000:8.3f} ms  "
+              f"overhead {(interval / plain - 1) * 100:+5.1f}%")
+
+if __name__ == "__main__":
+    main()
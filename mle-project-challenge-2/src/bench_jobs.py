@@ -0,0 +1,136 @@
+"""
+Benchmark asynchronous scoring jobs against a running API started with
+JOB_DIR set: submit --jobs CSV files of --rows houses each (sales from
+kc_house_data.csv, repeated), poll them to completion and download every
+result
+
+Reports jobs/hour and rows/s end to end, the scoring rate each job reports,
+and the latency of single /predict calls made while the jobs were running.
+
+Usage: python bench_jobs.py [--url http://localhost:5005] [--jobs 4]
+                            [--rows 100000] [--format csv]
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+
+
+def connect(url):
+    parts = urlsplit(url)
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=300)
+
+
+def request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body, headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def make_input(rows):
+    sales = pd.read_csv(os.path.join(DATA_DIR, 'kc_house_data.csv'), dtype={'zipcode': str})
+    sales = sales.drop(columns=['price'])
+    sales = pd.concat([sales] * (rows // len(sales) + 1), ignore_index=True).iloc[:rows]
+    buffer = io.StringIO()
+    sales.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def probe_loop(url, stop, latencies):
+    conn = connect(url)
+    house = json.dumps({'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000,
+                        'floors': 1, 'sqft_above': 1800, 'sqft_basement': 0,
+                        'zipcode': '98103'})
+    i = 0
+    while not stop.is_set():
+        # A distinct lot size keeps each probe out of the prediction cache
+        body = house.replace('5000', str(5000 + i))
+        i += 1
+        started = time.perf_counter()
+        request(conn, 'POST', '/predict', body, {'Content-Type': 'application/json'})
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.05)
+    conn.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000 if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default='http://localhost:5005')
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=['csv', 'npy'], default='csv',
+                        help='result format to download')
+    args = parser.parse_args()
+
+    body = make_input(args.rows)
+    print(f"{args.jobs} jobs x {args.rows} rows ({len(body) / 1e6:.1f} MB each)")
+
+    idle = []
+    stop = threading.Event()
+    probe = threading.Thread(target=probe_loop, args=(args.url, stop, idle))
+    probe.start()
+    time.sleep(2)
+    stop.set()
+    probe.join()
+
+    conn = connect(args.url)
+    busy = []
+    stop = threading.Event()
+    probe = threading.Thread(target=probe_loop, args=(args.url, stop, busy))
+    probe.start()
+    started = time.perf_counter()
+    pending = []
+    for _ in range(args.jobs):
+        status, reply = request(conn, 'POST', '/jobs', body, {'Content-Type': 'text/csv'})
+        if status != 202:
+            raise SystemExit(f"Submit failed ({status}): {reply.decode()[:200]}")
+        pending.append(json.loads(reply)['id'])
+    submitted = time.perf_counter() - started
+
+    finished = {}
+    while pending:
+        time.sleep(0.25)
+        for job_id in list(pending):
+            job = json.loads(request(conn, 'GET', f'/jobs/{job_id}')[1])
+            if job['state'] not in ('queued', 'running'):
+                finished[job_id] = job
+                pending.remove(job_id)
+    stop.set()
+    probe.join()
+
+    downloaded = 0
+    for job_id, job in finished.items():
+        if job['state'] != 'succeeded':
+            raise SystemExit(f"Job {job_id} {job['state']}: {job.get('error')}")
+        path = f'/jobs/{job_id}/result?format={args.format}'
+        if args.format == 'npy':
+            path += '&column=predicted_price'
+        downloaded += len(request(conn, 'GET', path)[1])
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    rates = [job['rows_per_second'] for job in finished.values()]
+    total_rows = args.jobs * args.rows
+    print(f"submit:   {submitted:.2f}s for {len(body) * args.jobs / 1e6:.1f} MB")
+    print(f"total:    {elapsed:.2f}s  {args.jobs / elapsed * 3600:,.0f} jobs/hour  "
+          f"{total_rows / elapsed:,.0f} rows/s  ({downloaded / 1e6:.1f} MB downloaded)")
+    print(f"scoring:  {min(rates):,.0f}-{max(rates):,.0f} rows/s per job")
+    print(f"/predict: idle p50 {percentile(idle, 0.5):.1f} ms p99 {percentile(idle, 0.99):.1f} ms, "
+          f"during jobs p50 {percentile(busy, 0.5):.1f} ms p99 {percentile(busy, 0.99):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
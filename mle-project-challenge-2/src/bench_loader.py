@@ -0,0 +1,87 @@
+"""
+Benchmark create_model.py training data loaders: pandas merge vs the
+chunked loader, by peak resident memory
+
+The sales file is grown by repeating kc_house_data.csv `copies` times, and
+each loader runs in a fresh process so peak RSS (ru_maxrss) is its own.
+
+Usage: python bench_loader.py [copies]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = '.' if os.path.exists('./create_model.py') else '..'
+sys.path.insert(0, PROJECT_DIR)
+
+LOADERS = ['merge', 'chunked', 'chunked-float32']
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def grow_sales(path, copies):
+    with open(os.path.join(PROJECT_DIR, 'data', 'kc_house_data.csv')) as f:
+        header = f.readline()
+        body = f.read()
+    with open(path, 'w') as f:
+        f.write(header)
+        for _ in range(copies):
+            f.write(body)
+
+
+def run_loader(loader, sales_path):
+    """Load in this process and print the measurements as JSON."""
+    import create_model
+
+    demographics_path = os.path.join(PROJECT_DIR, create_model.DEMOGRAPHICS_PATH)
+    columns = create_model.SALES_COLUMN_SELECTION
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    if loader == 'merge':
+        x, y = create_model.load_data(sales_path, demographics_path, columns)
+    else:
+        dtype = 'float32' if loader.endswith('float32') else 'float64'
+        x, y, _ = create_model.load_data_chunked(sales_path, demographics_path, columns,
+                                                 dtype=dtype)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "seconds": elapsed,
+        "rss_before_mb": before,
+        "peak_rss_mb": peak_rss_mb(),
+        "result_mb": (x.memory_usage(index=False).sum() + y.memory_usage(index=False))
+        / (1 << 20),
+        "rows": len(y),
+    }))
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--run':
+        run_loader(sys.argv[2], sys.argv[3])
+        return
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sales_path = os.path.join(tmp, 'sales.csv')
+        grow_sales(sales_path, copies)
+        size_mb = os.path.getsize(sales_path) / (1 << 20)
+        print(f"Sales file: kc_house_data.csv x{copies} ({size_mb:.0f} MB)")
+        print(f"{'loader':<16} {'rows':>10} {'seconds':>8} {'result MB':>10} "
+              f"{'peak RSS MB':>12} {'growth MB':>10} {'growth/result':>14}")
+        for loader in LOADERS:
+            output = subprocess.run([sys.executable, __file__, '--run', loader, sales_path],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            growth = result['peak_rss_mb'] - result['rss_before_mb']
+            print(f"{loader:<16} {result['rows']:>10} {result['seconds']:>8.1f} "
+                  f"{result['result_mb']:>10.0f} {result['peak_rss_mb']:>12.0f} "
+                  f"{growth:>10.0f} {growth / result['result_mb']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark demographics projections: served prediction time of model
+artifacts with and without `--demographic-components`, and for projected
+ones the time the artifact's own pipeline would take projecting every
+request instead of the demographics table once at load
+
+Usage: python bench_projection.py [batch_size] [model_dir ...]
+       (default: ../model only; e.g. ../model ../model/pca14 ../model/pca8)
+"""
+import os
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+from bench_validation import MODEL_DIR, load_examples
+from feature_plan import FeaturePlan
+from registry import ModelRegistry
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+REPEATS = 20
+
+
+def best_of(function, number):
+    return min(timeit.timeit(function, number=number) / number for _ in range(REPEATS))
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    model_dirs = sys.argv[2:] or [MODEL_DIR]
+    registry = ModelRegistry('.', os.path.join(DATA_DIR, 'zipcode_demographics.csv'))
+    houses = load_examples(batch_size)
+
+    print(f"{'model':<24} {'dims':>5} {'single ms':>10} {f'{batch_size} rows ms':>14} "
+          f"{'per-request projection single / batch ms':>42}")
+    reference = None
+    for model_dir in model_dirs:
+        entry = registry.load(model_dir, os.path.abspath(model_dir))
+        batch = entry.prepare_features_batch(houses)
+        predictions = entry.model.predict(batch)
+        if reference is None:
+            reference = predictions
+        single = best_of(lambda: entry.model.predict(batch[:1]), 200)
+        whole = best_of(lambda: entry.model.predict(batch), 3)
+        unsplit = ''
+        if entry.projection is not None:
+            # The artifact's pipeline on raw rows, projecting per call
+            artifact = entry.projection.full_model
+            plan = FeaturePlan(entry.model_features, entry.demographics.columns,
+                               entry.demographics.values, entry.dtype)
+            house_matrix, zipcodes = entry.predict_schema.validate_batch(houses)
+            rows = plan.assemble_batch(house_matrix,
+                                       entry.demographics.row_indices(zipcodes)[0])
+            assert np.allclose(artifact.predict(rows), predictions)
+            unsplit = (f"{best_of(lambda: artifact.predict(rows[:1]), 200) * 1000:.3f} / "
+                       f"{best_of(lambda: artifact.predict(rows), 3) * 1000:.1f}")
+        print(f"{model_dir:<24} {entry.model[-1].n_features_in_:>5} {single * 1000:>10.3f} "
+              f"{whole * 1000:>14.1f} {unsplit:>42}  "
+              f"max price change vs first {np.abs(predictions - reference).max():,.0f}")
+
+
+if __name__ == "__main__":
+    main()
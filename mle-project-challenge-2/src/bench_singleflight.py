@@ -0,0 +1,78 @@
+"""
+Benchmark in-flight deduplication: bursts of identical concurrent
+predictions from threads (the WSGI path) with and without SingleFlight
+
+Usage: python bench_singleflight.py [burst_size]
+"""
+import csv
+import os
+import sys
+import threading
+import time
+import warnings
+
+from prediction_cache import PredictionCache
+from registry import ModelRegistry
+from singleflight import SingleFlight
+
+BASE_DIR = '.' if os.path.exists('./model/model.pkl') else '..'
+BURSTS = 20
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class CountingModel:
+    """Counts model.predict calls."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, rows):
+        self.calls += 1
+        return self.model.predict(rows)
+
+
+def threaded_burst(entry, model, house, size, flight):
+    barrier = threading.Barrier(size)
+
+    def request():
+        barrier.wait()
+        features = entry.prepare_features(house)
+        if flight is None:
+            return model.predict(features)
+        return flight.do(PredictionCache.key(entry, features),
+                         lambda: model.predict(features))[0]
+
+    threads = [threading.Thread(target=request) for _ in range(size)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    registry = ModelRegistry(BASE_DIR, os.path.join(BASE_DIR, 'data', 'zipcode_demographics.csv'))
+    entry = registry.load('default', 'model')
+    with open(os.path.join(BASE_DIR, 'data', 'future_unseen_examples.csv')) as f:
+        houses = list(csv.DictReader(f))[:BURSTS]
+
+    print(f"{BURSTS} bursts of {size} identical concurrent requests")
+    print(f"{'dedup':<6} {'model calls':>12} {'ms/burst':>9} {'collapse':>9}")
+    for dedup in (False, True):
+        model = CountingModel(entry.model)
+        flight = SingleFlight() if dedup else None
+        elapsed = 0.0
+        for house in houses:
+            elapsed += threaded_burst(entry, model, house, size, flight)
+        ratio = f"{flight.collapse_ratio:.1%}" if flight else "-"
+        print(f"{'on' if dedup else 'off':<6} {model.calls:>12} "
+              f"{elapsed / len(houses) * 1000:>9.2f} {ratio:>9}")
+
+
+if __name__ == "__main__":
+    main()
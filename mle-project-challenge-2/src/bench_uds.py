@@ -0,0 +1,89 @@
+"""
+Benchmark co-located prediction calls: HTTP + JSON (keep-alive) vs the Unix
+domain socket binary protocol, for single houses and batches, against a
+running API started with UDS_PATH
+
+Usage: python bench_uds.py [--url http://localhost:5005]
+                           [--socket /tmp/soundrealty.sock] [--calls 500]
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from uds_client import PriceClient
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+BATCH_SIZE = 100
+
+
+def timed(fn, calls):
+    fn()
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default='http://localhost:5005')
+    parser.add_argument('--socket', default='/tmp/soundrealty.sock')
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, 'future_unseen_examples.csv')) as f:
+        houses = list(csv.DictReader(f))
+    batch = (houses * (BATCH_SIZE // len(houses) + 1))[:BATCH_SIZE]
+    parts = urlsplit(args.url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    client = PriceClient(args.socket)
+    headers = {'Content-Type': 'application/json'}
+
+    def http_post(path, body):
+        conn.request('POST', path, body, headers)
+        response = conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise SystemExit(f"{path}: HTTP {response.status} {data[:200]!r}")
+        return json.loads(data)
+
+    single_body = json.dumps(houses[0])
+    batch_body = json.dumps({"houses": batch})
+    # Rows are laid out by the caller once, outside the timed calls
+    single_rows = np.array([[float(houses[0][c]) for c in client.columns]])
+    batch_rows = np.array([[float(h[c]) for c in client.columns] for h in batch])
+
+    http_prices = http_post('/predict/batch', batch_body)["predicted_prices"]
+    uds_prices = client.predict_rows(batch_rows)
+    print(f"Same prices over both transports: "
+          f"{np.allclose(uds_prices, http_prices, atol=0.01)}")
+
+    cases = [
+        ("HTTP JSON", 1, lambda: http_post('/predict', single_body)),
+        ("UDS binary", 1, lambda: client.predict_rows(single_rows)),
+        ("UDS dicts", 1, lambda: client.predict([houses[0]])),
+        ("HTTP JSON", BATCH_SIZE, lambda: http_post('/predict/batch', batch_body)),
+        ("UDS binary", BATCH_SIZE, lambda: client.predict_rows(batch_rows)),
+    ]
+    print(f"{args.calls} calls each")
+    print(f"{'transport':<12} {'rows':>5} {'p50 us':>9} {'p99 us':>9} {'rows/s':>10}")
+    for name, rows, fn in cases:
+        latencies = timed(fn, args.calls)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"{name:<12} {rows:>5} {p50 * 1e6:>9.0f} {p99 * 1e6:>9.0f} "
+              f"{rows * len(latencies) / sum(latencies):>10.0f}")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark request validation: legacy per-key loop vs compiled RequestSchema
+
+Usage: python bench_validation.py [batch_size]
+"""
+import csv
+import json
+import os
+import sys
+import timeit
+
+from validation import RequestSchema
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+MODEL_DIR = './model' if os.path.exists('./model') else '../model'
+
+
+def legacy_normalize(house_data):
+    """The per-key coercion loop prepare_features used before RequestSchema."""
+    normalized_data = {}
+    for key, value in house_data.items():
+        if value is None:
+            normalized_data[key] = 0
+        elif key == 'zipcode':
+            normalized_data[key] = str(int(float(value)))
+        else:
+            try:
+                float_val = float(value)
+                normalized_data[key] = int(float_val) if float_val.is_integer() else float_val
+            except (ValueError, TypeError):
+                normalized_data[key] = 0
+    return normalized_data
+
+
+def load_examples(count):
+    """Load request bodies shaped like JSON payloads from future_unseen_examples.csv."""
+    with open(os.path.join(DATA_DIR, 'future_unseen_examples.csv')) as f:
+        rows = [{k: (v if k == 'zipcode' else float(v)) for k, v in row.items()}
+                for row in csv.DictReader(f)]
+    return [rows[i % len(rows)] for i in range(count)]
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with open(os.path.join(MODEL_DIR, 'model_features.json')) as f:
+        model_features = json.load(f)
+    houses = load_examples(batch_size)
+    house_fields = [f for f in model_features if f in houses[0] and f != 'zipcode']
+    schema = RequestSchema(house_fields)
+
+    cases = {
+        "legacy per-key loop": lambda: [legacy_normalize(h) for h in houses],
+        "compiled schema, per row": lambda: [schema.validate(h) for h in houses],
+        "compiled schema, batch": lambda: schema.validate_batch(houses),
+    }
+    print(f"Validating {batch_size} houses ({len(houses[0])} fields each)")
+    baseline = None
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=10, repeat=5)) / 10
+        baseline = baseline or seconds
+        print(f"{name:<28} {seconds * 1000:8.3f} ms  "
+              f"{seconds / batch_size * 1e6:7.2f} us/row  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
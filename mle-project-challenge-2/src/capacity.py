@@ -0,0 +1,141 @@
+"""
+Request capacity limiting for Sound Realty House Price Prediction API
+
+Prediction requests pass through a limiter that runs at most
+`max_concurrent` at a time. Further requests wait in a bounded queue and are
+shed (503) once `max_queue` are already waiting or after `queue_timeout`
+seconds. The in-flight and queued counts drive /ready, /health and the
+metrics, so load balancers and autoscalers see the replica's real capacity.
+"""
+import math
+import os
+import threading
+
+# cgroup v2, then v1 CPU quota files of the container
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read_quota():
+    """CPU quota of the container in CPUs, or None if unlimited or unknown."""
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == 'max' else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(CGROUP_V1_QUOTA) as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_PERIOD) as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus():
+    """CPUs this process may use.
+
+    The cgroup CPU quota (rounded up) when one is set, else the CPUs in the
+    affinity mask: os.cpu_count() reports the node's cores even inside a
+    CPU-limited container.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _read_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+class CapacityLimiter:
+    """Bounded concurrency with a bounded wait queue."""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout=1.0,
+                 ready_queue_depth=None):
+        """
+        Args:
+            max_concurrent: requests processed at the same time
+            max_queue: requests allowed to wait; more are shed immediately
+            queue_timeout: seconds a request may wait before it is shed
+            ready_queue_depth: queue depth at which the replica reports not
+                ready so traffic moves elsewhere (default: half of max_queue)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.ready_queue_depth = ready_queue_depth if ready_queue_depth is not None \
+            else max(max_queue // 2, 1)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted = 0
+        self.shed = 0
+        # Turned away but answered from a fallback rather than rejected
+        self.degraded = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None, fallback=False):
+        """Wait for a slot; False if the request should be shed.
+
+        Args:
+            timeout: longest wait in seconds (default queue_timeout)
+            fallback: the caller may answer degraded instead of rejecting the
+                request; a failure is then left for it to count with
+                `turned_away` once it knows which it did
+        """
+        with self._cond:
+            if self.in_flight < self.max_concurrent:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if self.queue_depth >= self.max_queue:
+                if not fallback:
+                    self.turned_away()
+                return False
+            self.queue_depth += 1
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: self.in_flight < self.max_concurrent,
+                    self.queue_timeout if timeout is None else timeout)
+            finally:
+                self.queue_depth -= 1
+            if not admitted:
+                if not fallback:
+                    self.turned_away()
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def turned_away(self, degraded=False):
+        """Count a request that got no slot: answered degraded, or shed."""
+        with self._cond:
+            if degraded:
+                self.degraded += 1
+            else:
+                self.shed += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    @property
+    def saturated(self):
+        """True while the queue is deep enough to stop taking new traffic."""
+        return self.queue_depth >= self.ready_queue_depth
+
+    def snapshot(self):
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "saturated": self.saturated,
+            "shed": self.shed,
+            "degraded": self.degraded,
+        }
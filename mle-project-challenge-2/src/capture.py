@@ -0,0 +1,176 @@
+"""
+Traffic capture for Sound Realty House Price Prediction API
+
+Samples prediction requests (arrival time, path and query, routing headers,
+raw body) into rotating binary files for replay.py. The request thread only
+puts a record on a bounded queue; a background thread does all file I/O, and
+records arriving while the queue is full are dropped and counted rather than
+slowing the request down.
+
+File layout: the MAGIC header, then one record after another, each a
+RECORD_HEADER (arrival time as float64 Unix seconds, then the byte lengths
+of target, headers and body) followed by those three byte strings. Headers
+are "Name: value" lines.
+"""
+import atexit
+import glob
+import os
+import queue
+import random
+import struct
+import threading
+import time
+from collections import namedtuple
+
+MAGIC = b'SRCAP\x01'
+RECORD_HEADER = struct.Struct('<dHHI')
+# Headers that change how a request is routed, admitted or answered
+# (model choice, A/B key, nginx hash key, latency budget), replayed verbatim
+CAPTURED_HEADERS = ('Content-Type', 'X-Model-Name', 'X-Split-Key', 'X-House-Key',
+                    'X-Latency-Budget-Ms')
+
+CapturedRequest = namedtuple('CapturedRequest', 'timestamp method target headers body')
+
+
+class TrafficCapture:
+    """Non-blocking sampled request capture into rotating files."""
+
+    def __init__(self, directory, sample_rate=1.0, max_buffer=1024,
+                 max_file_bytes=64 << 20, max_files=10):
+        """
+        Args:
+            directory: where capture files are written (created if missing)
+            sample_rate: fraction of requests captured
+            max_buffer: records queued for the writer before new ones are dropped
+            max_file_bytes: size at which the writer starts a new file
+            max_files: files kept per process; the oldest are deleted
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.files = 0
+        self._count_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._prefix = f"capture-{os.getpid()}-"
+        self._file = None
+        self._file_bytes = 0
+        self._writer = threading.Thread(target=self._run, name="traffic-capture",
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def maybe_capture(self, method, target, headers, body):
+        """Sample one request and queue it for the writer without blocking.
+
+        Args:
+            method: HTTP method
+            target: path with query string
+            headers: mapping the CAPTURED_HEADERS are read from
+            body: raw request body bytes
+        """
+        if random.random() >= self.sample_rate:
+            return False
+        header_lines = '\n'.join(f"{name}: {headers[name]}" for name in CAPTURED_HEADERS
+                                 if headers.get(name))
+        # Lengths are stored as uint16; real targets and headers are far shorter
+        record = (time.time(), f"{method} {target}".encode()[:0xFFFF],
+                  header_lines.encode()[:0xFFFF], body)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return False
+        with self._count_lock:
+            self.captured += 1
+        return True
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            # Drain whatever else is queued before one flush
+            while record is not None:
+                self._write(record)
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if self._file is not None:
+                self._file.flush()
+            if record is None:
+                return
+
+    def _write(self, record):
+        timestamp, target, header_lines, body = record
+        if self._file is None or self._file_bytes >= self.max_file_bytes:
+            self._rotate()
+        data = RECORD_HEADER.pack(timestamp, len(target), len(header_lines), len(body)) \
+            + target + header_lines + body
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self.written += 1
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+        path = os.path.join(self.directory, f"{self._prefix}{stamp}-{self.files:05d}.bin")
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file_bytes = len(MAGIC)
+        self.files += 1
+        # Names sort by creation time within a process
+        own = sorted(glob.glob(os.path.join(self.directory, f"{self._prefix}*.bin")))
+        for old in own[:-self.max_files]:
+            os.remove(old)
+
+    def close(self, timeout=5.0):
+        """Write out queued records and close the current file."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def buffered_bytes(self):
+        """Bytes of target, headers and body queued for the writer."""
+        with self._queue.mutex:
+            return sum(len(r[1]) + len(r[2]) + len(r[3]) for r in self._queue.queue if r)
+
+    def summary(self):
+        return {
+            "directory": self.directory,
+            "sample_rate": self.sample_rate,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "written": self.written,
+            "files": self.files,
+        }
+
+
+def read_capture(path):
+    """Yield the CapturedRequest records of one capture file.
+
+    A record cut short by a crash ends the file instead of raising.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp, target_len, headers_len, body_len = RECORD_HEADER.unpack(header)
+            payload = f.read(target_len + headers_len + body_len)
+            if len(payload) < target_len + headers_len + body_len:
+                return
+            method, _, target = payload[:target_len].decode().partition(' ')
+            header_lines = payload[target_len:target_len + headers_len].decode()
+            headers = dict(line.split(': ', 1) for line in header_lines.split('\n') if line)
+            yield CapturedRequest(timestamp, method, target, headers,
+                                  payload[target_len + headers_len:])
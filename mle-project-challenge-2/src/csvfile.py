@@ -0,0 +1,29 @@
+"""
+CSV file helpers for Sound Realty House Price Prediction
+
+Shared by the training script (sizing its preallocated feature matrix) and
+the scoring jobs (sizing their result columns): both count the rows of a
+large CSV file before parsing it.
+"""
+import csv
+
+
+def count_rows(path, block_size=1 << 20):
+    """Count the data rows of a CSV file (excluding the header) by streaming it."""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    # A last line without a newline still counts
+    return max(lines + (last != b'\n') - 1, 0)
+
+
+def read_header(path):
+    """Column names of a CSV file's first line."""
+    with open(path, newline='') as f:
+        return next(csv.reader(f), [])
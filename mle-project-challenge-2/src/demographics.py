@@ -0,0 +1,78 @@
+"""
+Zipcode demographics table for Sound Realty House Price Prediction API
+
+Holds the demographics as a float matrix with one row per zipcode, loaded from
+the binary file written by create_model.py or from the raw CSV, in the
+floating point type of the model that uses it. Zipcodes map to rows through a
+direct-address table spanning the smallest to the largest zipcode (King
+County's 70 zipcodes span 199 values), so lookups are an offset and an index.
+"""
+import numpy as np
+
+# Direct-address slot of a zipcode with no demographics row
+NO_ROW = -1
+
+
+class DemographicsTable:
+    """Demographics matrix with a zipcode -> row lookup."""
+
+    def __init__(self, columns, zipcodes, values, dtype=np.float64):
+        self.columns = list(columns)
+        self.zipcodes = np.array([int(z) for z in zipcodes], dtype=np.int64)
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+
+        self.base = int(self.zipcodes.min()) if len(self.zipcodes) else 0
+        span = int(self.zipcodes.max()) - self.base + 1 if len(self.zipcodes) else 0
+        self.span = span
+        self.slots = np.full(span, NO_ROW, dtype=np.int32)
+        self.slots[self.zipcodes - self.base] = np.arange(len(self.zipcodes))
+        # Python ints for single lookups: indexing a list allocates nothing
+        self._slot_list = self.slots.tolist()
+
+    def __len__(self):
+        return len(self.zipcodes)
+
+    def row_index(self, zipcode):
+        """Return the row for an integer zipcode, or None if unknown."""
+        offset = zipcode - self.base
+        if 0 <= offset < self.span:
+            row = self._slot_list[offset]
+            if row >= 0:
+                return row
+        return None
+
+    def row_indices(self, zipcodes):
+        """Look up a batch of integer zipcodes.
+
+        Returns:
+            Tuple of (row index array, list of positions with unknown zipcodes)
+        """
+        offsets = np.asarray(zipcodes, dtype=np.int64) - self.base
+        in_range = (offsets >= 0) & (offsets < self.span)
+        rows = self.slots.take(np.where(in_range, offsets, 0)).astype(np.intp)
+        missing = ~in_range | (rows == NO_ROW)
+        unknown = np.flatnonzero(missing).tolist()
+        if unknown:
+            rows[missing] = 0
+        return rows, unknown
+
+    @property
+    def nbytes(self):
+        """Memory held by the table arrays."""
+        return self.values.nbytes + self.zipcodes.nbytes + self.slots.nbytes
+
+
+def load_demographics_binary(path, dtype=np.float64):
+    """Load the demographics table written by create_model.py."""
+    with np.load(path, allow_pickle=False) as data:
+        return DemographicsTable(data['columns'], data['zipcodes'], data['values'],
+                                 dtype)
+
+
+def load_demographics_csv(path, dtype=np.float64):
+    """Load the demographics table from the raw CSV (imports pandas)."""
+    import pandas as pd
+    frame = pd.read_csv(path, dtype={'zipcode': str})
+    zipcodes = list(frame.pop('zipcode'))
+    return DemographicsTable(frame.columns, zipcodes, frame.to_numpy(dtype=np.float64),
+                             dtype)
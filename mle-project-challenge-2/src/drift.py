@@ -0,0 +1,178 @@
+"""
+Streaming input and prediction drift monitoring for Sound Realty House Price
+Prediction API
+
+Each monitored feature keeps a fixed-size histogram over the quantile bins of
+the training reference profile written by create_model.py, so memory is
+constant and an observation costs one bisect per feature. Zipcodes are counted
+over the reference zipcode set plus an "other" bucket. PSI and KS-style scores
+against the reference are recomputed at most every `interval` seconds.
+"""
+import bisect
+import math
+import threading
+import time
+
+import numpy as np
+
+# Floor for empty bins so PSI stays finite
+EPSILON = 1e-4
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+OTHER_ZIPCODES = 'other'
+
+
+def psi(current, reference):
+    """Population stability index between two proportion vectors."""
+    total = 0.0
+    for p, q in zip(current, reference):
+        p = max(p, EPSILON)
+        q = max(q, EPSILON)
+        total += (p - q) * math.log(p / q)
+    return total
+
+
+def ks_distance(current, reference):
+    """Maximum gap between the binned cumulative distributions."""
+    gap = 0.0
+    cum_p = cum_q = 0.0
+    for p, q in zip(current, reference):
+        cum_p += p
+        cum_q += q
+        gap = max(gap, abs(cum_p - cum_q))
+    return gap
+
+
+def drift_status(score):
+    if score >= PSI_SIGNIFICANT:
+        return "significant"
+    if score >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+class _Histogram:
+    __slots__ = ('edges', 'reference', 'counts')
+
+    def __init__(self, edges, reference):
+        self.edges = list(edges)
+        self.reference = list(reference)
+        self.counts = [0.0] * (len(self.edges) + 1)
+
+
+class DriftMonitor:
+    """Constant-memory drift monitor for one model."""
+
+    def __init__(self, profile, model_features, interval=60.0, decay=1.0):
+        """
+        Args:
+            profile: reference profile written by create_model.py
+            model_features: column order of the model input rows observed
+            interval: seconds between drift score recomputations
+            decay: factor applied to all counts after each recomputation
+                (1.0 keeps counts since startup; <1 favours recent traffic)
+        """
+        self.interval = interval
+        self.decay = decay
+        self.features = []
+        self._feature_slots = []
+        for slot, field in enumerate(model_features):
+            if field in profile.get('features', {}):
+                ref = profile['features'][field]
+                self.features.append((field, _Histogram(ref['edges'], ref['proportions'])))
+                self._feature_slots.append(slot)
+        ref = profile['prediction']
+        self.prediction = _Histogram(ref['edges'], ref['proportions'])
+
+        self.zipcode_names = sorted(profile.get('zipcodes', {})) + [OTHER_ZIPCODES]
+        self._zipcode_slot = {int(z): i for i, z in enumerate(self.zipcode_names[:-1])}
+        self.zipcode_reference = [profile['zipcodes'][z] for z in self.zipcode_names[:-1]] + [0.0]
+        self.zipcode_counts = [0.0] * len(self.zipcode_names)
+
+        self.observations = 0
+        self._lock = threading.Lock()
+        self._scores = None
+        self._scored_at = 0.0
+
+    def observe(self, features, zipcode, prediction):
+        """Record one request.
+
+        Args:
+            features: model input row (1-D) in `model_features` order
+            zipcode: validated zipcode as sent in the request
+            prediction: predicted price
+        """
+        house_values = features.tolist()
+        zipcode = int(float(zipcode))
+        with self._lock:
+            for slot, (_, hist) in zip(self._feature_slots, self.features):
+                hist.counts[bisect.bisect_right(hist.edges, house_values[slot])] += 1
+            hist = self.prediction
+            hist.counts[bisect.bisect_right(hist.edges, prediction)] += 1
+            self.zipcode_counts[self._zipcode_slot.get(zipcode, -1)] += 1
+            self.observations += 1
+
+    def observe_batch(self, features, zipcodes, predictions):
+        """Record a batch with one vectorised pass per feature."""
+        zipcodes = np.asarray(zipcodes, dtype=np.float64).astype(np.int64)
+        updates = []
+        for slot, (_, hist) in zip(self._feature_slots, self.features):
+            updates.append(self._bincount(hist, features[:, slot]))
+        prediction_update = self._bincount(self.prediction, predictions)
+        zip_slots = [self._zipcode_slot.get(z, len(self.zipcode_names) - 1)
+                     for z in zipcodes.tolist()]
+        zip_update = np.bincount(zip_slots, minlength=len(self.zipcode_names))
+
+        with self._lock:
+            for (_, hist), update in zip(self.features, updates):
+                hist.counts = [c + u for c, u in zip(hist.counts, update.tolist())]
+            self.prediction.counts = [c + u for c, u in
+                                      zip(self.prediction.counts, prediction_update.tolist())]
+            self.zipcode_counts = [c + u for c, u in
+                                   zip(self.zipcode_counts, zip_update.tolist())]
+            self.observations += len(zipcodes)
+
+    @staticmethod
+    def _bincount(hist, values):
+        bins = np.searchsorted(hist.edges, values, side='right')
+        return np.bincount(bins, minlength=len(hist.counts))
+
+    def scores(self, force=False):
+        """Drift scores per feature, for predictions and for zipcodes."""
+        now = time.monotonic()
+        if not force and self._scores is not None and now - self._scored_at < self.interval:
+            return self._scores
+
+        with self._lock:
+            snapshot = [(name, hist.counts[:], hist.reference) for name, hist in self.features]
+            prediction = (self.prediction.counts[:], self.prediction.reference)
+            zipcodes = (self.zipcode_counts[:], self.zipcode_reference)
+            observations = self.observations
+            # Only the periodic recomputation ages the counts
+            if self.decay < 1.0 and not force:
+                for _, hist in self.features:
+                    hist.counts = [c * self.decay for c in hist.counts]
+                self.prediction.counts = [c * self.decay for c in self.prediction.counts]
+                self.zipcode_counts = [c * self.decay for c in self.zipcode_counts]
+
+        self._scores = {
+            "observations": observations,
+            "features": {name: self._score(counts, reference)
+                         for name, counts, reference in snapshot},
+            "prediction": self._score(*prediction),
+            "zipcode": self._score(*zipcodes, ks=False),
+        }
+        self._scored_at = now
+        return self._scores
+
+    @staticmethod
+    def _score(counts, reference, ks=True):
+        total = sum(counts)
+        if total == 0:
+            return {"count": 0}
+        current = [c / total for c in counts]
+        score = psi(current, reference)
+        result = {"count": round(total, 3), "psi": score, "status": drift_status(score)}
+        if ks:
+            result["ks"] = ks_distance(current, reference)
+        return result
@@ -0,0 +1,112 @@
+"""
+Degraded-mode price fallback for Sound Realty House Price Prediction API
+
+create_model.py writes the median sale price of every zipcode and living
+area bucket of the training sales. When a request's latency budget cannot
+cover the KNN path (no capacity slot in time, or too little time left for
+a typical model call), the API answers from this table instead: a sorted
+zipcode search and a bucket search, microseconds per house. LatencyEstimate
+tracks what a model call currently costs so the API can decide before
+starting one.
+"""
+import os
+import threading
+
+import numpy as np
+
+FALLBACK_FILE = 'fallback_prices.npz'
+
+
+def load_fallback(model_dir):
+    """Load the model's fallback price table, or return None if absent."""
+    path = os.path.join(model_dir, FALLBACK_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return FallbackTable(**{name: data[name] for name in data.files})
+
+
+class FallbackTable:
+    """Median sale prices by zipcode and living area bucket."""
+
+    def __init__(self, zipcodes, edges, prices, zipcode_prices, counts):
+        """
+        Args:
+            zipcodes: sorted zipcodes with training sales
+            edges: sqft_living bucket boundaries (bucket i is
+                edges[i-1] <= sqft < edges[i])
+            prices: (len(zipcodes) + 1, len(edges) + 1) median prices; the
+                last row holds the bucket medians over all zipcodes
+            zipcode_prices: median price of each zipcode, then of all sales
+            counts: training sales behind each zipcode and bucket median
+        """
+        self.zipcodes = np.asarray(zipcodes, dtype=np.int64)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.zipcode_prices = np.asarray(zipcode_prices, dtype=np.float64)
+        self.counts = np.asarray(counts)
+
+    def __len__(self):
+        return len(self.zipcodes)
+
+    def lookup(self, zipcodes, sqft_living):
+        """Fallback prices for houses.
+
+        Args:
+            zipcodes: integer zipcodes; zipcodes without training sales use
+                the all-zipcode medians
+            sqft_living: living areas; NaN (not given) uses the zipcode's
+                median over all sizes
+
+        Returns:
+            float64 array of prices
+        """
+        zipcodes = np.asarray(zipcodes, dtype=np.int64)
+        sqft_living = np.asarray(sqft_living, dtype=np.float64)
+        rows = np.searchsorted(self.zipcodes, zipcodes)
+        rows[rows == len(self.zipcodes)] = 0
+        rows[self.zipcodes[rows] != zipcodes] = len(self.zipcodes)
+        buckets = np.searchsorted(self.edges, np.nan_to_num(sqft_living), side='right')
+        return np.where(np.isnan(sqft_living), self.zipcode_prices[rows],
+                        self.prices[rows, buckets])
+
+
+class LatencyEstimate:
+    """Moving estimate of model call time as fixed cost plus cost per row."""
+
+    def __init__(self, alpha=0.05):
+        """
+        Args:
+            alpha: weight of each new observation in the moving averages;
+                the first 1/alpha observations of each kind are averaged
+                evenly so a slow cold first call does not linger
+        """
+        self.alpha = alpha
+        self.fixed = None
+        self.per_row = 0.0
+        self.single_calls = 0
+        self.batch_calls = 0
+        self._lock = threading.Lock()
+
+    def observe(self, rows, seconds):
+        """Record a model call over `rows` houses that took `seconds`."""
+        with self._lock:
+            if rows == 1:
+                self.single_calls += 1
+                weight = max(self.alpha, 1 / self.single_calls)
+                self.fixed = seconds if self.fixed is None else \
+                    self.fixed + weight * (seconds - self.fixed)
+                return
+            if self.fixed is None:
+                # No single-house call yet: split the call evenly
+                self.fixed = seconds / 2
+            self.batch_calls += 1
+            weight = max(self.alpha, 1 / self.batch_calls)
+            per_row = max(seconds - self.fixed, 0.0) / (rows - 1)
+            self.per_row += weight * (per_row - self.per_row)
+
+    def expected(self, rows=1):
+        """Expected seconds for a call over `rows` houses; 0 before any call."""
+        if self.fixed is None:
+            return 0.0
+        return self.fixed + self.per_row * (rows - 1)
@@ -0,0 +1,85 @@
+"""
+Fast-startup helpers for Sound Realty House Price Prediction API
+
+Phase timing and lazily initialised Swagger docs, so a fresh pod only pays for
+what the prediction hot path needs.
+"""
+import time
+import threading
+
+# URL prefixes served by flasgger
+DOCS_PREFIXES = ('/apidocs', '/apispec', '/flasgger_static')
+
+
+class PhaseTimer:
+    """Record wall-clock duration of named startup phases."""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases = {}
+
+    def phase(self, name):
+        """Context manager timing one phase."""
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        self.phases[name] = round(seconds * 1000, 2)
+
+    def report(self):
+        """Return phase timings in milliseconds."""
+        return dict(self.phases)
+
+    def log_line(self):
+        parts = ", ".join(f"{k}={v:.1f}ms" for k, v in self.phases.items())
+        return f"Startup phases: {parts}"
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class LazySwagger:
+    """WSGI middleware that builds the Swagger UI on the first docs request.
+
+    flasgger cannot be attached to an app that is already serving, so the docs
+    are served from a separate Flask app that mirrors the main app's routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.docs_app = None
+        self._lock = threading.Lock()
+
+    def _build_docs_app(self):
+        from flask import Flask
+        from flasgger import Swagger
+
+        docs_app = Flask(self.app.import_name)
+        for rule in self.app.url_map.iter_rules():
+            if rule.endpoint == 'static':
+                continue
+            docs_app.add_url_rule(rule.rule, rule.endpoint,
+                                  self.app.view_functions[rule.endpoint],
+                                  methods=rule.methods)
+        Swagger(docs_app)
+        return docs_app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(DOCS_PREFIXES):
+            if self.docs_app is None:
+                with self._lock:
+                    if self.docs_app is None:
+                        self.docs_app = self._build_docs_app()
+            return self.docs_app.wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,78 @@
+"""
+Precompiled feature plan for Sound Realty House Price Prediction
+
+Maps request fields and zipcode demographics onto the model's column order
+once at startup, so the hot path only fills a preallocated numpy row.
+"""
+import numpy as np
+
+
+class FeaturePlan:
+    """Column layout for assembling model input rows."""
+
+    def __init__(self, model_features, demographic_columns, demographic_values,
+                 dtype=np.float64):
+        """Compile the plan.
+
+        Args:
+            model_features: feature names in the order the model was trained on
+            demographic_columns: column names of the demographics table
+            demographic_values: 2-D array of demographics, one row per zipcode
+            dtype: floating point type of the assembled rows
+        """
+        self.dtype = np.dtype(dtype)
+        demographic_position = {name: i for i, name in enumerate(demographic_columns)}
+
+        self.model_features = list(model_features)
+        self.n_features = len(self.model_features)
+
+        # Demographics win over request fields with the same name, as before
+        self.house_fields = [f for f in self.model_features
+                             if f not in demographic_position]
+        self.house_slots = np.array([self.model_features.index(f)
+                                     for f in self.house_fields], dtype=np.intp)
+        self.demographic_slots = np.array(
+            [i for i, f in enumerate(self.model_features) if f in demographic_position],
+            dtype=np.intp)
+        demographic_source = np.array(
+            [demographic_position[f] for f in self.model_features
+             if f in demographic_position], dtype=np.intp)
+
+        # Reorder the demographics table once so a lookup is a single row copy;
+        # when the model uses every column in table order the table is shared
+        demographic_values = np.asarray(demographic_values, dtype=self.dtype)
+        if np.array_equal(demographic_source, np.arange(demographic_values.shape[1])):
+            self.demographic_rows = demographic_values
+        else:
+            self.demographic_rows = np.ascontiguousarray(
+                demographic_values[:, demographic_source])
+
+    def assemble(self, house_values, demographic_row):
+        """Build a single model input row.
+
+        Args:
+            house_values: numbers in `house_fields` order
+            demographic_row: row index into the demographics table
+
+        Returns:
+            Array of shape (1, n_features) in model column order
+        """
+        row = np.zeros((1, self.n_features), dtype=self.dtype)
+        row[0, self.house_slots] = house_values
+        row[0, self.demographic_slots] = self.demographic_rows[demographic_row]
+        return row
+
+    def assemble_batch(self, house_matrix, demographic_rows):
+        """Build model input rows for a batch.
+
+        Args:
+            house_matrix: array of shape (n, len(house_fields))
+            demographic_rows: integer array of demographics row indices
+
+        Returns:
+            Array of shape (n, n_features) in model column order
+        """
+        rows = np.empty((len(demographic_rows), self.n_features), dtype=self.dtype)
+        rows[:, self.house_slots] = house_matrix
+        rows[:, self.demographic_slots] = self.demographic_rows[demographic_rows]
+        return rows
@@ -0,0 +1,74 @@
+"""
+Geospatial candidate index for Sound Realty House Price Prediction API
+
+A uniform lat/long grid over the training sales, written by create_model.py
+as CSR arrays: training rows sorted by cell and the offset of each cell's
+first row. Cells of one grid row are consecutive, so the candidates around a
+query are one slice per grid row followed by an exact radius check.
+"""
+import math
+import os
+
+import numpy as np
+
+GEO_INDEX_FILE = 'geo_index.npz'
+KM_PER_DEGREE = 111.195
+
+
+def load_geo_index(model_dir):
+    """Load the model's geo index, or return None if absent."""
+    path = os.path.join(model_dir, GEO_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return GeoIndex(**{name: data[name] for name in data.files})
+
+
+class GeoIndex:
+    """Grid of training rows by location."""
+
+    def __init__(self, lat, long, origin, step, shape, cell_start, rows):
+        """
+        Args:
+            lat, long: location of each training row, in training order
+            origin: (lat, long) of the grid's south-west corner
+            step: (lat, long) size of a cell in degrees
+            shape: (n_lat, n_long) number of cells
+            cell_start: offsets into `rows` of each cell, plus the total
+            rows: training row numbers sorted by cell
+        """
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.long = np.asarray(long, dtype=np.float64)
+        self.lat0, self.long0 = (float(v) for v in origin)
+        self.lat_step, self.long_step = (float(v) for v in step)
+        self.n_lat, self.n_long = (int(v) for v in shape)
+        self.cell_start = np.asarray(cell_start)
+        self.rows = np.asarray(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def candidates(self, lat, long, radius_km):
+        """Training rows within `radius_km` of a location.
+
+        Returns:
+            Integer array of training row numbers (unordered)
+        """
+        lat_radius = radius_km / KM_PER_DEGREE
+        long_radius = lat_radius / max(math.cos(math.radians(lat)), 1e-6)
+        i0 = max(int((lat - lat_radius - self.lat0) // self.lat_step), 0)
+        i1 = min(int((lat + lat_radius - self.lat0) // self.lat_step), self.n_lat - 1)
+        j0 = max(int((long - long_radius - self.long0) // self.long_step), 0)
+        j1 = min(int((long + long_radius - self.long0) // self.long_step), self.n_long - 1)
+        if i0 > i1 or j0 > j1:
+            return self.rows[:0]
+
+        # One contiguous run of cells per grid row
+        starts = self.cell_start[np.arange(i0, i1 + 1) * self.n_long + j0]
+        ends = self.cell_start[np.arange(i0, i1 + 1) * self.n_long + j1 + 1]
+        rows = np.concatenate([self.rows[a:b] for a, b in zip(starts.tolist(), ends.tolist())])
+
+        # Equirectangular distance is exact enough at a few km
+        dy = (self.lat[rows] - lat) * KM_PER_DEGREE
+        dx = (self.long[rows] - long) * KM_PER_DEGREE * math.cos(math.radians(lat))
+        return rows[dx * dx + dy * dy <= radius_km * radius_km]
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for the Sound Realty House Price Prediction API image
+
+Each worker process imports app_production and loads its own models and
+warmup (about 170 MB RSS per worker with the default model), so the default
+is one worker per CPU of the container's cgroup quota, not of the node.
+Workers also split the capacity limiter and the prediction cache: the
+manifests run one worker with threads per CPU-limited replica.
+
+Threaded workers keep idle HTTP/1.1 connections open so nginx's upstream
+keep-alive pool can reuse them (Flask's built-in server closes every
+connection after one response).
+
+With UDS_PATH set, the master binds the binary protocol's Unix socket once
+and every worker accepts on the inherited descriptor (UDS_FD).
+
+Usage: gunicorn -c gunicorn.conf.py app_production:app
+"""
+import os
+
+from capacity import available_cpus
+from uds import bind_unix_socket
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5005')}"
+# Exported so each worker's default MAX_CONCURRENT divides the CPUs
+workers = int(os.environ.setdefault('WEB_WORKERS', str(available_cpus())))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '4'))
+# Longer than nginx's upstream keepalive_timeout, so nginx closes idle
+# connections first and never sends on one gunicorn just closed
+keepalive = int(os.environ.get('WEB_KEEPALIVE_SECONDS', '75'))
+timeout = 30
+graceful_timeout = 10
+
+
+def on_starting(server):
+    path = os.environ.get('UDS_PATH')
+    if path:
+        # Kept open by the master for the workers it forks
+        server.uds_socket = bind_unix_socket(path)
+        os.environ['UDS_FD'] = str(server.uds_socket.fileno())
@@ -0,0 +1,483 @@
+"""
+Asynchronous batch scoring jobs for Sound Realty House Price Prediction API
+
+Scoring requests too large for one HTTP call are submitted as jobs. The input
+(a CSV file or JSON houses) is stored in a job directory and scored by a
+bounded pool of background processes, one chunk of rows at a time: each
+chunk's columns are validated as arrays, joined to the demographics by
+zipcode with one table lookup and predicted with one model call. Results
+are columnar .npy files, one per column (`predicted_price`, `valid`, and
+`id` when the input has ids), filled in place as chunks finish.
+
+All job state lives on disk (job.json, written atomically and updated
+under a per-job file lock), so every API worker sharing the job directory
+can report, stream or cancel any job. Cancellation is a marker file the
+scoring process checks between chunks. Active jobs hold a lease that the
+scoring process and the accepting worker keep renewing; a job whose lease
+ran out has lost both and is failed by whichever worker notices. The ids of
+active jobs are also entries of an index directory, so the active count is
+one directory listing rather than a read of every job.
+"""
+import atexit
+import contextlib
+import csv
+import datetime
+import fcntl
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from csvfile import count_rows, read_header
+from validation import ZIPCODE_FIELD, describe_row, parse_csv_column
+
+JOB_FILE = 'job.json'
+LOCK_FILE = 'job.lock'
+INPUT_FILE = 'input.csv'
+CANCEL_FILE = 'cancel'
+# Directory under the root with an empty file per queued or running job
+ACTIVE_DIR = 'active'
+ACTIVE_STATES = ('queued', 'running')
+STATES = ACTIVE_STATES + ('succeeded', 'failed', 'cancelled')
+RESULT_COLUMNS = [('predicted_price', np.float64), ('valid', np.bool_)]
+ID_COLUMN = ('id', np.int64)
+# Row errors kept in job.json; the `valid` column marks every invalid row
+MAX_RECORDED_ERRORS = 100
+JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def write_records(path, records):
+    """Write a list of house dicts as CSV, columns in first-seen order."""
+    fields = list(dict.fromkeys(key for record in records for key in record))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+class JobStore:
+    """Job directories under one root, shared by every API worker."""
+
+    def __init__(self, root, lease_seconds=60):
+        """
+        Args:
+            root: directory holding one directory per job
+            lease_seconds: how long an active job survives without its
+                lease being renewed before expire() fails it
+        """
+        os.makedirs(os.path.join(root, ACTIVE_DIR), exist_ok=True)
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self._pruned_at = 0.0
+
+    def path(self, job_id, name=''):
+        """Path in a job's directory; KeyError for a malformed job id."""
+        if not JOB_ID.match(job_id):
+            raise KeyError(job_id)
+        return os.path.join(self.root, job_id, name)
+
+    def _active_path(self, job_id):
+        return os.path.join(self.root, ACTIVE_DIR, job_id)
+
+    def create(self, model, model_version, write_input):
+        """Create a queued job whose input is written by write_input(path)."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.path(job_id))
+        try:
+            write_input(self.path(job_id, INPUT_FILE))
+        except Exception:
+            shutil.rmtree(self.path(job_id), ignore_errors=True)
+            raise
+        job = {"id": job_id, "model": model, "model_version": model_version,
+               "state": "queued", "submitted_at": _now(),
+               "lease_expires_at": time.time() + self.lease_seconds,
+               "rows": None, "rows_done": 0, "invalid_rows": 0}
+        self.write(job)
+        open(self._active_path(job_id), 'w').close()
+        return job
+
+    def read(self, job_id):
+        """The job's record, or None if unknown."""
+        try:
+            with open(self.path(job_id, JOB_FILE)) as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return None
+
+    def write(self, job):
+        path = self.path(job['id'], JOB_FILE)
+        fd, tmp = tempfile.mkstemp(prefix=JOB_FILE, dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(job, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @contextlib.contextmanager
+    def _locked(self, job_id):
+        with open(self.path(job_id, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _modify(self, job_id, change):
+        """Apply change(job) -> fields (None for no write) under the job's lock.
+
+        Finished jobs are immutable, so a late progress write or failure
+        report cannot overwrite a cancellation. Writes to active jobs renew
+        their lease.
+        """
+        with self._locked(job_id):
+            job = self.read(job_id)
+            fields = change(job) if job is not None and job['state'] in ACTIVE_STATES else None
+            if fields is not None:
+                job.update(fields)
+                if job['state'] in ACTIVE_STATES:
+                    job['lease_expires_at'] = time.time() + self.lease_seconds
+                self.write(job)
+        if job is None or job['state'] not in ACTIVE_STATES:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._active_path(job_id))
+        return job
+
+    def update(self, job_id, **fields):
+        """Update an active job's record (renewing its lease); returns the record."""
+        return self._modify(job_id, lambda job: fields)
+
+    def renew(self, job_id):
+        """Extend an active job's lease."""
+        return self._modify(job_id, lambda job: {})
+
+    def request_cancel(self, job_id):
+        open(self.path(job_id, CANCEL_FILE), 'w').close()
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self.path(job_id, CANCEL_FILE))
+
+    def jobs(self):
+        """Records of all jobs, newest first."""
+        records = [self.read(name) for name in os.listdir(self.root) if JOB_ID.match(name)]
+        return sorted((r for r in records if r is not None),
+                      key=lambda r: r['submitted_at'], reverse=True)
+
+    def active_ids(self):
+        """Ids of the queued and running jobs, from the active index."""
+        return [name for name in os.listdir(os.path.join(self.root, ACTIVE_DIR))
+                if JOB_ID.match(name)]
+
+    def prune(self, max_age_seconds, interval_seconds=60):
+        """Delete finished jobs last updated more than max_age_seconds ago.
+
+        Runs at most once per interval_seconds per store, and decides from
+        job.json modification times without parsing any record.
+        """
+        now = time.time()
+        if now - self._pruned_at < interval_seconds:
+            return
+        self._pruned_at = now
+        active = set(self.active_ids())
+        for name in os.listdir(self.root):
+            if not JOB_ID.match(name) or name in active:
+                continue
+            try:
+                stale = os.path.getmtime(self.path(name, JOB_FILE)) < now - max_age_seconds
+            except FileNotFoundError:
+                continue
+            if stale:
+                shutil.rmtree(self.path(name), ignore_errors=True)
+
+    def expire(self):
+        """Fail active jobs whose lease ran out; returns their ids."""
+        now = time.time()
+        expired = []
+
+        def stale(job):
+            if job.get('lease_expires_at', 0) >= now:
+                return None
+            expired.append(job['id'])
+            return {"state": "failed", "finished_at": _now(),
+                    "error": "scoring process and accepting worker stopped renewing the lease"}
+
+        for job_id in self.active_ids():
+            if os.path.isdir(self.path(job_id)):
+                self._modify(job_id, stale)
+            else:
+                # The job's directory was removed by hand
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._active_path(job_id))
+        return expired
+
+    def result_path(self, job_id, column):
+        return self.path(job_id, f"{column}.npy")
+
+    def result_columns(self, job_id):
+        """Result column names of a finished job."""
+        names = [name for name, _ in RESULT_COLUMNS + [ID_COLUMN]]
+        return [name for name in names if os.path.exists(self.result_path(job_id, name))]
+
+    def iter_result_csv(self, job_id, block_rows=10000):
+        """CSV lines of a finished job's results, a block of rows at a time.
+
+        Columns: input row number, `id` when the input had one, and the
+        predicted price (empty for invalid rows).
+        """
+        columns = self.result_columns(job_id)
+        arrays = {name: np.load(self.result_path(job_id, name), mmap_mode='r')
+                  for name in columns}
+        has_id = 'id' in arrays
+        yield 'row,id,predicted_price\n' if has_id else 'row,predicted_price\n'
+        n_rows = len(arrays['predicted_price'])
+        for start in range(0, n_rows, block_rows):
+            end = min(start + block_rows, n_rows)
+            prices = arrays['predicted_price'][start:end].tolist()
+            valid = arrays['valid'][start:end].tolist()
+            ids = arrays['id'][start:end].tolist() if has_id else None
+            lines = []
+            for i in range(end - start):
+                price = f"{prices[i]:.2f}" if valid[i] else ''
+                lines.append(f"{start + i},{ids[i]},{price}\n" if has_id
+                             else f"{start + i},{price}\n")
+            yield ''.join(lines)
+
+
+# Per pool process: a registry loading models on first use
+_registry = None
+
+
+def _init_worker(base_dir, demographics_csv, prefer_binary, nice):
+    global _registry
+    if nice:
+        os.nice(nice)
+    from registry import ModelRegistry
+    _registry = ModelRegistry(base_dir, demographics_csv, prefer_binary=prefer_binary)
+
+
+def _entry(name, model_dir, version):
+    entry = _registry.entries.get(name)
+    # Reloaded by the API since this process loaded it
+    if entry is None or entry.version != version:
+        entry = _registry.load(name, model_dir)
+    return entry
+
+
+def _record_errors(errors, start, row_errors):
+    for i in sorted(row_errors)[:max(MAX_RECORDED_ERRORS - len(errors), 0)]:
+        errors.setdefault(str(start + i), describe_row(row_errors[i]))
+
+
+def score_chunk(entry, chunk):
+    """Validate and predict one chunk of input rows.
+
+    Rows are checked and assembled like a /predict/batch body
+    (`ModelEntry.prepare_features_arrays`): missing house fields default
+    to 0, and rows with a non-numeric field or an invalid or unknown
+    zipcode are invalid.
+
+    Returns:
+        Tuple of (float64 prices, NaN for invalid rows; bool valid mask;
+        errors keyed by row index in the chunk, then field)
+    """
+    fields = entry.feature_plan.house_fields
+    errors = {}
+    house_matrix = np.full((len(chunk), len(fields)), np.nan)
+    for j, field in enumerate(fields):
+        if field in chunk:
+            house_matrix[:, j] = parse_csv_column(chunk[field], field, errors)
+    zipcodes = parse_csv_column(chunk[ZIPCODE_FIELD], ZIPCODE_FIELD, errors)
+    features, valid, errors = entry.prepare_features_arrays(house_matrix, zipcodes, errors)
+    prices = np.full(len(chunk), np.nan)
+    if valid.any():
+        prices[valid] = entry.model.predict(features)
+    return prices, valid, errors
+
+
+def _score(store, job_id, entry, chunk_rows):
+    import pandas
+    input_path = store.path(job_id, INPUT_FILE)
+    header = read_header(input_path)
+    if 'zipcode' not in header:
+        raise ValueError("input has no zipcode column")
+    n_rows = count_rows(input_path)
+    store.update(job_id, rows=n_rows, model_version=entry.version)
+
+    columns = RESULT_COLUMNS + ([ID_COLUMN] if 'id' in header else [])
+    partial = {name: store.path(job_id, f"{name}.partial.npy") for name, _ in columns}
+    results = {name: np.lib.format.open_memmap(partial[name], mode='w+', dtype=dtype,
+                                               shape=(n_rows,))
+               for name, dtype in columns}
+    wanted = set(entry.feature_plan.house_fields) | {'zipcode', 'id'}
+    errors = {}
+    invalid = 0
+    start = 0
+    started = time.perf_counter()
+    for chunk in pandas.read_csv(input_path, usecols=[c for c in header if c in wanted],
+                                 chunksize=chunk_rows):
+        if store.cancel_requested(job_id):
+            del results
+            for path in partial.values():
+                os.remove(path)
+            return store.update(job_id, state='cancelled', finished_at=_now())
+        end = start + len(chunk)
+        prices, valid, row_errors = score_chunk(entry, chunk)
+        results['predicted_price'][start:end] = prices
+        results['valid'][start:end] = valid
+        if 'id' in results:
+            results['id'][start:end] = pandas.to_numeric(chunk['id'], errors='coerce') \
+                .fillna(-1).to_numpy(dtype=np.int64)
+        _record_errors(errors, start, row_errors)
+        invalid += int((~valid).sum())
+        start = end
+        job = store.update(job_id, rows_done=end, invalid_rows=invalid, errors=errors)
+        if job['state'] != 'running':
+            # Failed by another worker after the lease ran out
+            del results
+            for path in partial.values():
+                os.remove(path)
+            return job
+    if start != n_rows:
+        raise ValueError(f"counted {n_rows} rows but parsed {start}")
+
+    for name, array in results.items():
+        array.flush()
+    del results
+    for name, path in partial.items():
+        os.replace(path, store.result_path(job_id, name))
+    seconds = time.perf_counter() - started
+    return store.update(job_id, state='succeeded', finished_at=_now(),
+                        scoring_seconds=round(seconds, 3),
+                        rows_per_second=round(n_rows / seconds, 1) if seconds else None)
+
+
+def run_job(root, lease_seconds, job_id, model_name, model_dir, version, chunk_rows):
+    """Score one job in a pool process; the outcome is recorded in job.json."""
+    store = JobStore(root, lease_seconds)
+    if store.cancel_requested(job_id):
+        return store.update(job_id, state='cancelled', finished_at=_now())['state']
+    job = store.update(job_id, state='running', pid=os.getpid(), started_at=_now())
+    if job['state'] != 'running':
+        return job['state']
+    try:
+        return _score(store, job_id, _entry(model_name, model_dir, version),
+                      chunk_rows)['state']
+    except Exception as e:
+        store.update(job_id, state='failed', finished_at=_now(),
+                     error=f"{type(e).__name__}: {e}")
+        return 'failed'
+
+
+class JobRunner:
+    """Bounded process pool scoring the jobs this API worker accepted."""
+
+    def __init__(self, store, max_workers, loader_args, chunk_rows=10000, nice=0):
+        """
+        Args:
+            store: JobStore holding the jobs
+            max_workers: scoring processes (started on the first job)
+            loader_args: (base_dir, demographics_csv, prefer_binary) for the
+                model registry of each scoring process
+            chunk_rows: rows validated and predicted at a time
+            nice: niceness added to scoring processes so interactive
+                predictions keep priority on shared cores
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self.loader_args = tuple(loader_args)
+        self.chunk_rows = chunk_rows
+        self.nice = nice
+        self.submitted = 0
+        self.finished = dict.fromkeys(STATES[len(ACTIVE_STATES):], 0)
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._heartbeat = None
+        atexit.register(self.close)
+
+    def _renew_leases(self):
+        # Queued jobs have no scoring process yet, and a running one only
+        # renews between chunks: keep every job of this worker alive
+        while not self._closed.wait(self.store.lease_seconds / 3):
+            with self._lock:
+                job_ids = list(self._futures)
+            for job_id in job_ids:
+                try:
+                    self.store.renew(job_id)
+                except OSError:
+                    pass
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=self.loader_args + (self.nice,))
+        return self._executor
+
+    def submit(self, job_id, entry):
+        """Queue a job for scoring with a registry entry's model."""
+        args = (run_job, self.store.root, self.store.lease_seconds, job_id, entry.name,
+                entry.path, entry.version, self.chunk_rows)
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_leases,
+                                                   name='job-leases', daemon=True)
+                self._heartbeat.start()
+            try:
+                future = self._pool().submit(*args)
+            except BrokenProcessPool:
+                # A scoring process died; start a fresh pool
+                self._executor = None
+                future = self._pool().submit(*args)
+            self._futures[job_id] = future
+            self.submitted += 1
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+
+    def _finished(self, job_id, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if not future.cancelled() and future.exception() is not None:
+            job = self.store.update(job_id, state='failed', finished_at=_now(),
+                                    error=f"scoring process failed: {future.exception()}")
+        else:
+            job = self.store.read(job_id)
+        if job is not None and job['state'] in self.finished:
+            with self._lock:
+                self.finished[job['state']] += 1
+
+    def cancel(self, job_id):
+        """Cancel a job: dropped here if still queued, else by its marker file."""
+        self.store.request_cancel(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return self.store.update(job_id, state='cancelled', finished_at=_now())
+        return self.store.read(job_id)
+
+    @property
+    def pending(self):
+        return len(self._futures)
+
+    def close(self):
+        self._closed.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,315 @@
+"""
+Memory accounting for Sound Realty House Price Prediction API
+
+Breaks a worker's resident memory down by component. Process totals come
+from /proc/self/smaps_rollup; each component's numpy arrays are looked up
+page by page in /proc/self/pagemap, which tells whether a page is resident
+and whether this process maps it exclusively (private) or shares it with
+others, e.g. memory-mapped artifacts in the page cache of several workers.
+Whatever the components do not cover (interpreter, libraries, Flask, Python
+objects) is reported as the rest. AllocationTrace measures the transient
+allocations of a code path per trace span with tracemalloc.
+
+Linux only; elsewhere the /proc based fields are None.
+"""
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from tracing import NULL_TRACE
+
+try:
+    from numpy.lib.array_utils import byte_bounds
+except ImportError:  # numpy < 2.0
+    byte_bounds = np.byte_bounds
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+PAGE_PRESENT = 1 << 63
+PAGE_EXCLUSIVE = 1 << 56
+SMAPS_FIELDS = {
+    'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty', 'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty', 'Swap': 'swap',
+}
+
+# tracemalloc is process-wide: one trace_allocations run at a time
+_trace_lock = threading.Lock()
+
+
+class TraceRunning(RuntimeError):
+    """Another trace_allocations run is in progress in this process."""
+
+
+def rss_bytes():
+    """Current resident set size, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+def process_memory():
+    """Resident, proportional, shared and private bytes of this process."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {"rss": rss_bytes()}
+    values = {}
+    for line in lines[1:]:
+        name, _, rest = line.partition(':')
+        if name in SMAPS_FIELDS:
+            values[SMAPS_FIELDS[name]] = int(rest.split()[0]) * 1024
+    values["shared"] = values.get("shared_clean", 0) + values.get("shared_dirty", 0)
+    values["private"] = values.get("private_clean", 0) + values.get("private_dirty", 0)
+    return values
+
+
+def mapping_breakdown():
+    """Resident, shared and private bytes by kind of mapping.
+
+    Kinds: `libraries` (shared objects: interpreter, numpy, scipy, sklearn
+    extension code), `mapped_files` (other files, e.g. memory-mapped
+    artifacts), `anonymous` (heap: Python objects and in-memory arrays) and
+    `other` (stack, vdso).
+    """
+    try:
+        with open('/proc/self/smaps') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    totals = {}
+    kind = None
+    for line in lines:
+        head = line.split(None, 5)
+        if head and '-' in head[0] and ':' not in head[0]:
+            path = head[5] if len(head) > 5 else ''
+            if '.so' in path.rsplit('/', 1)[-1]:
+                kind = 'libraries'
+            elif path.startswith('/'):
+                kind = 'mapped_files'
+            elif path in ('', '[heap]'):
+                kind = 'anonymous'
+            else:
+                kind = 'other'
+            continue
+        name, _, rest = line.partition(':')
+        field = SMAPS_FIELDS.get(name)
+        if field in ('rss', 'shared_clean', 'shared_dirty', 'private_clean', 'private_dirty'):
+            group = totals.setdefault(kind, {"rss": 0, "shared": 0, "private": 0})
+            value = int(rest.split()[0]) * 1024
+            group["rss" if field == 'rss' else field.split('_')[0]] += value
+    return totals
+
+
+def collect_arrays(obj, _seen=None):
+    """numpy arrays reachable from a fitted estimator or plain containers.
+
+    Follows instance attributes, lists, tuples and dicts, plus the arrays
+    of sklearn's KD/Ball trees (`get_arrays`).
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return []
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return [obj] if obj.dtype != object else \
+            [a for item in obj.ravel() for a in collect_arrays(item, seen)]
+    if isinstance(obj, dict):
+        children = list(obj.values())
+    elif isinstance(obj, (list, tuple)):
+        children = list(obj)
+    elif hasattr(obj, 'get_arrays'):
+        children = list(obj.get_arrays())
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        children = list(vars(obj).values())
+    else:
+        return []
+    return [a for child in children for a in collect_arrays(child, seen)]
+
+
+def _buffer_ranges(arrays):
+    """Distinct (start, end) address ranges of the arrays' data buffers."""
+    ranges = set()
+    for array in arrays:
+        if array.nbytes == 0:
+            continue
+        lo, hi = byte_bounds(array)
+        ranges.add((lo, hi))
+    # Views inside a larger buffer are counted once
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def array_residency(arrays):
+    """Size and resident/shared/private bytes of the arrays' pages.
+
+    Returns:
+        Dict with `bytes` (sum of buffer sizes) and, when pagemap is
+        readable, `resident`, `shared` and `private` (whole pages)
+    """
+    ranges = _buffer_ranges(arrays)
+    result = {"bytes": int(sum(hi - lo for lo, hi in ranges))}
+    try:
+        pagemap = open('/proc/self/pagemap', 'rb')
+    except OSError:
+        return result
+    with pagemap:
+        resident = exclusive = 0
+        done = -1
+        for lo, hi in ranges:
+            # A page shared by neighbouring buffers is counted once
+            first, last = max(lo // PAGE_SIZE, done + 1), (hi - 1) // PAGE_SIZE
+            if first > last:
+                continue
+            done = last
+            pagemap.seek(first * 8)
+            entries = np.frombuffer(pagemap.read((last - first + 1) * 8), dtype='<u8')
+            present = (entries & np.uint64(PAGE_PRESENT)) != 0
+            resident += int(present.sum())
+            exclusive += int((present & ((entries & np.uint64(PAGE_EXCLUSIVE)) != 0)).sum())
+    result.update(resident=resident * PAGE_SIZE, shared=(resident - exclusive) * PAGE_SIZE,
+                  private=exclusive * PAGE_SIZE)
+    return result
+
+
+def memory_report(components, baseline=None):
+    """Per-component breakdown of this process's resident memory.
+
+    Args:
+        components: dict of name -> list of arrays, or name -> (bytes, note)
+            for memory that is not held in arrays (estimates). A buffer
+            reachable from several components counts for the first.
+        baseline: dict of startup stage -> RSS bytes measured at that point
+
+    Returns:
+        Dict with `process` totals, `baseline`, `components` and `other`
+        (resident memory not attributed to a component)
+    """
+    process = process_memory()
+    report = {}
+    attributed = 0
+    claimed = []
+    for name, value in components.items():
+        if isinstance(value, tuple):
+            size, note = value
+            report[name] = {"bytes": int(size), "estimate": note}
+            attributed += int(size)
+        else:
+            arrays = []
+            for array in value:
+                lo, hi = byte_bounds(array)
+                if not any(lo < c_hi and c_lo < hi for c_lo, c_hi in claimed):
+                    arrays.append(array)
+            claimed += _buffer_ranges(arrays)
+            report[name] = array_residency(arrays)
+            attributed += report[name].get("resident", report[name]["bytes"])
+    rss = process.get("rss")
+    process["by_mapping"] = mapping_breakdown()
+    return {
+        "process": process,
+        "baseline": baseline or {},
+        "components": report,
+        "other": rss - attributed if rss is not None else None,
+    }
+
+
+def summary_line(report):
+    """One log line: RSS and each component's resident size in MB."""
+    def mb(value):
+        return f"{value / (1 << 20):.1f}MB" if value is not None else "n/a"
+    parts = [f"rss={mb(report['process'].get('rss'))}"]
+    parts += [f"{stage}={mb(value)}" for stage, value in report['baseline'].items()]
+    parts += [f"{name}={mb(info.get('resident', info['bytes']))}"
+              for name, info in report['components'].items()]
+    parts.append(f"other={mb(report['other'])}")
+    return "Memory: " + ", ".join(parts)
+
+
+class AllocationTrace:
+    """Trace stand-in recording tracemalloc peaks per span.
+
+    Passed as the `trace` of a code path that opens spans (such as
+    ModelEntry.prepare_features), it records the largest transient
+    allocation inside each span. tracemalloc must be tracing.
+    """
+
+    def __init__(self):
+        self.peaks = {}
+
+    @contextmanager
+    def span(self, name):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peaks[name] = max(self.peaks.get(name, 0), peak - start)
+
+
+def trace_allocations(fn, calls=100, limit=10, frames=5):
+    """Run fn(trace) `calls` times under tracemalloc.
+
+    Returns:
+        Dict with the peak transient bytes of a whole call and of each span,
+        and the `limit` source lines whose allocations made during the run
+        are still alive at its end (results of the calls are kept, so this
+        shows what each call allocates for its output and what leaks)
+
+    Raises:
+        TraceRunning: another thread is tracing; a concurrent run would stop
+            tracemalloc under it
+    """
+    if not _trace_lock.acquire(blocking=False):
+        raise TraceRunning("An allocation trace is already running")
+    try:
+        return _trace_allocations(fn, calls, limit, frames)
+    finally:
+        _trace_lock.release()
+
+
+def _trace_allocations(fn, calls, limit, frames):
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(frames)
+    try:
+        fn(NULL_TRACE)
+        before = tracemalloc.take_snapshot()
+        kept = []
+        call_peak = 0
+        for _ in range(calls):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            kept.append(fn(NULL_TRACE))
+            _, peak = tracemalloc.get_traced_memory()
+            call_peak = max(call_peak, peak - start)
+        after = tracemalloc.take_snapshot()
+        # Span peaks in a second pass: each span resets the peak
+        trace = AllocationTrace()
+        for _ in range(calls):
+            fn(trace)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__),
+              tracemalloc.Filter(False, __file__)]
+    growth = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return {
+        "calls": calls,
+        "call_peak_bytes": call_peak,
+        "span_peak_bytes": trace.peaks,
+        "retained_per_call": [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "bytes": stat.size_diff / calls, "blocks": stat.count_diff / calls}
+            for stat in growth[:limit] if stat.size_diff > 0],
+    }
@@ -0,0 +1,96 @@
+"""
+Prometheus metrics for Sound Realty House Price Prediction API
+
+Minimal counters and gauges rendered in the Prometheus text exposition format
+for the /metrics endpoint scraped by prometheus.yml.
+"""
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    body = ','.join(f'{name}="{str(value)}"' for name, value in key)
+    return '{' + body + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, callback=None):
+        self.name = name
+        self.help_text = help_text
+        # Optional callback computing the value(s) at scrape time: a number or
+        # a list of (labels dict, number)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        if self.callback is not None:
+            result = self.callback()
+            if isinstance(result, (int, float)):
+                return [((), float(result))]
+            return [(_label_key(labels), float(value)) for labels, value in result]
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(key)} {value:.17g}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Gauge set directly or computed by a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self, prefix='soundrealty_'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def counter(self, name, help_text, callback=None):
+        metric = Counter(self.prefix + name, help_text, callback)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, callback=None):
+        metric = Gauge(self.prefix + name, help_text, callback)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
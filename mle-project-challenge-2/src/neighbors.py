@@ -0,0 +1,184 @@
+"""
+Neighbor queries for Sound Realty House Price Prediction API
+
+Runs the KNN pipeline's neighbor search once and derives the prediction, its
+explanation (the comparable sales) and a price interval from the dispersion
+of the neighbors' prices from that single query, optionally restricted to
+geospatial candidates. Comparable
+sales come from the side table create_model.py stores with the model, which
+is memory-mapped rather than loaded.
+"""
+import os
+
+import numpy as np
+
+SIDE_TABLE_FILE = 'neighbors.npy'
+
+
+def load_side_table(model_dir):
+    """Memory-map the neighbor side table, or return None if absent."""
+    path = os.path.join(model_dir, SIDE_TABLE_FILE)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def _quantiles(level):
+    """Lower, median and upper quantiles of a central interval."""
+    tail = (1.0 - level) / 2
+    return np.array([tail, 0.5, 1.0 - tail])
+
+
+class NeighborQuery:
+    """Prediction and explanation from one KNN neighbor search."""
+
+    def __init__(self, model, side_table=None):
+        """
+        Args:
+            model: fitted pipeline ending in a KNeighborsRegressor
+            side_table: optional structured array aligned with the training rows
+        """
+        self.transform = model[:-1]
+        self.knn = model[-1]
+        self.weights = self.knn.weights
+        self.targets = self.knn._y
+        self.side_table = side_table
+        # Interpolation matrices for uniform weights, keyed by (k, level)
+        self._uniform_slots = {}
+
+    @staticmethod
+    def supports(model):
+        """True if `model` is a pipeline ending in a euclidean KNN regressor."""
+        return hasattr(model, 'steps') and hasattr(model[-1], 'kneighbors') \
+            and model[-1].weights in ('uniform', 'distance') \
+            and model[-1].effective_metric_ == 'euclidean'
+
+    def query(self, rows):
+        """Return (distances, indices) of the k nearest training rows."""
+        return self.knn.kneighbors(self.transform.transform(rows))
+
+    def query_candidates(self, rows, candidates):
+        """Nearest neighbors of a single row among `candidates` only.
+
+        Returns:
+            (distances, indices) shaped like `query`, or None when there are
+            fewer than k candidates
+        """
+        k = self.knn.n_neighbors
+        if len(candidates) < k:
+            return None
+        scaled = self.transform.transform(rows)[0]
+        diff = self.knn._fit_X[candidates] - scaled
+        distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return distances[nearest][np.newaxis, :], candidates[nearest][np.newaxis, :]
+
+    def neighbor_weights(self, distances):
+        """Weights KNeighborsRegressor applies to each neighbor's target."""
+        if self.weights == 'uniform':
+            return np.ones_like(distances)
+        # Exact matches take all the weight, as in scikit-learn
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distances
+        exact = np.isinf(weights)
+        rows = exact.any(axis=1)
+        weights[rows] = exact[rows]
+        return weights
+
+    def predict_from(self, distances, indices):
+        """Predictions equal to model.predict, from an existing query."""
+        targets = self.targets[indices]
+        if self.weights == 'uniform':
+            return targets.mean(axis=1)
+        weights = self.neighbor_weights(distances)
+        return (targets * weights).sum(axis=1) / weights.sum(axis=1)
+
+    def intervals(self, distances, indices, level=0.8):
+        """Price intervals from the neighbors' weighted price distribution.
+
+        Quantiles interpolate between the neighbor prices placed at the
+        midpoints of their cumulative weights, so with uniform weights and
+        k=5 an 80% interval spans the lowest to the highest neighbor price.
+
+        Returns:
+            Dict of arrays (one value per row): lower, median, upper, std
+        """
+        targets = self.targets[indices]
+        if self.weights == 'uniform':
+            # Same positions for every row: one product of the sorted prices
+            # with cached interpolation columns gives the quantiles and mean
+            sorted_targets = np.sort(targets, axis=1)
+            combined = sorted_targets @ self._uniform_matrix(targets.shape[1], level)
+            bounds, mean = combined[:, :3], combined[:, 3]
+            mean_square = (sorted_targets * sorted_targets).mean(axis=1)
+            std = np.sqrt(np.maximum(mean_square - mean * mean, 0.0))
+        else:
+            bounds, std = self._weighted_bounds(targets, self.neighbor_weights(distances),
+                                                _quantiles(level))
+        return {"lower": bounds[:, 0], "median": bounds[:, 1], "upper": bounds[:, 2],
+                "std": std}
+
+    def _uniform_matrix(self, k, level):
+        key = (k, level)
+        if key not in self._uniform_slots:
+            positions = (np.arange(k) + 0.5) / k
+            slots = np.interp(_quantiles(level), positions, np.arange(k))
+            matrix = np.zeros((k, 4))
+            for column, slot in enumerate(slots):
+                lo = int(np.floor(slot))
+                hi = min(lo + 1, k - 1)
+                matrix[lo, column] += 1 - (slot - lo)
+                matrix[hi, column] += slot - lo
+            matrix[:, 3] = 1.0 / k
+            self._uniform_slots[key] = matrix
+        return self._uniform_slots[key]
+
+    @staticmethod
+    def _weighted_bounds(targets, weights, quantiles):
+        weights = weights / weights.sum(axis=1, keepdims=True)
+        order = np.argsort(targets, axis=1)
+        targets = np.take_along_axis(targets, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        # Rounded so a quantile falling exactly on a neighbor selects it exactly
+        positions = np.round(np.cumsum(weights, axis=1) - 0.5 * weights, 12)
+
+        mean = (targets * weights).sum(axis=1, keepdims=True)
+        std = np.sqrt((weights * (targets - mean) ** 2).sum(axis=1))
+
+        # Linear interpolation of each row's sorted values at each quantile
+        k = targets.shape[1]
+        above = (positions[:, np.newaxis, :] <= quantiles[np.newaxis, :, np.newaxis]).sum(axis=2)
+        hi = np.minimum(above, k - 1)
+        lo = np.maximum(above - 1, 0)
+        p_lo = np.take_along_axis(positions, lo, axis=1)
+        p_hi = np.take_along_axis(positions, hi, axis=1)
+        v_lo = np.take_along_axis(targets, lo, axis=1)
+        v_hi = np.take_along_axis(targets, hi, axis=1)
+        span = p_hi - p_lo
+        frac = np.divide(quantiles - p_lo, span, out=np.zeros_like(span), where=span > 0)
+        return v_lo + np.clip(frac, 0.0, 1.0) * (v_hi - v_lo), std
+
+    def explain(self, distances, indices):
+        """Describe the neighbors behind one prediction.
+
+        Args:
+            distances, indices: one row of a `query` result
+
+        Returns:
+            List of neighbor dicts, nearest first. Distances are in the
+            model's scaled feature space.
+        """
+        weights = self.neighbor_weights(distances[np.newaxis, :])[0]
+        weights = weights / weights.sum()
+        neighbors = []
+        for index, distance, weight in zip(indices.tolist(), distances.tolist(),
+                                           weights.tolist()):
+            neighbor = {"training_row": index, "distance": distance, "weight": weight,
+                        "price": float(self.targets[index])}
+            if self.side_table is not None:
+                record = self.side_table[index]
+                for name in self.side_table.dtype.names:
+                    neighbor[name] = record[name].item()
+            neighbors.append(neighbor)
+        return neighbors
@@ -0,0 +1,56 @@
+"""
+Prediction cache for Sound Realty House Price Prediction API
+
+A per-replica LRU of plain predictions keyed on the model version and the
+assembled feature row, so a repeated house skips the neighbor search. With
+consistent hashing in front (nginx.conf) repeats of a house reach the
+replica that cached it, and each replica caches a disjoint share of houses.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+# Approximate per-entry cost of the OrderedDict node and key tuple
+ENTRY_OVERHEAD = 160
+
+
+class PredictionCache:
+    """Thread-safe LRU of prediction values."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(entry, features):
+        return entry.name, entry.version, features.tobytes()
+
+    def get(self, key):
+        """Return the cached predictions for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def nbytes(self):
+        """Approximate bytes held by the cached keys and predictions."""
+        with self._lock:
+            return sum(sys.getsizeof(key[2]) + sys.getsizeof(value) + ENTRY_OVERHEAD
+                       for key, value in self._entries.items())
+
+    def __len__(self):
+        return len(self._entries)
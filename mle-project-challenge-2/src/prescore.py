@@ -0,0 +1,341 @@
+"""
+Pre-scored listing store for Sound Realty House Price Prediction API
+
+Scores a whole inventory file (houses keyed by `id`) with a model offline and
+writes an open-addressing id -> price hash table next to the model
+artifacts. The API memory-maps the table and answers a price by id with one
+hash probe sequence, without feature assembly or a neighbor search. The
+table records the model version it was scored with; a table from another
+version is stale and is rescored in the background when the model is
+(re)loaded. Every gunicorn worker loads the models, so rescoring takes an
+exclusive lock on `prescored.lock`: one process rescores, the others wait,
+find the table fresh and map it.
+
+Usage: python prescore.py [--model-dir model] [--inventory data/kc_house_data.csv]
+"""
+import argparse
+import contextlib
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import warnings
+
+import numpy as np
+
+from validation import ZIPCODE_FIELD, parse_csv_column
+
+TABLE_FILE = 'prescored.npy'
+META_FILE = 'prescored.json'
+LOCK_FILE = 'prescored.lock'
+ID_FIELD = 'id'
+# Marks an empty slot; inventory ids must be non-negative
+EMPTY_ID = -1
+# Fibonacci hashing multiplier (2^64 / golden ratio)
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK_64 = (1 << 64) - 1
+SCORE_BATCH_SIZE = 1000
+
+# Rows are assembled as numpy arrays in model column order
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+def _home_slot(house_id, shift):
+    return ((house_id * HASH_MULTIPLIER) & MASK_64) >> shift
+
+
+def build_table(ids, prices):
+    """Open-addressing table (linear probing, load factor <= 0.5).
+
+    Returns:
+        Structured array of (`id`, `price`) slots; empty slots have id -1.
+        Later duplicates of an id overwrite earlier ones.
+
+    Raises:
+        ValueError: an id is negative and could be taken for an empty slot
+    """
+    if len(ids) and ids.min() < 0:
+        raise ValueError(f"ids must be non-negative, got {ids.min()}")
+    bits = max(int(np.ceil(np.log2(max(len(ids), 1) * 2))), 4)
+    capacity, shift = 1 << bits, 64 - bits
+    slot_ids = np.full(capacity, EMPTY_ID, dtype=np.int64)
+    slot_prices = np.zeros(capacity, dtype=np.float64)
+    for house_id, price in zip(ids.tolist(), prices.tolist()):
+        slot = _home_slot(house_id, shift)
+        while slot_ids[slot] not in (EMPTY_ID, house_id):
+            slot = (slot + 1) & (capacity - 1)
+        slot_ids[slot] = house_id
+        slot_prices[slot] = price
+    table = np.empty(capacity, dtype=[('id', np.int64), ('price', np.float64)])
+    table['id'] = slot_ids
+    table['price'] = slot_prices
+    return table
+
+
+class PrescoredTable:
+    """Memory-mapped id -> price lookup."""
+
+    def __init__(self, table, meta):
+        self.meta = meta
+        self.version = meta.get('model_version')
+        self.rows = meta.get('rows', 0)
+        self._ids = table['id']
+        self._prices = table['price']
+        self._mask = len(table) - 1
+        self._shift = 64 - (len(table).bit_length() - 1)
+
+    def lookup(self, house_id):
+        """Return the price for `house_id`, or None if not in the inventory."""
+        if house_id < 0:
+            return None
+        slot = _home_slot(house_id, self._shift)
+        ids = self._ids
+        while True:
+            key = ids.item(slot)
+            if key == house_id:
+                return self._prices.item(slot)
+            if key == EMPTY_ID:
+                return None
+            slot = (slot + 1) & self._mask
+
+
+def load_prescored(model_dir):
+    """Memory-map the model's pre-scored table, or return None if absent."""
+    table_path = os.path.join(model_dir, TABLE_FILE)
+    meta_path = os.path.join(model_dir, META_FILE)
+    if not (os.path.exists(table_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    return PrescoredTable(np.load(table_path, mmap_mode='r'), meta)
+
+
+def read_inventory(path, fields, chunk_rows=SCORE_BATCH_SIZE):
+    """Read the id, `fields` and zipcode columns of an inventory CSV.
+
+    Returns:
+        Iterator of DataFrames of at most `chunk_rows` rows, with numeric
+        columns parsed by pandas
+    """
+    import pandas
+    wanted = {ID_FIELD, ZIPCODE_FIELD, *fields}
+    return pandas.read_csv(path, usecols=lambda column: column in wanted,
+                           chunksize=chunk_rows)
+
+
+def _parse_ids(column, errors):
+    """int64 ids of a chunk; blank, non-integer and negative ids go to `errors`."""
+    import pandas
+    if column.dtype.kind in 'iu':
+        ids = column.to_numpy(dtype=np.int64)
+        bad = ids < 0
+    else:
+        values = pandas.to_numeric(column, errors='coerce').to_numpy(
+            dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            bad = ~((values == np.floor(values)) & (values >= 0))
+        ids = np.where(bad, 0, values).astype(np.int64)
+    for i in np.flatnonzero(bad).tolist():
+        errors.setdefault(i, {})[ID_FIELD] = \
+            f"not a non-negative integer: {column.iloc[i]!r}"
+    return ids
+
+
+def score_inventory(entry, chunks):
+    """Score inventory chunks (from `read_inventory`) with a registry entry's model.
+
+    Rows that fail validation (e.g. an unknown zipcode) or have no usable
+    id are skipped, so one bad row does not fail the whole rescore.
+
+    Returns:
+        Tuple of (int64 ids, float64 prices, number of skipped rows)
+    """
+    fields = entry.feature_plan.house_fields
+    ids, prices = [], []
+    skipped = 0
+    for chunk in chunks:
+        errors = {}
+        house_matrix = np.full((len(chunk), len(fields)), np.nan)
+        for j, field in enumerate(fields):
+            if field in chunk:
+                house_matrix[:, j] = parse_csv_column(chunk[field], field, errors)
+        zipcodes = parse_csv_column(chunk[ZIPCODE_FIELD], ZIPCODE_FIELD, errors) \
+            if ZIPCODE_FIELD in chunk else np.full(len(chunk), np.nan)
+        chunk_ids = _parse_ids(chunk[ID_FIELD], errors)
+        features, valid, _ = entry.prepare_features_arrays(house_matrix, zipcodes, errors)
+        skipped += int(np.count_nonzero(~valid))
+        if valid.any():
+            ids.append(chunk_ids[valid])
+            prices.append(entry.model.predict(features))
+    if not ids:
+        return np.empty(0, dtype=np.int64), np.empty(0), skipped
+    return np.concatenate(ids), np.concatenate(prices), skipped
+
+
+def _sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def score_table(entry, inventory_path, output_dir):
+    """Score `inventory_path` with `entry` into a table and its metadata.
+
+    The source path is recorded relative to `output_dir` so a rescore finds
+    it in any checkout or container layout.
+    """
+    ids, prices, skipped = score_inventory(
+        entry, read_inventory(inventory_path, entry.feature_plan.house_fields))
+    table = build_table(ids, prices)
+    meta = {
+        "model_version": entry.version,
+        "source": os.path.relpath(inventory_path, output_dir),
+        "source_sha1": _sha1(inventory_path),
+        "rows": int(len(np.unique(ids))),
+        "skipped": skipped,
+        "capacity": len(table),
+        "scored_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    return table, meta
+
+
+def _replace_atomically(path, write):
+    """Write a file through a process-unique temporary file, then rename it."""
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_prescored(table, meta, output_dir):
+    """Write the table, then its metadata, each renamed into place once complete.
+
+    A reader between the two renames sees the new table with the old
+    metadata, which names the old model version or inventory: the pair is
+    stale and is rescored (under the lock) rather than served.
+    """
+    _replace_atomically(os.path.join(output_dir, TABLE_FILE),
+                        lambda f: np.save(f, table))
+    _replace_atomically(os.path.join(output_dir, META_FILE),
+                        lambda f: f.write(json.dumps(meta, indent=2).encode()))
+
+
+@contextlib.contextmanager
+def rescore_lock(output_dir):
+    """Hold the exclusive rescore lock of `output_dir`, waiting for it.
+
+    A read-only directory has no lock file; every process then scores into
+    memory on its own.
+    """
+    try:
+        fd = os.open(os.path.join(output_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        yield
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def prescore(entry, inventory_path):
+    """Score `inventory_path` with `entry` into the model directory.
+
+    Returns:
+        The new PrescoredTable, memory-mapped from the model directory
+    """
+    with rescore_lock(entry.path):
+        table, meta = score_table(entry, inventory_path, entry.path)
+        write_prescored(table, meta, entry.path)
+    return load_prescored(entry.path)
+
+
+def stale_reason(table, entry):
+    """Why `table` no longer matches `entry` and its source, or None."""
+    if table.version != entry.version:
+        return f"scored with model {table.version}, serving {entry.version}"
+    source = os.path.join(entry.path, table.meta['source'])
+    if os.path.exists(source) and _sha1(source) != table.meta.get('source_sha1'):
+        return "inventory changed since scoring"
+    return None
+
+
+class Rescorer:
+    """Attaches pre-scored tables to loaded models, rescoring stale ones."""
+
+    def __init__(self):
+        self.status = {}
+        self.rescored = 0
+
+    def ensure_fresh(self, entry):
+        """Attach `entry`'s table, or rescore it in the background if stale.
+
+        Until the rescore finishes the entry has no table and lookups are
+        unavailable rather than served from another model version.
+        """
+        entry.prescored = None
+        table = load_prescored(entry.path)
+        if table is None:
+            self.status[entry.name] = {"state": "absent"}
+            return
+        reason = stale_reason(table, entry)
+        if reason is None:
+            entry.prescored = table
+            self.status[entry.name] = {"state": "fresh", "rows": table.rows}
+            return
+        self.status[entry.name] = {"state": "rescoring", "reason": reason}
+        source = os.path.join(entry.path, table.meta['source'])
+        threading.Thread(target=self._rescore, args=(entry, source),
+                         name=f"prescore-{entry.name}", daemon=True).start()
+
+    def _rescore(self, entry, source):
+        try:
+            with rescore_lock(entry.path):
+                # Another worker may have rescored while this one waited
+                prescored = load_prescored(entry.path)
+                if prescored is None or stale_reason(prescored, entry) is not None:
+                    table, meta = score_table(entry, source, entry.path)
+                    try:
+                        write_prescored(table, meta, entry.path)
+                        prescored = load_prescored(entry.path)
+                    except OSError:
+                        # Read-only model directory: serve the new table from memory
+                        prescored = PrescoredTable(table, meta)
+            entry.prescored = prescored
+            self.rescored += 1
+            self.status[entry.name] = {"state": "fresh", "rows": prescored.rows}
+        except Exception as e:
+            self.status[entry.name] = {"state": "failed", "error": str(e)}
+
+
+def main():
+    from registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    base_dir = '.' if os.path.exists('./model/model.pkl') else '..'
+    parser.add_argument('--model-dir', default='model',
+                        help="model directory, relative to the project root")
+    parser.add_argument('--inventory', default=os.path.join(base_dir, 'data',
+                                                            'kc_house_data.csv'),
+                        help="CSV of houses with an id column and house fields")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(base_dir, os.path.join(base_dir, 'data', 'zipcode_demographics.csv'),
+                             prefer_binary=True)
+    entry = registry.load('default', args.model_dir)
+    table = prescore(entry, args.inventory)
+    print(f"Pre-scored {table.rows} houses ({table.meta['skipped']} skipped) with "
+          f"model {entry.version} into {os.path.join(entry.path, TABLE_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
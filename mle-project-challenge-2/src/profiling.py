@@ -0,0 +1,119 @@
+"""
+Per-request sampling profiler for Sound Realty House Price Prediction API
+
+Selected requests register their thread with a background sampler that walks
+the thread's stack every few milliseconds. Samples are aggregated as collapsed
+stacks ("outer;inner count"), the input format of flamegraph.pl and speedscope.
+"""
+import collections
+import ipaddress
+import os
+import random
+import sys
+import threading
+import time
+
+# Distinct stacks kept before new ones are folded into a single bucket
+MAX_STACKS = 5000
+TRUNCATED_STACK = "[truncated]"
+
+
+def parse_networks(spec):
+    """Parse a comma-separated list of CIDRs into network objects."""
+    return [ipaddress.ip_network(part.strip(), strict=False)
+            for part in spec.split(',') if part.strip()]
+
+
+class RequestProfiler:
+    """Sample stacks of selected request threads."""
+
+    def __init__(self, sample_rate=0.0, interval_ms=1.0, trusted_networks=()):
+        """
+        Args:
+            sample_rate: fraction of requests to profile (0 disables sampling)
+            interval_ms: delay between stack samples
+            trusted_networks: client networks allowed to force profiling with
+                the debug header and to read the admin endpoint
+        """
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000.0
+        self.trusted_networks = list(trusted_networks)
+        # Checked first on every request so the disabled path is one attribute read
+        self.enabled = sample_rate > 0 or bool(self.trusted_networks)
+
+        self.stacks = collections.Counter()
+        self.profiled_requests = 0
+        self._active = set()
+        self._lock = threading.Lock()
+        self._has_active = threading.Event()
+        self._sampler = None
+
+    def is_trusted(self, remote_addr):
+        if not remote_addr or not self.trusted_networks:
+            return False
+        try:
+            address = ipaddress.ip_address(remote_addr)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_networks)
+
+    def should_profile(self, remote_addr, debug_header):
+        """Decide whether the current request is profiled."""
+        if debug_header and self.is_trusted(remote_addr):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self, thread_id):
+        """Start sampling the given request thread."""
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop,
+                                                 name="profiler", daemon=True)
+                self._sampler.start()
+            self._active.add(thread_id)
+            self.profiled_requests += 1
+            self._has_active.set()
+
+    def end(self, thread_id):
+        """Stop sampling the given request thread."""
+        with self._lock:
+            self._active.discard(thread_id)
+            if not self._active:
+                self._has_active.clear()
+
+    def collapsed(self):
+        """Return aggregated samples in collapsed-stack text format."""
+        with self._lock:
+            items = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.profiled_requests = 0
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while True:
+            self._has_active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id in self._active:
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own_id:
+                        continue
+                    stack = _collapse(frame)
+                    if stack not in self.stacks and len(self.stacks) >= MAX_STACKS:
+                        stack = TRUNCATED_STACK
+                    self.stacks[stack] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
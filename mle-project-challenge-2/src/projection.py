@@ -0,0 +1,71 @@
+"""
+Demographics projection for Sound Realty House Price Prediction API
+
+`create_model.py --demographic-components K` puts a projection stage in the
+model pipeline: the house columns are scaled, the demographics columns are
+scaled and reduced to K principal components. Demographics are constant per
+zipcode, so the API applies that stage to the demographics table once at
+load time and serves a pipeline over the house fields plus the K components:
+a request only scales its house fields, and the neighbor search runs over
+the reduced dimensions.
+"""
+import warnings
+
+import numpy as np
+from sklearn import pipeline
+from sklearn import preprocessing
+
+HOUSE_BRANCH = 'house'
+DEMOGRAPHICS_BRANCH = 'demographics'
+
+
+class DemographicProjection:
+    """Serving form of a model with a demographics projection stage."""
+
+    def __init__(self, model, model_features):
+        """
+        Args:
+            model: fitted pipeline whose first step is the ColumnTransformer
+                built by create_model.py
+            model_features: the artifact's input columns, in training order
+        """
+        columns = {name: (transformer, positions)
+                   for name, transformer, positions in model[0].transformers_}
+        house, house_positions = columns[HOUSE_BRANCH]
+        self.branch, demographic_positions = columns[DEMOGRAPHICS_BRANCH]
+        self.house_features = [model_features[i] for i in house_positions]
+        self.demographic_features = [model_features[i] for i in demographic_positions]
+        n_components = self.branch[-1].n_components_
+        self.component_names = [f'{DEMOGRAPHICS_BRANCH}_pc{i + 1}'
+                                for i in range(n_components)]
+        # Input columns of the served model: components replace demographics
+        self.features = self.house_features + self.component_names
+
+        # The house branch is affine; extend it with the identity over the
+        # components, which the ColumnTransformer emits after the house columns
+        scaler = preprocessing.RobustScaler()
+        scaler.center_ = np.concatenate([house.center_, np.zeros(n_components)])
+        scaler.scale_ = np.concatenate([house.scale_, np.ones(n_components)])
+        scaler.n_features_in_ = len(self.features)
+        self.model = pipeline.Pipeline([('robustscaler', scaler), model.steps[-1]])
+        # The artifact's pipeline, which would project on every call
+        self.full_model = model
+
+    @staticmethod
+    def supports(model):
+        """True if `model` starts with a house / demographics ColumnTransformer."""
+        first = model[0] if hasattr(model, 'steps') else None
+        branches = getattr(first, 'named_transformers_', {})
+        return HOUSE_BRANCH in branches and DEMOGRAPHICS_BRANCH in branches
+
+    def project(self, demographics):
+        """Project every zipcode row of a DemographicsTable.
+
+        Returns:
+            float64 array of shape (len(demographics), n_components)
+        """
+        positions = [demographics.columns.index(f) for f in self.demographic_features]
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return np.asarray(self.branch.transform(demographics.values[:, positions]),
+                              dtype=np.float64)
@@ -0,0 +1,136 @@
+"""
+Proxy tier benchmark for Sound Realty House Price Prediction API
+
+Drives each target with the same concurrent closed loop of keep-alive
+clients (POST /predict with houses from future_unseen_examples.csv, plus
+GET /features) and reports throughput, latency, new client connections per
+request and, behind nginx, the share of requests that reused a pooled
+upstream connection (X-Upstream-Connect-Time of 0) and /features cache hits.
+
+Usage: python proxy_bench.py --target tuned=http://localhost:8080
+                             [--target baseline=http://localhost:8081]
+                             [--clients 16] [--duration 15] [--wait 0]
+"""
+import argparse
+import csv
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+# One GET /features per this many requests
+FEATURES_EVERY = 10
+
+
+def wait_ready(host, port, timeout):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        if time.time() > deadline:
+            raise SystemExit(f"{host}:{port} not reachable")
+        time.sleep(1)
+
+
+def run(host, port, bodies, clients, duration):
+    totals = {"requests": 0, "errors": 0, "connects": 0, "upstream_reused": 0,
+              "upstream_seen": 0, "features": 0, "features_hits": 0}
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        counts = dict.fromkeys(totals, 0)
+        local_latencies = []
+        for i, body in enumerate(itertools.islice(itertools.cycle(bodies), offset, None)):
+            if time.perf_counter() >= stop_at:
+                break
+            counts["connects"] += conn.sock is None
+            started = time.perf_counter()
+            if i % FEATURES_EVERY == 0:
+                conn.request('GET', '/features')
+            else:
+                conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            local_latencies.append(time.perf_counter() - started)
+            counts["requests"] += 1
+            counts["errors"] += response.status != 200
+            connect_time = response.getheader('X-Upstream-Connect-Time')
+            if connect_time not in (None, '', '-'):
+                counts["upstream_seen"] += 1
+                counts["upstream_reused"] += float(connect_time.split(',')[0]) == 0.0
+            if i % FEATURES_EVERY == 0:
+                counts["features"] += 1
+                counts["features_hits"] += response.getheader('X-Cache-Status') == 'HIT'
+        with lock:
+            for key, value in counts.items():
+                totals[key] += value
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=client, args=(i * 7,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    n = max(totals["requests"], 1)
+    return {
+        "rps": totals["requests"] / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "errors": totals["errors"],
+        "client_connects_per_request": totals["connects"] / n,
+        "upstream_reuse": totals["upstream_reused"] / totals["upstream_seen"]
+        if totals["upstream_seen"] else None,
+        "features_cache_hits": totals["features_hits"] / totals["features"]
+        if totals["features"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--target', action='append', required=True,
+                        help="name=http://host:port (repeatable)")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--wait', type=float, default=0,
+                        help="seconds to wait for each target to answer /health")
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, 'future_unseen_examples.csv')) as f:
+        bodies = [json.dumps(row) for row in csv.DictReader(f)]
+
+    print(f"{args.clients} keep-alive clients, {args.duration:g}s per target, "
+          f"1 in {FEATURES_EVERY} requests GET /features")
+    print(f"{'target':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'conn/req':>9} {'upstream reuse':>15} {'features hit':>13}")
+    for target in args.target:
+        name, _, url = target.partition('=')
+        parts = urlsplit(url)
+        if args.wait:
+            wait_ready(parts.hostname, parts.port or 80, args.wait)
+        result = run(parts.hostname, parts.port or 80, bodies, args.clients, args.duration)
+        reuse = result['upstream_reuse']
+        hits = result['features_cache_hits']
+        print(f"{name:<10} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7} "
+              f"{result['client_connects_per_request']:>9.3f} "
+              f"{'n/a' if reuse is None else f'{reuse:.1%}':>15} "
+              f"{'n/a' if hits is None else f'{hits:.1%}':>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Model registry for Sound Realty House Price Prediction API
+
+Loads several versioned model artifacts into one process. Each model gets its
+own compiled feature plan and request schemas; the demographics table is
+loaded once per distinct file and floating point type and shared between
+models.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+from demographics import load_demographics_binary, load_demographics_csv
+from drift import DriftMonitor
+from fallback import LatencyEstimate, load_fallback
+from feature_plan import FeaturePlan
+from geo import load_geo_index
+from neighbors import NeighborQuery, load_side_table
+from projection import DemographicProjection
+from tracing import NULL_TRACE
+from validation import ZIPCODE_FIELD, RequestSchema, ValidationError
+
+
+def parse_registry_spec(spec):
+    """Parse "name=dir,name=dir" into a list of (name, dir) pairs."""
+    pairs = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, path = part.partition('=')
+        if not path:
+            raise ValueError(f"Invalid MODEL_REGISTRY entry: {part!r}")
+        pairs.append((name.strip(), path.strip()))
+    return pairs
+
+
+class ModelEntry:
+    """A loaded model artifact with its compiled feature plan and schemas."""
+
+    def __init__(self, name, model, model_features, metadata, demographics, path,
+                 drift=None, projection=None):
+        self.name = name
+        # A projected model is served without its demographics stage: the
+        # feature plan holds the projected demographics instead
+        self.projection = projection
+        self.model = projection.model if projection is not None else model
+        self.model_features = model_features
+        self.metadata = metadata
+        self.version = metadata.get('version', 'unversioned')
+        # float32 artifacts are queried with float32 rows end to end
+        self.dtype = np.dtype(metadata.get('dtype', 'float64'))
+        self.path = path
+        self.demographics = demographics
+        # Optional DriftMonitor fed from the reference profile
+        self.drift = drift
+
+        # Direct neighbor access for explanations; None for non-KNN models
+        self.neighbors = NeighborQuery(self.model, load_side_table(path)) \
+            if NeighborQuery.supports(self.model) else None
+        # Optional lat/long grid for geospatial candidate search
+        self.geo = load_geo_index(path) if self.neighbors is not None else None
+        # Pre-scored id -> price table, attached once fresh (prescore.Rescorer)
+        self.prescored = None
+        # Zipcode x size median prices for requests out of latency budget
+        self.fallback = load_fallback(path)
+        self.latency = LatencyEstimate()
+
+        if projection is not None:
+            self.feature_plan = FeaturePlan(projection.features,
+                                            projection.component_names,
+                                            projection.project(demographics),
+                                            self.dtype)
+        else:
+            self.feature_plan = FeaturePlan(model_features, demographics.columns,
+                                            demographics.values, self.dtype)
+        house_fields = self.feature_plan.house_fields
+        self.predict_schema = RequestSchema(house_fields)
+        # The simple endpoint requires exactly the features this model uses
+        self.simple_features = house_fields + ['zipcode']
+        self.simple_schema = RequestSchema(house_fields, required=house_fields)
+
+    def lookup_demographics(self, zipcode):
+        """Return the demographics row index for a zipcode."""
+        demographic_row = self.demographics.row_index(zipcode)
+        if demographic_row is None:
+            raise ValueError(f"Zipcode {zipcode} not found in demographics data")
+        return demographic_row
+
+    def prepare_features(self, house_data, trace=NULL_TRACE, simple=False):
+        """Prepare a (1, n_features) model input array for prediction."""
+        schema = self.simple_schema if simple else self.predict_schema
+        with trace.span('validate'):
+            house_values, zipcode = schema.validate(house_data)
+
+        with trace.span('demographics'):
+            demographic_row = self.lookup_demographics(zipcode)
+
+        # Fill the precompiled row layout; missing house fields default to 0
+        with trace.span('assemble'):
+            return self.feature_plan.assemble(house_values, demographic_row)
+
+    def _demographic_rows(self, zipcodes, errors):
+        """Demographics row indices of a batch; unknown zipcodes go to `errors`."""
+        demographic_rows, unknown = self.demographics.row_indices(zipcodes)
+        for i in unknown:
+            if ZIPCODE_FIELD not in errors.get(i, {}):
+                errors.setdefault(i, {})[ZIPCODE_FIELD] = \
+                    f"Zipcode {zipcodes[i]} not found in demographics data"
+        return demographic_rows
+
+    def prepare_features_batch(self, records, trace=NULL_TRACE):
+        """Prepare an (n, n_features) model input array for a list of houses.
+
+        Raises:
+            ValidationError: every invalid row, including unknown zipcodes
+        """
+        errors = {}
+        with trace.span('validate'):
+            house_matrix, zipcodes = self.predict_schema.parse_batch(records, errors)
+
+        with trace.span('demographics'):
+            demographic_rows = self._demographic_rows(zipcodes, errors)
+            if errors:
+                raise ValidationError(errors)
+
+        with trace.span('assemble'):
+            return self.feature_plan.assemble_batch(house_matrix, demographic_rows)
+
+    def prepare_features_arrays(self, house_matrix, zipcodes, errors=None):
+        """Prepare model input rows for houses that arrive as columns of numbers.
+
+        The binary protocol, scoring jobs and the pre-scored inventory use
+        this instead of `prepare_features_batch`: the same schema checks and
+        demographics lookup, without JSON objects.
+
+        Args:
+            house_matrix: array of shape (n, len(house_fields)); NaN marks a
+                missing field, which defaults to 0
+            zipcodes: float array of n zipcodes
+            errors: errors already found while parsing the rows, added to
+
+        Returns:
+            Tuple of (input array for the valid rows, bool mask of the valid
+            rows, errors keyed by row index, then field)
+        """
+        errors = {} if errors is None else errors
+        house_matrix, zipcodes = self.predict_schema.validate_columns(
+            house_matrix, zipcodes, errors)
+        demographic_rows = self._demographic_rows(zipcodes, errors)
+        valid = np.ones(len(zipcodes), dtype=bool)
+        valid[list(errors)] = False
+        return self.feature_plan.assemble_batch(house_matrix[valid],
+                                                demographic_rows[valid]), valid, errors
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "version": self.version,
+            "dtype": self.dtype.name,
+            "geo_index": self.geo is not None,
+            "prescored_rows": self.prescored.rows if self.prescored is not None else None,
+            "fallback_zipcodes": len(self.fallback) if self.fallback is not None else None,
+            "n_features": len(self.model_features),
+            "demographic_components": len(self.projection.component_names)
+            if self.projection is not None else None,
+            "simple_endpoint_features": self.simple_features,
+        }
+
+
+class ModelRegistry:
+    """Named model entries sharing demographics tables."""
+
+    def __init__(self, base_dir, demographics_csv, prefer_binary=False, timer=None,
+                 drift_options=None):
+        """
+        Args:
+            base_dir: directory model paths are resolved against
+            demographics_csv: fallback CSV when a model has no binary table
+            prefer_binary: load `demographics.npz` from the model directory
+                when present (fast startup)
+            timer: optional PhaseTimer for startup phases
+            drift_options: keyword arguments for DriftMonitor; None disables
+                drift monitoring
+        """
+        self.base_dir = base_dir
+        self.demographics_csv = demographics_csv
+        self.prefer_binary = prefer_binary
+        self.timer = timer
+        self.drift_options = drift_options
+        self.entries = {}
+        self.default_name = None
+        self._tables = {}
+
+    def _phase(self, name):
+        if self.timer is None:
+            return NULL_TRACE.span(name)
+        return self.timer.phase(name)
+
+    def _load_demographics(self, model_dir, dtype):
+        binary_path = os.path.join(model_dir, 'demographics.npz')
+        use_binary = self.prefer_binary and os.path.exists(binary_path)
+        path = binary_path if use_binary else self.demographics_csv
+
+        # Identical files are loaded once and shared between models
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        key = (use_binary, digest, np.dtype(dtype).name)
+        if key not in self._tables:
+            if use_binary:
+                self._tables[key] = load_demographics_binary(path, dtype)
+            else:
+                self._tables[key] = load_demographics_csv(path, dtype)
+        return self._tables[key]
+
+    def load(self, name, model_dir):
+        """Load the artifacts in `model_dir` and register them as `name`."""
+        model_dir = os.path.join(self.base_dir, model_dir)
+        with self._phase(f'load_model:{name}'):
+            with open(os.path.join(model_dir, 'model.pkl'), 'rb') as f:
+                model = pickle.load(f)
+        with open(os.path.join(model_dir, 'model_features.json'), 'r') as f:
+            model_features = json.load(f)
+        metadata_path = os.path.join(model_dir, 'model_metadata.json')
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+
+        projection = DemographicProjection(model, model_features) \
+            if DemographicProjection.supports(model) else None
+        # Column order of the rows the served model receives
+        input_features = projection.features if projection is not None else model_features
+
+        drift = None
+        profile_path = os.path.join(model_dir, 'reference_profile.json')
+        if self.drift_options is not None and os.path.exists(profile_path):
+            with open(profile_path, 'r') as f:
+                drift = DriftMonitor(json.load(f), input_features, **self.drift_options)
+
+        with self._phase(f'load_demographics:{name}'):
+            demographics = self._load_demographics(
+                model_dir, metadata.get('dtype', 'float64'))
+        with self._phase(f'compile_feature_plan:{name}'):
+            entry = ModelEntry(name, model, model_features, metadata,
+                               demographics, model_dir, drift, projection)
+
+        self.entries[name] = entry
+        if self.default_name is None:
+            self.default_name = name
+        print(f"Model '{name}' ({entry.version}) loaded with "
+              f"{len(model_features)} features")
+        return entry
+
+    def get(self, name=None):
+        """Return the named entry, or the default one; KeyError if unknown."""
+        return self.entries[name or self.default_name]
+
+    def describe(self):
+        return {name: entry.describe() for name, entry in self.entries.items()}
+
+    @property
+    def demographics_tables(self):
+        return list(self._tables.values())
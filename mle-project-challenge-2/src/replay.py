@@ -0,0 +1,188 @@
+"""
+Captured traffic replay for Sound Realty House Price Prediction API
+
+Re-sends requests captured with CAPTURE_DIR in their original order and at
+their original offsets, optionally sped up or slowed down, and reports
+throughput and latency overall and per endpoint. Sends are open loop: each
+request's latency is measured from its scheduled send time, so time spent
+waiting for a free client counts against the server instead of silently
+lowering the offered rate. A previous run's --output can be given as
+--baseline for a side-by-side comparison.
+
+Usage: python replay.py CAPTURE [CAPTURE ...] [--url http://localhost:5005]
+                        [--speed 1] [--clients 16] [--limit N]
+                        [--output run.json] [--baseline previous.json]
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from capture import read_capture
+
+
+def load_requests(paths, limit=None):
+    """Captured requests from files and directories, in arrival order."""
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, '*.bin'))) if os.path.isdir(path) \
+            else [path]
+    records = [record for path in files for record in read_capture(path)]
+    # Files of several worker processes interleave
+    records.sort(key=lambda r: r.timestamp)
+    return records[:limit] if limit else records
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def _latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p90_ms": _percentile(latencies, 0.90) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def replay(records, host, port, speed=1.0, clients=16):
+    """Send `records` and collect per-request results.
+
+    Args:
+        speed: rate multiplier on the captured offsets; 0 sends as fast as
+            the clients allow
+    """
+    work = queue.Queue(maxsize=clients * 4)
+    results = []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local = []
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            record, scheduled = item
+            scheduled = scheduled or time.perf_counter()
+            try:
+                conn.request(record.method, record.target, record.body, record.headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = 0
+            local.append((record.target.split('?')[0], status,
+                          time.perf_counter() - scheduled))
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    first = records[0].timestamp if records else 0.0
+    max_lag = 0.0
+    for record in records:
+        scheduled = None
+        if speed > 0:
+            scheduled = started + (record.timestamp - first) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+        work.put((record, scheduled))
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    captured_span = records[-1].timestamp - first if records else 0.0
+    by_endpoint = {}
+    for path, _, latency in results:
+        by_endpoint.setdefault(path, []).append(latency)
+    return {
+        "requests": len(results),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "offered_rps": len(results) * speed / captured_span
+        if speed > 0 and captured_span > 0 else None,
+        "max_schedule_lag_ms": max_lag * 1000,
+        "statuses": dict(Counter(str(status) for _, status, _ in results)),
+        "latency": _latency_summary([latency for _, _, latency in results]),
+        "endpoints": {path: _latency_summary(latencies)
+                      for path, latencies in sorted(by_endpoint.items())},
+    }
+
+
+def print_report(result, baseline=None):
+    rows = [("throughput req/s", "throughput_rps")] + \
+        [(f"{key[:-3]} ms", key) for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms")]
+
+    def value(run, key):
+        return run[key] if key == "throughput_rps" else run["latency"][key]
+
+    print(f"{result['requests']} requests in {result['elapsed_s']:.1f}s, "
+          f"statuses {result['statuses']}, max schedule lag "
+          f"{result['max_schedule_lag_ms']:.1f} ms")
+    if baseline is None:
+        for label, key in rows:
+            print(f"{label:<18} {value(result, key):>10.2f}")
+    else:
+        print(f"{'':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+        for label, key in rows:
+            before, after = value(baseline, key), value(result, key)
+            change = f"{(after - before) / before:+.1%}" if before else "n/a"
+            print(f"{label:<18} {before:>10.2f} {after:>10.2f} {change:>8}")
+    print(f"{'endpoint':<30} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, summary in result["endpoints"].items():
+        print(f"{path:<30} {summary['count']:>7} {summary['p50_ms']:>8.2f} "
+              f"{summary['p99_ms']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('captures', nargs='+', help="capture files or directories")
+    parser.add_argument('--url', default='http://localhost:5005')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="rate multiplier (2 = twice as fast, 0 = unpaced)")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--limit', type=int, default=None,
+                        help="replay only the first N requests")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="results JSON of a previous run to compare with")
+    args = parser.parse_args()
+
+    records = load_requests(args.captures, args.limit)
+    if not records:
+        raise SystemExit("No captured requests found")
+    parts = urlsplit(args.url)
+    result = replay(records, parts.hostname, parts.port or 80, args.speed, args.clients)
+    result["speed"] = args.speed
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
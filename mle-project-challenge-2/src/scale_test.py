@@ -0,0 +1,160 @@
+"""
+Horizontal scaling load test for Sound Realty House Price Prediction API
+
+Starts 1, 2, 4... local replicas of app_production.py on consecutive ports,
+drives each configuration with a closed loop of keep-alive clients routed
+by consistent hashing on the request body (as nginx.conf does) or round
+robin, and reports throughput, latency and scaling efficiency.
+
+Usage: python scale_test.py [--replicas 1,2,4] [--clients-per-replica 4]
+                            [--duration 10] [--routing hash|round-robin]
+                            [--cache-size 0]
+"""
+import argparse
+import bisect
+import csv
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+DATA_DIR = './data' if os.path.exists('./data') else '../data'
+BASE_PORT = 5101
+VIRTUAL_NODES = 100
+
+
+class HashRing:
+    """Consistent hash ring over replica ports."""
+
+    def __init__(self, ports):
+        points = sorted((self._hash(f"{port}-{i}"), port)
+                        for port in ports for i in range(VIRTUAL_NODES))
+        self._hashes = [h for h, _ in points]
+        self._ports = [p for _, p in points]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def route(self, key):
+        i = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._ports[i]
+
+
+def start_replicas(count, cache_size):
+    procs = []
+    for i in range(count):
+        env = dict(os.environ, PORT=str(BASE_PORT + i), FAST_STARTUP='1',
+                   MAX_CONCURRENT='1', TRACE_LOG_SAMPLE_RATE='0',
+                   PREDICTION_CACHE_SIZE=str(cache_size))
+        procs.append(subprocess.Popen([sys.executable, 'app_production.py'], env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    ports = [BASE_PORT + i for i in range(count)]
+    deadline = time.time() + 120
+    for port in ports:
+        while True:
+            try:
+                conn = http.client.HTTPConnection('localhost', port, timeout=2)
+                conn.request('GET', '/ready')
+                if conn.getresponse().status == 200:
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline:
+                stop_replicas(procs)
+                raise SystemExit(f"replica on port {port} did not become ready")
+            time.sleep(0.5)
+    return procs, ports
+
+
+def stop_replicas(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.wait()
+
+
+def run_load(ports, bodies, clients, duration, routing):
+    ring = HashRing(ports)
+    round_robin = itertools.cycle(ports)
+    latencies, statuses, cache_hits = [], [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        conns = {}
+        local_latencies, local_statuses, local_hits = [], [], 0
+        for body in itertools.islice(itertools.cycle(bodies), offset, None):
+            if time.perf_counter() >= stop_at:
+                break
+            port = ring.route(body) if routing == 'hash' else next(round_robin)
+            conn = conns.get(port) or conns.setdefault(
+                port, http.client.HTTPConnection('localhost', port, timeout=30))
+            started = time.perf_counter()
+            conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses.append(response.status)
+            local_hits += response.getheader('X-Prediction-Cache') == 'hit'
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.extend(local_statuses)
+            cache_hits.append(local_hits)
+
+    threads = [threading.Thread(target=client, args=(i * 7,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": sum(status != 200 for status in statuses),
+        "cache_hit_ratio": sum(cache_hits) / max(len(latencies), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--replicas', default='1,2,4')
+    parser.add_argument('--clients-per-replica', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--routing', choices=['hash', 'round-robin'], default='hash')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="PREDICTION_CACHE_SIZE of each replica (0 measures "
+                             "pure compute scaling)")
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, 'future_unseen_examples.csv')) as f:
+        bodies = [json.dumps(row) for row in csv.DictReader(f)]
+
+    print(f"{os.cpu_count()} CPUs, routing={args.routing}, cache={args.cache_size}")
+    print(f"{'replicas':>8} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'cache hit':>9} {'efficiency':>10}")
+    single = None
+    for count in (int(n) for n in args.replicas.split(',')):
+        procs, ports = start_replicas(count, args.cache_size)
+        try:
+            clients = count * args.clients_per_replica
+            result = run_load(ports, bodies, clients, args.duration, args.routing)
+        finally:
+            stop_replicas(procs)
+        single = single or result['rps'] / count
+        print(f"{count:>8} {clients:>8} {result['rps']:>8.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7} "
+              f"{result['cache_hit_ratio']:>9.1%} {result['rps'] / (count * single):>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
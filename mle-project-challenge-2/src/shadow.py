@@ -0,0 +1,158 @@
+"""
+Shadow scoring and A/B traffic split for Sound Realty House Price Prediction API
+
+Shadow mode re-scores a sample of requests with a candidate model on a bounded
+background executor, after the primary response is computed; work is dropped
+rather than queued when the executor is saturated. Differences are kept as
+running aggregates. The A/B split routes a weighted share of requests to each
+model.
+"""
+import hashlib
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def parse_weights(spec):
+    """Parse "name=weight,name=weight" into a dict of floats."""
+    weights = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class ComparisonStats:
+    """Running error statistics of candidate vs primary predictions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.sum_sq_diff = 0.0
+        self.sum_abs_rel_diff = 0.0
+        self.max_abs_diff = 0.0
+
+    def update(self, primary, candidate):
+        diff = np.asarray(candidate, dtype=np.float64) - np.asarray(primary, dtype=np.float64)
+        abs_diff = np.abs(diff)
+        rel = abs_diff / np.maximum(np.abs(primary), 1.0)
+        with self._lock:
+            self.count += diff.size
+            self.sum_diff += float(diff.sum())
+            self.sum_abs_diff += float(abs_diff.sum())
+            self.sum_sq_diff += float((diff * diff).sum())
+            self.sum_abs_rel_diff += float(rel.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max(initial=0.0)))
+
+    def summary(self):
+        with self._lock:
+            n = self.count
+            if n == 0:
+                return {"count": 0}
+            return {
+                "count": n,
+                "mean_diff": self.sum_diff / n,
+                "mean_abs_diff": self.sum_abs_diff / n,
+                "rmse": math.sqrt(self.sum_sq_diff / n),
+                "mean_abs_relative_diff": self.sum_abs_rel_diff / n,
+                "max_abs_diff": self.max_abs_diff,
+            }
+
+
+class ShadowScorer:
+    """Score sampled requests against a candidate model off the request path."""
+
+    def __init__(self, candidate, sample_rate=0.1, max_workers=1, max_pending=64):
+        """
+        Args:
+            candidate: registry entry of the candidate model
+            sample_rate: fraction of requests shadow-scored
+            max_workers: background scoring threads
+            max_pending: queued plus running shadow jobs before new ones are dropped
+        """
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.stats = ComparisonStats()
+        self.submitted = 0
+        self.dropped = 0
+        self.failed = 0
+        self._count_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="shadow")
+
+    def maybe_submit(self, primary_name, payload, primary, batch=False, simple=False):
+        """Sample a request and queue its shadow scoring without blocking.
+
+        Args:
+            primary_name: model that served the request
+            payload: request body (house dict, or list of houses when batch)
+            primary: primary prediction(s)
+        """
+        if primary_name == self.candidate.name or random.random() >= self.sample_rate:
+            return False
+        if not self._slots.acquire(blocking=False):
+            with self._count_lock:
+                self.dropped += 1
+            return False
+        with self._count_lock:
+            self.submitted += 1
+        self._executor.submit(self._score, payload, primary, batch, simple)
+        return True
+
+    def _score(self, payload, primary, batch, simple):
+        try:
+            if batch:
+                rows = self.candidate.prepare_features_batch(payload)
+            else:
+                rows = self.candidate.prepare_features(payload, simple=simple)
+            candidate = self.candidate.model.predict(rows)
+            self.stats.update(np.atleast_1d(primary), candidate)
+        except Exception:
+            # The candidate may need fields the primary does not; count and move on
+            with self._count_lock:
+                self.failed += 1
+        finally:
+            self._slots.release()
+
+    def summary(self):
+        return {
+            "candidate": self.candidate.name,
+            "candidate_version": self.candidate.version,
+            "sample_rate": self.sample_rate,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "comparison": self.stats.summary(),
+        }
+
+
+class TrafficSplit:
+    """Weighted assignment of requests to models."""
+
+    def __init__(self, weights):
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("A/B split weights must sum to a positive number")
+        self.names = list(weights)
+        self.cumulative = np.cumsum([weights[n] / total for n in self.names]).tolist()
+
+    def choose(self, split_key=None):
+        """Pick a model; a split key (e.g. a user id) makes the choice sticky."""
+        if split_key:
+            digest = hashlib.sha1(split_key.encode()).digest()
+            point = int.from_bytes(digest[:8], 'big') / 2 ** 64
+        else:
+            point = random.random()
+        for name, edge in zip(self.names, self.cumulative):
+            if point < edge:
+                return name
+        return self.names[-1]
@@ -0,0 +1,68 @@
+"""
+In-flight request deduplication for Sound Realty House Price Prediction API
+
+Concurrent callers asking for the same key (the model version plus the
+assembled feature row, so "3" and 3.0 collapse together) share one
+computation: the first caller runs it and the others wait for its result or
+exception. Nothing is kept once the computation finishes; repeats after that
+are the prediction cache's job.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapses concurrent identical computations into one."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (future, True if the caller must compute it)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def _release(self, key):
+        with self._lock:
+            del self._calls[key]
+
+    def do(self, key, fn):
+        """Return fn(), shared with concurrent callers of the same key.
+
+        Returns:
+            Tuple of (result, True if this caller waited on another's call)
+        """
+        future, leader = self._join(key)
+        if leader:
+            return self._finish(key, future, fn), False
+        return future.result(), True
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
+
+    @property
+    def collapse_ratio(self):
+        """Share of calls served by another caller's computation."""
+        total = self.leaders + self.followers
+        return self.followers / total if total else 0.0
@@ -0,0 +1,182 @@
+"""
+Structured per-request timing traces for Sound Realty House Price Prediction API
+
+Each request gets a Trace with named span timings. Finished traces are written
+as JSON log lines, optionally exposed as a Server-Timing header, and sampled so
+tracing can stay on at full load. Errors are always logged with their stack,
+and other 5xx responses (e.g. 503s when shedding load) are always logged
+too, both subject to a per-second cap.
+"""
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.trace.spans
+        spans[self.name] = spans.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000
+        return False
+
+
+class Trace:
+    """Span timings for one request."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans = {}
+        # Set once log_exception has logged this request
+        self.error_logged = False
+
+    def span(self, name):
+        """Context manager adding the duration of `name` in milliseconds."""
+        return _Span(self, name)
+
+    def duration_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Format spans as a Server-Timing header value."""
+        parts = [f"{name};dur={ms:.3f}" for name, ms in self.spans.items()]
+        parts.append(f"total;dur={self.duration_ms():.3f}")
+        return ", ".join(parts)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTrace:
+    """Trace stand-in for code paths that run outside a request."""
+
+    request_id = None
+    _span = _NullSpan()
+
+    def span(self, name):
+        return self._span
+
+
+NULL_TRACE = NullTrace()
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry)
+
+
+class Tracer:
+    """Create traces and emit them as sampled structured logs."""
+
+    def __init__(self, log_sample_rate=1.0, error_logs_per_sec=10.0,
+                 server_timing=False, logger_name="soundrealty.trace"):
+        """
+        Args:
+            log_sample_rate: fraction of requests below 500 logged; 5xx
+                responses are always logged
+            error_logs_per_sec: cap on logged errors and 5xx responses per
+                second; excess ones are counted and reported on the next
+                logged one
+            server_timing: add a Server-Timing header to responses
+        """
+        self.log_sample_rate = log_sample_rate
+        self.error_logs_per_sec = error_logs_per_sec
+        self.server_timing = server_timing
+
+        self.logger = logging.getLogger(logger_name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(JsonFormatter())
+            self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+        self._lock = threading.Lock()
+        self._error_window = 0
+        self._error_count = 0
+        self._errors_suppressed = 0
+
+    def start(self, request_id=None):
+        return Trace(request_id or uuid.uuid4().hex)
+
+    def finish(self, trace, method, path, status):
+        """Log a completed request if it is sampled or failed."""
+        if status >= 500:
+            # Unhandled exceptions were already logged with their stack
+            if not trace.error_logged:
+                fields = self._error_fields(trace, method, path, status)
+                if fields is not None:
+                    self.logger.warning("request", extra={"fields": fields})
+            return
+        if random.random() >= self.log_sample_rate:
+            return
+        self.logger.info("request", extra={"fields": self._fields(trace, method, path, status)})
+
+    def log_exception(self, trace, method, path, exc):
+        """Log an unhandled exception with its stack, rate limited."""
+        trace.error_logged = True
+        fields = self._error_fields(trace, method, path, 500)
+        if fields is None:
+            return
+        self.logger.error(f"{type(exc).__name__}: {exc}",
+                          exc_info=(type(exc), exc, exc.__traceback__),
+                          extra={"fields": fields})
+
+    def _error_fields(self, trace, method, path, status):
+        """Log fields of an error within the per-second cap, else None."""
+        now = int(time.time())
+        with self._lock:
+            if now != self._error_window:
+                self._error_window = now
+                self._error_count = 0
+            if self._error_count >= self.error_logs_per_sec:
+                self._errors_suppressed += 1
+                return None
+            self._error_count += 1
+            suppressed, self._errors_suppressed = self._errors_suppressed, 0
+
+        fields = self._fields(trace, method, path, status)
+        if suppressed:
+            fields["errors_suppressed"] = suppressed
+        return fields
+
+    @staticmethod
+    def _fields(trace, method, path, status):
+        return {
+            "request_id": trace.request_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(trace.duration_ms(), 3),
+            "spans_ms": {name: round(ms, 3) for name, ms in trace.spans.items()},
+        }
@@ -0,0 +1,231 @@
+"""
+Unix domain socket binary protocol for Sound Realty House Price Prediction API
+
+A listener for callers on the same node that skips HTTP, JSON and routing.
+It predicts with the models and feature plans the HTTP routes use, and is
+admitted by the same capacity limiter. Connections are persistent; each
+request and response is one frame: a uint32 little-endian body length
+followed by the body.
+
+Request body: version (uint8), op (uint8), model name length (uint16), the
+model name (UTF-8; empty for the default model), then for OP_PREDICT the
+row count (uint32), column count (uint16) and the rows as row-major
+little-endian float64. Columns are the model's house fields followed by
+zipcode, in the order OP_SCHEMA returns. NaN marks a missing value; rows
+are validated like a /predict/batch body (a missing house field is 0).
+
+Response body: status (uint8), then for STATUS_OK the schema as JSON
+(OP_SCHEMA) or the price count (uint32) and prices as float64 (OP_PREDICT);
+for any other status a UTF-8 error message.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+import numpy as np
+
+from validation import describe_row
+
+VERSION = 1
+OP_SCHEMA = 1
+OP_PREDICT = 2
+STATUS_OK = 0
+STATUS_BAD_REQUEST = 1
+STATUS_BUSY = 2
+STATUS_ERROR = 3
+FRAME = struct.Struct('<I')
+REQUEST_HEADER = struct.Struct('<BBH')
+PREDICT_HEADER = struct.Struct('<IH')
+COUNT = struct.Struct('<I')
+MAX_FRAME_BYTES = 16 << 20
+# Invalid rows described in a STATUS_BAD_REQUEST message
+MAX_REPORTED_ROWS = 10
+
+
+class ProtocolError(ValueError):
+    """Malformed or invalid request; answered with STATUS_BAD_REQUEST."""
+
+
+class _Busy(Exception):
+    """The capacity limiter shed the request."""
+
+
+def read_frame(stream):
+    """Read one frame body from a binary stream; None on a clean EOF."""
+    header = stream.read(FRAME.size)
+    if not header:
+        return None
+    if len(header) < FRAME.size:
+        raise EOFError("connection closed inside a frame header")
+    (length,) = FRAME.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    body = stream.read(length)
+    if len(body) < length:
+        raise EOFError("connection closed inside a frame")
+    return body
+
+
+def frame(body):
+    return FRAME.pack(len(body)) + body
+
+
+class BinaryPredictionService:
+    """Decodes protocol requests and predicts with registry entries."""
+
+    def __init__(self, registry, capacity=None, max_rows=1000, on_predict=None):
+        """
+        Args:
+            registry: ModelRegistry shared with the HTTP routes
+            capacity: optional CapacityLimiter shared with the HTTP routes
+            max_rows: largest OP_PREDICT batch
+            on_predict: optional callback(entry, features, zipcodes, prices)
+                after each prediction, e.g. for metrics and drift monitoring
+        """
+        self.registry = registry
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self.on_predict = on_predict
+        self.responses = dict.fromkeys(
+            (STATUS_OK, STATUS_BAD_REQUEST, STATUS_BUSY, STATUS_ERROR), 0)
+        self._lock = threading.Lock()
+
+    def handle(self, body):
+        """Answer one request body with (status, response payload)."""
+        try:
+            status, payload = STATUS_OK, self._dispatch(body)
+        except ProtocolError as e:
+            status, payload = STATUS_BAD_REQUEST, str(e).encode()
+        except _Busy:
+            status, payload = STATUS_BUSY, b"Server at capacity, retry shortly"
+        except Exception as e:
+            status, payload = STATUS_ERROR, f"Internal server error: {e}".encode()
+        with self._lock:
+            self.responses[status] += 1
+        return status, payload
+
+    def _dispatch(self, body):
+        if len(body) < REQUEST_HEADER.size:
+            raise ProtocolError("truncated request header")
+        version, op, name_length = REQUEST_HEADER.unpack_from(body)
+        if version != VERSION:
+            raise ProtocolError(f"unsupported protocol version {version}")
+        offset = REQUEST_HEADER.size + name_length
+        name = body[REQUEST_HEADER.size:offset].decode() or None
+        try:
+            entry = self.registry.get(name)
+        except KeyError:
+            raise ProtocolError(f"Unknown model: {name}")
+        if op == OP_SCHEMA:
+            return json.dumps({
+                "model": entry.name,
+                "model_version": entry.version,
+                "columns": entry.feature_plan.house_fields + ['zipcode'],
+                "max_rows": self.max_rows,
+            }).encode()
+        if op == OP_PREDICT:
+            return self._predict(entry, body, offset)
+        raise ProtocolError(f"unknown op {op}")
+
+    def _predict(self, entry, body, offset):
+        if len(body) < offset + PREDICT_HEADER.size:
+            raise ProtocolError("truncated predict header")
+        n_rows, n_cols = PREDICT_HEADER.unpack_from(body, offset)
+        n_fields = len(entry.feature_plan.house_fields)
+        if n_cols != n_fields + 1:
+            raise ProtocolError(f"model {entry.name} expects {n_fields + 1} columns, "
+                                f"got {n_cols}")
+        if not 0 < n_rows <= self.max_rows:
+            raise ProtocolError(f"row count must be between 1 and {self.max_rows}")
+        offset += PREDICT_HEADER.size
+        if len(body) != offset + n_rows * n_cols * 8:
+            raise ProtocolError("row data does not match the row and column counts")
+        rows = np.frombuffer(body, dtype='<f8', count=n_rows * n_cols,
+                             offset=offset).reshape(n_rows, n_cols)
+
+        # The same schema checks and feature assembly as /predict/batch
+        zipcodes = rows[:, n_fields]
+        features, _, errors = entry.prepare_features_arrays(rows[:, :n_fields], zipcodes)
+        if errors:
+            raise ProtocolError('; '.join(
+                f"row {i}: {describe_row(errors[i])}"
+                for i in sorted(errors)[:MAX_REPORTED_ROWS]))
+
+        if self.capacity is not None and not self.capacity.acquire():
+            raise _Busy()
+        try:
+            prices = entry.model.predict(features)
+        finally:
+            if self.capacity is not None:
+                self.capacity.release()
+        if self.on_predict is not None:
+            self.on_predict(entry, features, zipcodes, prices)
+        return COUNT.pack(len(prices)) + prices.astype('<f8').tobytes()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                body = read_frame(self.rfile)
+            except ProtocolError as e:
+                self.wfile.write(frame(bytes([STATUS_BAD_REQUEST]) + str(e).encode()))
+                return
+            except (EOFError, OSError):
+                return
+            if body is None:
+                return
+            status, payload = service.handle(body)
+            try:
+                self.wfile.write(frame(bytes([status]) + payload))
+            except OSError:
+                return
+
+
+class UnixSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded listener for the binary protocol, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, service, path=None, listening_socket=None):
+        """
+        Args:
+            service: BinaryPredictionService answering requests
+            path: socket path to bind (replacing a stale socket file)
+            listening_socket: an already bound and listening socket, e.g.
+                inherited from the gunicorn master
+        """
+        self.service = service
+        if listening_socket is not None:
+            super().__init__(None, _Handler, bind_and_activate=False)
+            self.socket.close()
+            self.socket = listening_socket
+            self.server_address = listening_socket.getsockname()
+        else:
+            _remove_stale(path)
+            super().__init__(path, _Handler)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="uds-server", daemon=True)
+        thread.start()
+        return thread
+
+
+def _remove_stale(path):
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+
+
+def bind_unix_socket(path, backlog=128):
+    """Bind and listen on `path`, for a parent process to share with workers."""
+    _remove_stale(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
@@ -0,0 +1,104 @@
+"""
+Unix domain socket client for Sound Realty House Price Prediction API
+
+Client for the binary protocol in uds.py. One PriceClient holds one
+persistent connection and is not thread-safe; use one per thread.
+
+Usage:
+    with PriceClient('/run/soundrealty/api.sock') as client:
+        prices = client.predict([{"bedrooms": 3, "sqft_living": 1800,
+                                  "zipcode": 98103}])
+"""
+import json
+import socket
+
+import numpy as np
+
+from uds import (COUNT, FRAME, OP_PREDICT, OP_SCHEMA, PREDICT_HEADER, REQUEST_HEADER,
+                 STATUS_BUSY, STATUS_OK, VERSION, read_frame)
+
+
+class PriceServiceError(Exception):
+    """The server answered with an error status."""
+
+    def __init__(self, status, message):
+        self.status = status
+        super().__init__(message)
+
+    @property
+    def retryable(self):
+        return self.status == STATUS_BUSY
+
+
+class PriceClient:
+    """Predicts prices over the API's Unix domain socket."""
+
+    def __init__(self, path, model=None, timeout=10.0):
+        """
+        Args:
+            path: socket path (UDS_PATH of the API)
+            model: model name; None for the API's default model
+            timeout: socket timeout in seconds
+        """
+        self.model = (model or '').encode()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._stream = self._sock.makefile('rb')
+        self._schema = None
+
+    def _call(self, op, payload=b''):
+        body = REQUEST_HEADER.pack(VERSION, op, len(self.model)) + self.model + payload
+        self._sock.sendall(FRAME.pack(len(body)) + body)
+        response = read_frame(self._stream)
+        if response is None:
+            raise ConnectionError("server closed the connection")
+        status = response[0]
+        if status != STATUS_OK:
+            raise PriceServiceError(status, response[1:].decode())
+        return response[1:]
+
+    @property
+    def schema(self):
+        """Model name, version, row columns and batch limit (fetched once)."""
+        if self._schema is None:
+            self._schema = json.loads(self._call(OP_SCHEMA))
+        return self._schema
+
+    @property
+    def columns(self):
+        return self.schema['columns']
+
+    def predict_rows(self, rows):
+        """Predict from a float array of shape (n, len(columns)).
+
+        Missing house fields are NaN. Returns a float64 array of prices.
+        """
+        rows = np.ascontiguousarray(rows, dtype='<f8')
+        if rows.ndim != 2:
+            raise ValueError("rows must be a 2-D array")
+        payload = PREDICT_HEADER.pack(rows.shape[0], rows.shape[1]) + rows.tobytes()
+        response = self._call(OP_PREDICT, payload)
+        (count,) = COUNT.unpack_from(response)
+        return np.frombuffer(response, dtype='<f8', count=count, offset=COUNT.size)
+
+    def predict(self, houses):
+        """Predict from a list of house dicts (the JSON API's fields)."""
+        columns = self.columns
+        rows = np.full((len(houses), len(columns)), np.nan)
+        for i, house in enumerate(houses):
+            for j, field in enumerate(columns):
+                value = house.get(field)
+                if value is not None:
+                    rows[i, j] = float(value)
+        return self.predict_rows(rows)
+
+    def close(self):
+        self._stream.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,266 @@
+"""
+Compiled request validation for Sound Realty House Price Prediction API
+
+A RequestSchema is built once at startup from the model's feature plan and
+validates/coerces a single request or a whole batch (column by column with
+numpy), reporting precise per-field errors instead of coercing garbage to 0.
+Inputs that arrive as columns of numbers (the binary protocol, CSV scoring
+jobs and inventories) go through the same column checks.
+"""
+import math
+
+import numpy as np
+
+ZIPCODE_FIELD = 'zipcode'
+MISSING = "missing required field"
+
+
+class ValidationError(ValueError):
+    """Request failed validation; `errors` maps field (or row) to message."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(_summarize(errors))
+
+
+def _summarize(errors):
+    if all(isinstance(key, int) for key in errors):
+        return f"Invalid rows: {sorted(errors)}"
+    missing = [f for f, msg in errors.items() if msg == MISSING]
+    if missing and len(missing) == len(errors):
+        return f"Missing required features: {missing}"
+    return f"Invalid request fields: {sorted(errors, key=str)}"
+
+
+def _coerce_number(value):
+    """Coerce one JSON value to float; raise ValueError with a reason."""
+    kind = type(value)
+    if kind is float or kind is int:
+        number = float(value)
+    elif kind is str:
+        try:
+            number = float(value.strip())
+        except ValueError:
+            raise ValueError(f"not a number: {value!r}")
+    else:
+        raise ValueError(f"expected a number, got {kind.__name__}")
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+def _coerce_zipcode(value):
+    """Coerce a zipcode given as int, float or numeric string to an int."""
+    number = _coerce_number(value)
+    if not number.is_integer() or not 0 <= number <= 99999:
+        raise ValueError(f"not a 5-digit zipcode: {value!r}")
+    return int(number)
+
+
+def _format_number(number):
+    return repr(int(number)) if number.is_integer() else repr(number)
+
+
+def describe_row(row_errors):
+    """One line for a row's field errors, e.g. "zipcode: missing required field"."""
+    return '; '.join(f"{field}: {message}" for field, message in row_errors.items())
+
+
+def parse_column(column, field, errors):
+    """Convert one column of JSON values in a single numpy pass.
+
+    Returns:
+        float64 array with NaN where a value is None (missing); values that
+        are not finite numbers get an error in `errors` (keyed by row index,
+        then field) and 0
+    """
+    try:
+        values = np.array(column, dtype=np.float64)
+    except (TypeError, ValueError):
+        values = np.empty(len(column), dtype=np.float64)
+        for i, value in enumerate(column):
+            if value is None:
+                values[i] = np.nan
+                continue
+            try:
+                values[i] = _coerce_number(value)
+            except ValueError as e:
+                errors.setdefault(i, {})[field] = str(e)
+                values[i] = 0.0
+        return values
+    # numpy accepts booleans as numbers; the single-row path does not
+    for i, value in enumerate(column):
+        if type(value) is bool:
+            errors.setdefault(i, {})[field] = "expected a number, got bool"
+    not_finite = ~np.isfinite(values)
+    if not_finite.any():
+        for i in np.flatnonzero(not_finite).tolist():
+            if column[i] is not None:
+                errors.setdefault(i, {})[field] = f"not a finite number: {column[i]!r}"
+                values[i] = 0.0
+    return values
+
+
+def parse_csv_column(column, field, errors):
+    """Like `parse_column` for a column of a pandas CSV frame (NaN where empty)."""
+    if column.dtype.kind in 'biuf':
+        return column.to_numpy(dtype=np.float64, na_value=np.nan)
+    return parse_column(column.astype(object).where(column.notna(), None).tolist(),
+                        field, errors)
+
+
+def validate_location(house_data):
+    """Validate the `lat` and `long` of a request for geospatial search.
+
+    Returns:
+        Tuple of (latitude, longitude) as floats
+
+    Raises:
+        ValidationError: with a message per offending field
+    """
+    errors = {}
+    location = []
+    for field, limit in (('lat', 90.0), ('long', 180.0)):
+        value = house_data.get(field) if isinstance(house_data, dict) else None
+        if value is None:
+            errors[field] = MISSING
+            continue
+        try:
+            number = _coerce_number(value)
+        except ValueError as e:
+            errors[field] = str(e)
+            continue
+        if not -limit <= number <= limit:
+            errors[field] = f"out of range: {value!r}"
+        location.append(number)
+    if errors:
+        raise ValidationError(errors)
+    return tuple(location)
+
+
+class RequestSchema:
+    """Validator for one endpoint's request body."""
+
+    def __init__(self, fields, required=()):
+        """
+        Args:
+            fields: numeric house fields, in the order values are returned
+                (the feature plan's `house_fields`)
+            required: fields that must be present; others default to 0.
+                The zipcode is always required.
+        """
+        self.fields = list(fields)
+        required = set(required)
+        self.required = [f for f in self.fields if f in required]
+        self._field_required = [(f, f in required) for f in self.fields]
+
+    def validate(self, house_data):
+        """Validate one request body.
+
+        Returns:
+            Tuple of (list of floats in `fields` order, integer zipcode)
+
+        Raises:
+            ValidationError: with a message per offending field
+        """
+        if not isinstance(house_data, dict):
+            raise ValidationError({"body": "expected a JSON object"})
+
+        errors = {}
+        values = []
+        for field, required in self._field_required:
+            value = house_data.get(field)
+            if value is None:
+                if required:
+                    errors[field] = MISSING
+                values.append(0.0)
+                continue
+            try:
+                values.append(_coerce_number(value))
+            except ValueError as e:
+                errors[field] = str(e)
+                values.append(0.0)
+
+        zipcode = house_data.get(ZIPCODE_FIELD)
+        if zipcode is None:
+            errors[ZIPCODE_FIELD] = MISSING
+        else:
+            try:
+                zipcode = _coerce_zipcode(zipcode)
+            except ValueError as e:
+                errors[ZIPCODE_FIELD] = str(e)
+
+        if errors:
+            raise ValidationError(errors)
+        return values, zipcode
+
+    def validate_batch(self, records):
+        """Validate a list of request bodies column by column.
+
+        Returns:
+            Tuple of (float64 array of shape (n, len(fields)), int64 zipcodes)
+
+        Raises:
+            ValidationError: errors keyed by row index, then field
+        """
+        errors = {}
+        matrix, zipcodes = self.parse_batch(records, errors)
+        if errors:
+            raise ValidationError(errors)
+        return matrix, zipcodes
+
+    def parse_batch(self, records, errors):
+        """`validate_batch` that adds row errors to `errors` instead of raising.
+
+        Raises:
+            ValidationError: `records` is not a list of objects
+        """
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValidationError({"body": "expected a list of JSON objects"})
+
+        matrix = np.empty((len(records), len(self.fields)), dtype=np.float64)
+        for j, field in enumerate(self.fields):
+            matrix[:, j] = parse_column([r.get(field) for r in records], field, errors)
+        zipcodes = parse_column([r.get(ZIPCODE_FIELD) for r in records],
+                                ZIPCODE_FIELD, errors)
+        return self.validate_columns(matrix, zipcodes, errors)
+
+    def validate_columns(self, house_matrix, zipcodes, errors):
+        """Check columns that are already numbers, NaN marking a missing value.
+
+        Missing optional fields become 0; missing required fields, infinite
+        values and zipcodes that are not 5-digit integers are added to
+        `errors` (keyed by row index, then field), one message per field.
+
+        Args:
+            house_matrix: array of shape (n, len(fields)), not modified
+            zipcodes: float array of n zipcodes
+            errors: errors already found in these rows, e.g. while parsing
+
+        Returns:
+            Tuple of (float64 matrix, int64 zipcodes; 0 where invalid)
+        """
+        matrix = np.array(house_matrix, dtype=np.float64)
+        for j, (field, required) in enumerate(self._field_required):
+            column = matrix[:, j]
+            not_finite = ~np.isfinite(column)
+            if not not_finite.any():
+                continue
+            for i in np.flatnonzero(not_finite).tolist():
+                if field in errors.get(i, {}):
+                    continue
+                if not np.isnan(column[i]):
+                    errors.setdefault(i, {})[field] = \
+                        f"not a finite number: {float(column[i])!r}"
+                elif required:
+                    errors.setdefault(i, {})[field] = MISSING
+            column[not_finite] = 0.0
+
+        zipcodes = np.asarray(zipcodes, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            bad = ~((zipcodes == np.floor(zipcodes)) & (zipcodes >= 0) & (zipcodes <= 99999))
+        for i in np.flatnonzero(bad).tolist():
+            if ZIPCODE_FIELD not in errors.get(i, {}):
+                errors.setdefault(i, {})[ZIPCODE_FIELD] = MISSING if np.isnan(zipcodes[i]) \
+                    else f"not a 5-digit zipcode: {_format_number(float(zipcodes[i]))}"
+        return matrix, np.where(bad, 0, zipcodes).astype(np.int64)
@@ -0,0 +1,63 @@
+"""
+Test configuration for Sound Realty House Price Prediction API
+
+The API modules are flat files in src/, imported by name as the server
+imports them, and create_model.py is imported from the project root; the
+model artifacts under model/ are used where a test needs a trained model.
+"""
+import os
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_DIR, 'src')
+MODEL_DIR = os.path.join(PROJECT_DIR, 'model')
+DEMOGRAPHICS_CSV = os.path.join(PROJECT_DIR, 'data', 'zipcode_demographics.csv')
+
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+
+@pytest.fixture(scope='session')
+def registry():
+    """ModelRegistry serving the trained model in model/ as 'default'."""
+    if not os.path.exists(os.path.join(MODEL_DIR, 'model.pkl')):
+        pytest.skip("no trained model; run create_model.py")
+    from registry import ModelRegistry
+    models = ModelRegistry(PROJECT_DIR, DEMOGRAPHICS_CSV)
+    models.load('default', MODEL_DIR)
+    return models
+
+
+# Serving configuration of the `app` fixture; read when app_production is imported
+APP_ENV = {
+    'MODEL_REGISTRY': 'default=model,rich=model/rich',
+    'AB_SPLIT': 'default=1,rich=1',
+    'WARMUP_ENABLED': '0',
+    'TRACE_LOG_SAMPLE_RATE': '0',
+    'RELOAD_POLL_SECONDS': '0',
+    'PROFILE_TRUSTED_NETWORKS': '127.0.0.0/8',
+    'ALLOCATION_TRACING': '1',
+    # One prediction slot, so a test holding it puts requests in the queue
+    'MAX_CONCURRENT': '1',
+    'QUEUE_TIMEOUT_SECONDS': '0.05',
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The production Flask app serving model/ and model/rich (APP_ENV)."""
+    if not os.path.exists(os.path.join(MODEL_DIR, 'rich', 'model.pkl')):
+        pytest.skip("no model/rich; see the README")
+    saved_env, saved_cwd = dict(os.environ), os.getcwd()
+    os.environ.update(APP_ENV)
+    # Model directories are resolved against the working directory
+    os.chdir(PROJECT_DIR)
+    try:
+        import app_production
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+    return app_production
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import capacity
+from capacity import CapacityLimiter, available_cpus
+from prediction_cache import PredictionCache
+
+WAIT = 5
+
+
+def waiting(limiter, count):
+    for _ in range(WAIT * 1000):
+        if limiter.queue_depth >= count:
+            return
+        time.sleep(0.001)
+    raise AssertionError(f"{count} requests never queued")
+
+
+def test_queued_request_gets_the_released_slot():
+    limiter = CapacityLimiter(1, max_queue=2, queue_timeout=WAIT)
+    assert limiter.acquire()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(limiter.acquire()))
+    thread.start()
+    waiting(limiter, 1)
+    assert limiter.snapshot()['queue_depth'] == 1
+    limiter.release()
+    thread.join()
+    assert result == [True]
+    assert (limiter.in_flight, limiter.admitted, limiter.shed) == (1, 2, 0)
+
+
+def test_full_queue_and_timeouts_are_shed():
+    limiter = CapacityLimiter(1, max_queue=1, queue_timeout=WAIT, ready_queue_depth=1)
+    assert limiter.acquire()
+    thread = threading.Thread(target=limiter.acquire)
+    thread.start()
+    waiting(limiter, 1)
+    assert limiter.saturated
+    # The queue is full: shed without waiting
+    started = time.perf_counter()
+    assert not limiter.acquire()
+    assert time.perf_counter() - started < 1
+    limiter.release()
+    thread.join()
+    assert not limiter.acquire(timeout=0.01)
+    assert limiter.snapshot() == {"in_flight": 1, "queue_depth": 0, "max_concurrent": 1,
+                                  "max_queue": 1, "saturated": False, "shed": 2,
+                                  "degraded": 0}
+
+
+def test_ready_depth_defaults_to_half_the_queue():
+    assert CapacityLimiter(2, max_queue=32).ready_queue_depth == 16
+    assert CapacityLimiter(2, max_queue=1).ready_queue_depth == 1
+
+
+@pytest.mark.parametrize('cpu_max, expected', [('max 100000', 8), ('150000 100000', 2),
+                                               ('50000 100000', 1)])
+def test_available_cpus_follows_the_cgroup_quota(tmp_path, monkeypatch, cpu_max, expected):
+    (tmp_path / 'cpu.max').write_text(cpu_max + '\n')
+    monkeypatch.setattr(capacity, 'CGROUP_CPU_MAX', str(tmp_path / 'cpu.max'))
+    monkeypatch.setattr(capacity.os, 'sched_getaffinity', lambda pid: set(range(8)),
+                        raising=False)
+    assert available_cpus() == expected
+
+
+def test_available_cpus_reads_cgroup_v1(tmp_path, monkeypatch):
+    (tmp_path / 'quota').write_text('300000\n')
+    (tmp_path / 'period').write_text('100000\n')
+    monkeypatch.setattr(capacity, 'CGROUP_CPU_MAX', str(tmp_path / 'missing'))
+    monkeypatch.setattr(capacity, 'CGROUP_V1_QUOTA', str(tmp_path / 'quota'))
+    monkeypatch.setattr(capacity, 'CGROUP_V1_PERIOD', str(tmp_path / 'period'))
+    monkeypatch.setattr(capacity.os, 'sched_getaffinity', lambda pid: set(range(8)),
+                        raising=False)
+    assert available_cpus() == 3
+
+
+class Entry:
+    name, version = 'default', 'v1'
+
+
+def test_prediction_cache_evicts_the_least_recently_used():
+    cache = PredictionCache(2)
+    keys = [PredictionCache.key(Entry, np.array([[float(i)]])) for i in range(3)]
+    cache.put(keys[0], np.array([1.0]))
+    cache.put(keys[1], np.array([2.0]))
+    assert cache.get(keys[0]).tolist() == [1.0]
+    cache.put(keys[2], np.array([3.0]))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert (len(cache), cache.hits, cache.misses) == (2, 3, 1)
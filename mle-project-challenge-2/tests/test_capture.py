@@ -0,0 +1,113 @@
+import glob
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+import capture
+from capture import TrafficCapture, read_capture
+from replay import load_requests, replay
+
+HEADERS = {'Content-Type': 'application/json', 'X-Latency-Budget-Ms': '50',
+           'X-Split-Key': 'user-1', 'Authorization': 'secret'}
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorders = []
+
+    def make(**options):
+        recorders.append(TrafficCapture(str(tmp_path), **options))
+        return recorders[-1]
+    yield make
+    for r in recorders:
+        r.close()
+
+
+def test_records_round_trip(recorder, tmp_path):
+    traffic = recorder()
+    assert traffic.maybe_capture('POST', '/predict?explain=true', HEADERS, b'{"a": 1}')
+    assert traffic.maybe_capture('GET', '/models/rich/predict', {}, b'')
+    traffic.close()
+    records = load_requests([str(tmp_path)])
+    assert [(r.method, r.target, r.body) for r in records] == [
+        ('POST', '/predict?explain=true', b'{"a": 1}'), ('GET', '/models/rich/predict', b'')]
+    assert records[0].headers == {name: value for name, value in HEADERS.items()
+                                  if name != 'Authorization'}
+    assert records[1].headers == {}
+    assert records[0].timestamp <= records[1].timestamp
+    assert traffic.summary()['written'] == 2
+
+
+def test_unsampled_and_overflowing_records_are_not_written(recorder, monkeypatch):
+    assert not recorder(sample_rate=0).maybe_capture('POST', '/predict', {}, b'{}')
+    release = threading.Event()
+    write = TrafficCapture._write
+    monkeypatch.setattr(TrafficCapture, '_write',
+                        lambda self, record: release.wait(5) and write(self, record))
+    traffic = recorder(max_buffer=1)
+    results = [traffic.maybe_capture('POST', '/predict', {}, b'{}') for _ in range(5)]
+    release.set()
+    traffic.close()
+    # The writer may have taken the first record off the queue already
+    assert results.count(True) in (1, 2) and traffic.dropped == 5 - results.count(True)
+    assert traffic.written == results.count(True)
+
+
+def test_files_rotate_and_the_oldest_are_removed(recorder, tmp_path):
+    traffic = recorder(max_file_bytes=1, max_files=2)
+    for i in range(4):
+        traffic.maybe_capture('POST', '/predict', {}, str(i).encode())
+        # One record per file: wait until it is written
+        for _ in range(5000):
+            if traffic.written > i:
+                break
+            threading.Event().wait(0.001)
+    traffic.close()
+    files = sorted(glob.glob(os.path.join(str(tmp_path), '*.bin')))
+    assert traffic.files == 4 and len(files) == 2
+    assert [r.body for path in files for r in read_capture(path)] == [b'2', b'3']
+
+
+def test_truncated_record_ends_the_file(tmp_path):
+    path = tmp_path / 'capture.bin'
+    record = capture.RECORD_HEADER.pack(1.0, 13, 0, 2) + b'POST /predict{}'
+    path.write_bytes(capture.MAGIC + record + record[:-3])
+    assert [r.body for r in read_capture(str(path))] == [b'{}']
+    (tmp_path / 'other.bin').write_bytes(b'nope')
+    with pytest.raises(ValueError, match='not a capture file'):
+        list(read_capture(str(tmp_path / 'other.bin')))
+
+
+class Echo(http.server.BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        Echo.received.append((self.path, self.headers.get('X-Latency-Budget-Ms'), body))
+        self.send_response(503 if b'shed' in body else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_replay_resends_requests_with_their_headers(recorder, tmp_path):
+    traffic = recorder()
+    for body in (b'{"a": 1}', b'shed', b'{"a": 2}'):
+        traffic.maybe_capture('POST', '/predict', HEADERS, body)
+    traffic.close()
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Echo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        result = replay(load_requests([str(tmp_path)]), '127.0.0.1', server.server_port,
+                        speed=0, clients=1)
+    finally:
+        server.shutdown()
+    assert result['requests'] == 3 and result['statuses'] == {'200': 2, '503': 1}
+    assert Echo.received == [('/predict', '50', b'{"a": 1}'), ('/predict', '50', b'shed'),
+                             ('/predict', '50', b'{"a": 2}')]
+    assert json.loads(json.dumps(result))['endpoints']['/predict']['count'] == 3
@@ -0,0 +1,201 @@
+import os
+import sys
+
+import numpy as np
+import pandas
+import pytest
+
+import create_model
+from conftest import PROJECT_DIR
+
+
+def synthetic(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    x = pandas.DataFrame(rng.normal(size=(n, 3)) * [1000, 1, 50000],
+                         columns=['sqft_living', 'bathrooms', 'hous_val_amt'])
+    y = pandas.Series(300 * x['sqft_living'] + x['hous_val_amt'] + 500000, name='price')
+    return x, y
+
+
+def test_precision_check_queries_the_reference_in_float64():
+    x, y = synthetic()
+    reference = create_model.fit_model(x, y)
+    reduced = create_model.fit_model(x, y, 'float32')
+    queried = []
+
+    class Recording:
+        def predict(self, rows):
+            queried.append(rows.dtypes.unique().tolist())
+            return reference.predict(rows)
+
+    check = create_model.compare_precision(Recording(), reduced, x, 'float32')
+    assert queried == [[np.float64]]
+    assert check['dtype'] == 'float32' and check['rows'] == len(x)
+    assert 0 <= check['mean_relative_diff'] <= check['max_relative_diff'] < 1e-3
+
+
+@pytest.fixture
+def build(monkeypatch, tmp_path):
+    """Run create_model.main with arguments, recording the fit_model calls."""
+    monkeypatch.chdir(PROJECT_DIR)
+    calls = []
+    models = []
+    fit_model = create_model.fit_model
+
+    def recording_fit(x_train, y_train, dtype='float64', preprocessor=None):
+        calls.append((x_train.dtypes.unique().tolist(), dtype))
+        models.append(fit_model(x_train, y_train, dtype, preprocessor))
+        return models[-1]
+
+    monkeypatch.setattr(create_model, 'fit_model', recording_fit)
+
+    def run(*args):
+        monkeypatch.setattr(sys, 'argv', ['create_model.py', '--output-dir',
+                                          str(tmp_path / 'out'), *args])
+        create_model.main()
+    run.calls = calls
+    run.models = models
+    run.output_dir = tmp_path / 'out'
+    return run
+
+
+@pytest.mark.parametrize('chunk_rows', ['20000', '0'])
+def test_float32_guardrail_fits_the_reference_on_float64(build, chunk_rows):
+    with pytest.raises(SystemExit, match='float32 predictions differ from float64 by up '
+                                         'to .* artifact not written'):
+        build('--dtype', 'float32', '--max-relative-diff', '0', '--chunk-rows', chunk_rows)
+    # The legacy loader keeps integer sales columns; neither rounds to float32
+    (reference_types, reference_dtype), (reduced_types, reduced_dtype) = build.calls
+    assert (reference_dtype, reduced_dtype) == ('float64', 'float32')
+    assert np.float32 not in reference_types and reference_types == reduced_types
+    assert not os.path.exists(build.output_dir)
+
+
+@pytest.fixture
+def small_sales(tmp_path):
+    """First rows of the sales CSV, plus a sale in a zipcode without demographics."""
+    path = tmp_path / 'sales.csv'
+    lines = open(os.path.join(PROJECT_DIR, create_model.SALES_PATH)).read().splitlines()
+    unknown = lines[1].split(',')
+    unknown[lines[0].split(',').index('zipcode')] = '"10001"'
+    # No trailing newline: the last line must still be counted
+    path.write_text('\n'.join(lines[:300] + [','.join(unknown)]))
+    return str(path)
+
+
+def test_count_rows(small_sales):
+    assert create_model.count_rows(small_sales) == 300
+    assert create_model.count_rows(small_sales, block_size=7) == 300
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 64, 1000])
+def test_chunked_loader_matches_the_pandas_merge(small_sales, chunk_rows):
+    demographics = os.path.join(PROJECT_DIR, create_model.DEMOGRAPHICS_PATH)
+    columns = create_model.SALES_COLUMN_SELECTION + ['grade']
+    x, y = create_model.load_data(small_sales, demographics, columns)
+    order = np.random.default_rng(0).permutation(len(x))
+    chunked_x, chunked_y, attributes = create_model.load_data_chunked(
+        small_sales, demographics, columns, chunk_rows,
+        attributes=[('id', np.int64), ('sqft_living', np.float32)], row_order=order)
+    assert list(chunked_x.columns) == list(x.columns)
+    np.testing.assert_array_equal(chunked_x.to_numpy(), x.iloc[order].to_numpy(dtype=float))
+    np.testing.assert_array_equal(chunked_y.to_numpy(), y.iloc[order].to_numpy())
+    assert np.isnan(chunked_x.iloc[np.flatnonzero(order == 299)[0], -1])
+    sales = pandas.read_csv(small_sales)
+    assert attributes['id'].tolist() == sales['id'].iloc[order].tolist()
+    # The float32 attribute does not round the float64 feature column
+    assert chunked_x['sqft_living'].dtype == np.float64
+
+
+def test_chunked_loader_in_float32(small_sales):
+    demographics = os.path.join(PROJECT_DIR, create_model.DEMOGRAPHICS_PATH)
+    columns = create_model.SALES_COLUMN_SELECTION
+    x, _ = create_model.load_data(small_sales, demographics, columns)
+    chunked_x, _, _ = create_model.load_data_chunked(small_sales, demographics, columns,
+                                                     dtype='float32')
+    assert (chunked_x.dtypes == np.float32).all()
+    np.testing.assert_allclose(chunked_x.to_numpy(), x.to_numpy(dtype=float), rtol=1e-6)
+
+
+def zipcode_sales(x, seed=0):
+    rng = np.random.default_rng(seed)
+    return pandas.DataFrame({
+        'zipcode': rng.choice([98001, 98002, 98003], len(x)),
+        **{name: np.arange(len(x)) if name == 'id' else rng.uniform(1, 2, len(x))
+           for name, _ in create_model.NEIGHBOR_ATTRIBUTES if name != 'zipcode'}})
+
+
+def test_condensed_prototypes_merge_sales_of_one_zipcode():
+    x, y = synthetic()
+    sales = zipcode_sales(x)
+    scaler = create_model.preprocessing.RobustScaler().fit(x)
+    x_proto, y_proto, representatives, members = create_model.condense_training_set(
+        x, y, sales, 4, scaler)
+    assert members.sum() == len(x) and len(x_proto) == len(y_proto) == len(members)
+    for zipcode, count in sales['zipcode'].value_counts().items():
+        prototypes = representatives['zipcode'] == zipcode
+        assert prototypes.sum() == round(count / 4)
+        assert members[prototypes.to_numpy()].sum() == count
+    # Weighted by their sizes, the prototypes keep the mean price
+    assert (y_proto * members).sum() == pytest.approx(y.sum())
+
+    model, neighbor_sales, members, prices = create_model.fit_condensed_model(
+        x, y, sales, 4)
+    assert model[-1].n_samples_fit_ == len(neighbor_sales) == len(members)
+    table = create_model.build_neighbor_table(neighbor_sales, members, prices)
+    # Explanations show the representative's own sale and the prototype mean
+    assert table['price'].tolist() == neighbor_sales['price'].tolist()
+    assert table['prototype_price'].tolist() == prices.tolist()
+
+
+def test_condensed_guardrail_compares_with_the_plain_model(build, monkeypatch):
+    compared = []
+    compare = create_model.compare_condensed
+
+    def recording_compare(full_model, model, x_test, y_test, factor):
+        compared.append(full_model)
+        return compare(full_model, model, x_test, y_test, factor)
+
+    monkeypatch.setattr(create_model, 'compare_condensed', recording_compare)
+    with pytest.raises(SystemExit, match='Condensed model loses .* artifact not written'):
+        build('--condense', '5', '--max-r2-drop', '-1')
+    assert len(compared) == 1 and compared[0] is build.models[0]
+    assert not os.path.exists(build.output_dir)
+
+
+def test_projection_components_are_range_checked(build):
+    with pytest.raises(SystemExit, match='--demographic-components must be between 1 and'):
+        build('--demographic-components', '100')
+
+
+def test_projected_artifact_serves_like_its_pipeline(build, monkeypatch):
+    compared = []
+
+    def record(name):
+        compare = getattr(create_model, name)
+
+        def recording_compare(full_model, *args):
+            compared.append(full_model)
+            return compare(full_model, *args)
+        monkeypatch.setattr(create_model, name, recording_compare)
+
+    record('compare_projection')
+    record('compare_condensed')
+    build('--demographic-components', '4', '--condense', '3', '--max-r2-drop', '1')
+    # Both reductions are held to the plain model, not to each other
+    assert compared == [build.models[0], build.models[0]]
+
+    from registry import ModelRegistry
+    models = ModelRegistry(PROJECT_DIR, os.path.join(PROJECT_DIR,
+                                                     create_model.DEMOGRAPHICS_PATH))
+    entry = models.load('pca4', str(build.output_dir))
+    projection = entry.projection
+    assert projection is not None and len(projection.component_names) == 4
+    assert entry.model[-1].n_features_in_ == len(projection.house_features) + 4
+    houses = [{'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000,
+               'floors': 1, 'sqft_above': 1800, 'sqft_basement': 0, 'zipcode': zipcode}
+              for zipcode in (98103, 98052, 98001, 98199)]
+    demographics = pandas.read_csv(os.path.join(PROJECT_DIR, create_model.DEMOGRAPHICS_PATH))
+    raw = pandas.DataFrame(houses).merge(demographics, on='zipcode')[entry.model_features]
+    np.testing.assert_allclose(entry.model.predict(entry.prepare_features_batch(houses)),
+                               projection.full_model.predict(raw.to_numpy()))
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas
+
+import create_model
+from conftest import DEMOGRAPHICS_CSV
+from demographics import DemographicsTable, load_demographics_binary, load_demographics_csv
+
+
+def test_direct_address_lookup_matches_a_dict():
+    zipcodes = ['98001', '98003', '98199', '98039']
+    table = DemographicsTable(['a'], zipcodes, np.arange(4.0).reshape(4, 1))
+    expected = {int(z): i for i, z in enumerate(zipcodes)}
+    assert table.span == 199 and len(table) == 4
+    for zipcode in range(97990, 98210):
+        assert table.row_index(zipcode) == expected.get(zipcode)
+
+    rows, unknown = table.row_indices([98039, 98002, 98001, 10001, 99999])
+    assert unknown == [1, 3, 4]
+    assert rows[[0, 2]].tolist() == [3, 0]
+
+
+def test_binary_table_matches_the_csv(tmp_path):
+    path = tmp_path / 'demographics.npz'
+    create_model.export_demographics(DEMOGRAPHICS_CSV, path, 'float32')
+    csv = load_demographics_csv(DEMOGRAPHICS_CSV)
+    binary = load_demographics_binary(path, np.float32)
+    assert binary.columns == csv.columns and binary.values.dtype == np.float32
+    np.testing.assert_array_equal(binary.zipcodes, csv.zipcodes)
+    np.testing.assert_allclose(binary.values, csv.values, rtol=1e-6)
+
+    frame = pandas.read_csv(DEMOGRAPHICS_CSV)
+    row = frame.iloc[5]
+    assert csv.values[csv.row_index(int(row['zipcode']))].tolist() == \
+        row.drop('zipcode').tolist()
+
+
+def test_nbytes_counts_every_array():
+    table = DemographicsTable(['a', 'b'], ['98001', '98010'], np.ones((2, 2)),
+                              dtype=np.float32)
+    assert table.nbytes == 2 * 2 * 4 + 2 * 8 + 10 * 4
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+import pytest
+
+from drift import DriftMonitor, ks_distance, psi
+
+# Quartile bins of a uniform 0..100 `sqft_living` and 0..1000 price
+PROFILE = {
+    "features": {"sqft_living": {"edges": [25, 50, 75], "proportions": [0.25] * 4}},
+    "prediction": {"edges": [250, 500, 750], "proportions": [0.25] * 4},
+    "zipcodes": {"98103": 0.5, "98052": 0.5},
+}
+FEATURES = ['bedrooms', 'sqft_living']
+
+
+def monitor(**options):
+    return DriftMonitor(PROFILE, FEATURES, **options)
+
+
+def test_psi_and_ks_of_known_distributions():
+    assert psi([0.25] * 4, [0.25] * 4) == 0.0
+    assert psi([0.5, 0.5], [0.25, 0.75]) == pytest.approx(
+        0.25 * math.log(2) - 0.25 * math.log(0.5 / 0.75))
+    assert ks_distance([0.5, 0.5, 0, 0], [0.25] * 4) == 0.5
+
+
+def test_reference_traffic_is_stable_and_shifted_traffic_is_not():
+    stable, shifted = monitor(), monitor()
+    for value in range(100):
+        stable.observe(np.array([3.0, value + 0.5]), 98103 if value % 2 else '98052',
+                       value * 10.0)
+        shifted.observe(np.array([3.0, 90.0]), 10001, 900.0)
+    scores = stable.scores()
+    assert scores['observations'] == 100
+    assert scores['features']['sqft_living']['status'] == 'stable'
+    assert scores['features']['sqft_living']['ks'] == pytest.approx(0.0)
+    assert scores['zipcode']['psi'] == pytest.approx(0.0)
+    drifted = shifted.scores()
+    assert drifted['features']['sqft_living']['status'] == 'significant'
+    assert drifted['prediction']['ks'] == pytest.approx(0.75)
+    assert drifted['zipcode']['status'] == 'significant'
+
+
+def test_observe_batch_matches_observe():
+    rng = np.random.default_rng(0)
+    features = np.column_stack([np.full(200, 3.0), rng.uniform(0, 120, 200)])
+    zipcodes = rng.choice([98103, 98052, 10001], 200)
+    predictions = rng.uniform(0, 1000, 200)
+    single, batch = monitor(), monitor()
+    for row, zipcode, prediction in zip(features, zipcodes, predictions):
+        single.observe(row, zipcode, prediction)
+    batch.observe_batch(features, zipcodes, predictions)
+    assert batch.scores(force=True) == single.scores(force=True)
+
+
+def test_scores_are_cached_and_decay_on_recomputation():
+    drift = monitor(interval=3600, decay=0.5)
+    drift.observe(np.array([3.0, 10.0]), 98103, 100.0)
+    first = drift.scores()
+    drift.observe(np.array([3.0, 10.0]), 98103, 100.0)
+    assert drift.scores() is first
+    assert drift.scores(force=True)['prediction']['count'] == 1.5
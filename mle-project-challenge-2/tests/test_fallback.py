@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+import pandas
+import pytest
+
+import create_model
+from capacity import CapacityLimiter
+from fallback import FallbackTable, LatencyEstimate
+
+HOUSE = {'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000, 'floors': 1,
+         'sqft_above': 1800, 'sqft_basement': 0, 'zipcode': 98103}
+
+
+# 98001: about 10 sales per size bucket; 98002: too few for bucket medians
+SALES = pandas.DataFrame({
+    'zipcode': [98001] * 40 + [98002] * 3,
+    'sqft_living': list(range(1000, 5000, 100)) + [1000, 2000, 3000],
+    'price': [100.0 * i for i in range(40)] + [7.0, 8.0, 9.0]})
+
+
+@pytest.fixture
+def table():
+    return FallbackTable(**create_model.build_fallback_table(SALES, n_buckets=4,
+                                                             min_sales=5))
+
+
+def bucket_median(table, sales, sqft_living):
+    bucket = np.searchsorted(table.edges, sqft_living, side='right')
+    in_bucket = np.searchsorted(table.edges, sales['sqft_living'], side='right') == bucket
+    return sales['price'][in_bucket].median()
+
+
+def test_fallback_prices_by_zipcode_and_size(table):
+    assert len(table) == 2 and len(table.edges) == 3
+    prices = table.lookup([98001, 98001, 98002, 98002, 10001, 99999],
+                          [1000, 4900, 4900, np.nan, 1000, np.nan])
+    own = SALES[SALES['zipcode'] == 98001]
+    assert prices[0] == bucket_median(table, own, 1000)
+    assert prices[1] == bucket_median(table, own, 4900)
+    # Sparse buckets and unknown sizes use the zipcode median
+    assert prices[2] == prices[3] == 8.0
+    # Unknown zipcodes use the medians over all zipcodes
+    assert prices[4] == bucket_median(table, SALES, 1000)
+    assert prices[5] == SALES['price'].median()
+
+
+def test_latency_estimate_splits_fixed_and_per_row_cost():
+    estimate = LatencyEstimate(alpha=0.5)
+    assert estimate.expected() == 0.0
+    estimate.observe(1, 0.010)
+    estimate.observe(101, 0.110)
+    assert estimate.expected() == pytest.approx(0.010)
+    assert estimate.expected(11) == pytest.approx(0.020)
+    # A slow first call does not linger
+    estimate.observe(1, 0.002)
+    estimate.observe(1, 0.002)
+    assert estimate.expected() < 0.005
+
+
+def test_fallback_callers_count_their_own_outcome():
+    limiter = CapacityLimiter(1, max_queue=0)
+    assert limiter.acquire()
+    assert not limiter.acquire(fallback=True)
+    assert (limiter.shed, limiter.degraded) == (0, 0)
+    limiter.turned_away(degraded=True)
+    limiter.turned_away()
+    assert (limiter.shed, limiter.degraded) == (1, 1)
+
+
+def budgeted(client, model='default', budget='20', path='/predict', body=HOUSE):
+    return client.post(path, json=body, headers={'X-Model-Name': model,
+                                                 'X-Latency-Budget-Ms': budget})
+
+
+@pytest.fixture
+def slot_taken(app):
+    """Hold the only prediction slot while the test sends requests."""
+    assert app.capacity.acquire()
+    yield app.capacity
+    app.capacity.release()
+
+
+def test_no_slot_in_budget_answers_from_the_fallback(app, slot_taken):
+    client = app.app.test_client()
+    shed, degraded = slot_taken.shed, slot_taken.degraded
+    response = budgeted(client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['degraded'] and body['degraded_reason'] == 'capacity'
+    assert body['source'] == 'fallback_table'
+    entry = app.registry.get('default')
+    assert body['predicted_price'] == entry.fallback.lookup([98103], [1800])[0]
+    batch = budgeted(client, path='/predict/batch', body=[HOUSE, HOUSE]).get_json()
+    assert batch['degraded_reason'] == 'capacity'
+    assert (slot_taken.shed, slot_taken.degraded) == (shed, degraded + 2)
+
+
+def test_no_slot_without_a_fallback_table_is_shed(app, slot_taken):
+    client = app.app.test_client()
+    assert app.registry.get('rich').fallback is None
+    shed, degraded = slot_taken.shed, slot_taken.degraded
+    response = budgeted(client, model='rich')
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    assert client.post('/predict', json=HOUSE).status_code == 503
+    assert (slot_taken.shed, slot_taken.degraded) == (shed + 2, degraded)
+
+
+def test_too_little_budget_left_for_the_model(app, monkeypatch):
+    client = app.app.test_client()
+    entry = app.registry.get('default')
+    monkeypatch.setattr(entry.latency, 'expected', lambda rows=1: 1.0)
+    body = budgeted(client, budget='100').get_json()
+    assert body['degraded'] and body['degraded_reason'] == 'budget'
+    monkeypatch.setattr(entry.latency, 'expected', lambda rows=1: 0.0)
+    body = budgeted(client, budget='100').get_json()
+    assert body['degraded'] is False and 'degraded_reason' not in body
+    unbudgeted = client.post('/predict', json=HOUSE, headers={'X-Model-Name': 'default'})
+    assert 'degraded' not in unbudgeted.get_json()
+
+
+def test_budget_spent_waiting_for_the_slot_degrades(app, monkeypatch):
+    client = app.app.test_client()
+    acquire = app.capacity.acquire
+
+    def slow_acquire(timeout=None, fallback=False):
+        # Admitted only after the whole budget went by in the queue
+        time.sleep(0.03)
+        return acquire(timeout, fallback)
+
+    monkeypatch.setattr(app.capacity, 'acquire', slow_acquire)
+    monkeypatch.setattr(app.registry.get('default').latency, 'expected', lambda rows=1: 0.0)
+    body = budgeted(client, budget='20').get_json()
+    assert body['degraded'] and body['degraded_reason'] == 'budget'
+    assert app.capacity.in_flight == 0
+
+
+def test_invalid_budget_header(app):
+    response = budgeted(app.app.test_client(), budget='soon')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "X-Latency-Budget-Ms must be a positive number"}
@@ -0,0 +1,47 @@
+import time
+
+from flask import Flask
+
+from fast_startup import LazySwagger, PhaseTimer
+
+
+def test_phase_timer_records_milliseconds():
+    timer = PhaseTimer()
+    with timer.phase('load'):
+        time.sleep(0.01)
+    timer.record('total', 0.5)
+    report = timer.report()
+    assert report['load'] >= 10 and report['total'] == 500.0
+    assert timer.log_line() == f"Startup phases: load={report['load']:.1f}ms, total=500.0ms"
+
+
+def lazy_app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        """Ping.
+        ---
+        responses:
+          200:
+            description: pong
+        """
+        return 'pong'
+
+    app.wsgi_app = LazySwagger(app)
+    return app
+
+
+def test_lazy_swagger_builds_docs_on_first_docs_request():
+    app = lazy_app()
+    client = app.test_client()
+    assert client.get('/ping').data == b'pong'
+    assert app.wsgi_app.docs_app is None
+
+    spec = client.get('/apispec_1.json')
+    assert spec.status_code == 200 and '/ping' in spec.get_json()['paths']
+    docs_app = app.wsgi_app.docs_app
+    assert docs_app is not None
+    client.get('/apidocs/')
+    assert app.wsgi_app.docs_app is docs_app
+    assert client.get('/ping').data == b'pong'
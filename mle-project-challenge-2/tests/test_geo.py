@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+from sklearn import neighbors, pipeline, preprocessing
+
+import create_model
+from geo import KM_PER_DEGREE, GeoIndex
+from neighbors import NeighborQuery
+from validation import ValidationError, validate_location
+
+
+def sales(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(47.2, 47.8, n), rng.uniform(-122.5, -121.8, n)
+
+
+def brute_force(lat, long, at, radius_km):
+    dy = (lat - at[0]) * KM_PER_DEGREE
+    dx = (long - at[1]) * KM_PER_DEGREE * math.cos(math.radians(at[0]))
+    return set(np.flatnonzero(dx * dx + dy * dy <= radius_km * radius_km).tolist())
+
+
+@pytest.mark.parametrize('cell_km', [0.5, 1.0, 3.0])
+def test_candidates_match_a_brute_force_radius_search(cell_km):
+    lat, long = sales()
+    index = GeoIndex(**create_model.build_geo_index(lat, long, cell_km))
+    assert len(index) == len(lat)
+    for at, radius_km in (((47.5, -122.2), 2.0), ((47.21, -122.49), 5.0),
+                          ((47.6, -122.0), 0.3)):
+        assert set(index.candidates(*at, radius_km).tolist()) == \
+            brute_force(lat, long, at, radius_km)
+
+
+def test_location_outside_the_grid_has_no_candidates():
+    lat, long = sales()
+    index = GeoIndex(**create_model.build_geo_index(lat, long))
+    assert len(index.candidates(40.0, -100.0, 10.0)) == 0
+
+
+def test_candidate_query_searches_only_the_candidates():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(300, 3))
+    model = pipeline.make_pipeline(preprocessing.RobustScaler(),
+                                   neighbors.KNeighborsRegressor(5)).fit(x, x[:, 0])
+    query = NeighborQuery(model)
+    candidates = np.arange(100, 200)
+    distances, indices = query.query_candidates(x[:1], candidates)
+    assert set(indices[0].tolist()) <= set(candidates.tolist())
+    # The same search as a KNN fitted on the candidates alone
+    subset = neighbors.NearestNeighbors(n_neighbors=5).fit(model[0].transform(x[candidates]))
+    expected_distances, expected = subset.kneighbors(model[0].transform(x[:1]))
+    assert indices[0].tolist() == candidates[expected[0]].tolist()
+    np.testing.assert_allclose(distances, expected_distances)
+    assert query.query_candidates(x[:1], candidates[:4]) is None
+
+
+def test_validate_location():
+    assert validate_location({'lat': '47.6', 'long': -122.3}) == (47.6, -122.3)
+    with pytest.raises(ValidationError) as info:
+        validate_location({'lat': 91, 'long': 'x'})
+    assert info.value.errors == {'lat': 'out of range: 91', 'long': "not a number: 'x'"}
+    with pytest.raises(ValidationError) as info:
+        validate_location({})
+    assert info.value.errors == {'lat': 'missing required field',
+                                 'long': 'missing required field'}
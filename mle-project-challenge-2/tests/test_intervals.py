@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn import neighbors, pipeline, preprocessing
+
+from neighbors import NeighborQuery
+
+
+def fit(weights, n=200, k=5, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, 3))
+    y = 300000 + 100000 * x[:, 0] + rng.normal(scale=20000, size=n)
+    model = pipeline.make_pipeline(preprocessing.RobustScaler(),
+                                   neighbors.KNeighborsRegressor(k, weights=weights))
+    return model.fit(x, y), rng.normal(size=(50, 3)), x
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+def test_bounds_are_ordered_and_within_neighbor_prices(weights):
+    model, rows, _ = fit(weights)
+    query = NeighborQuery(model)
+    distances, indices = query.query(rows)
+    bounds = query.intervals(distances, indices, level=0.8)
+    prices = query.targets[indices]
+    assert np.all(prices.min(axis=1) <= bounds['lower'] + 1e-6)
+    assert np.all(bounds['lower'] <= bounds['median'])
+    assert np.all(bounds['median'] <= bounds['upper'])
+    assert np.all(bounds['upper'] <= prices.max(axis=1) + 1e-6)
+    assert np.all(bounds['std'] >= 0)
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+def test_predict_from_matches_model(weights):
+    model, rows, _ = fit(weights)
+    query = NeighborQuery(model)
+    distances, indices = query.query(rows)
+    np.testing.assert_allclose(query.predict_from(distances, indices), model.predict(rows))
+
+
+def test_uniform_80_percent_interval_spans_the_neighbors():
+    model, rows, _ = fit('uniform')
+    query = NeighborQuery(model)
+    distances, indices = query.query(rows)
+    bounds = query.intervals(distances, indices, level=0.8)
+    prices = query.targets[indices]
+    np.testing.assert_allclose(bounds['lower'], prices.min(axis=1))
+    np.testing.assert_allclose(bounds['median'], np.median(prices, axis=1))
+    np.testing.assert_allclose(bounds['upper'], prices.max(axis=1))
+    np.testing.assert_allclose(bounds['std'], prices.std(axis=1), rtol=1e-6)
+
+
+def test_uniform_matches_weighted_computation():
+    model, rows, _ = fit('uniform')
+    query = NeighborQuery(model)
+    distances, indices = query.query(rows)
+    for level in (0.5, 0.8, 0.95):
+        bounds = query.intervals(distances, indices, level)
+        expected, std = query._weighted_bounds(
+            query.targets[indices], np.ones_like(distances),
+            np.array([(1 - level) / 2, 0.5, 1 - (1 - level) / 2]))
+        np.testing.assert_allclose(np.column_stack(
+            [bounds['lower'], bounds['median'], bounds['upper']]), expected)
+        np.testing.assert_allclose(bounds['std'], std, rtol=1e-6)
+
+
+def test_narrower_level_gives_narrower_interval():
+    model, rows, _ = fit('distance')
+    query = NeighborQuery(model)
+    distances, indices = query.query(rows)
+    wide = query.intervals(distances, indices, 0.9)
+    narrow = query.intervals(distances, indices, 0.5)
+    assert np.all(wide['lower'] <= narrow['lower'] + 1e-6)
+    assert np.all(narrow['upper'] <= wide['upper'] + 1e-6)
+
+
+def test_exact_match_interval_contains_its_price():
+    model, _, x = fit('distance')
+    query = NeighborQuery(model)
+    distances, indices = query.query(x[:1])
+    price = query.targets[0]
+    # The exact match takes all the weight of the prediction
+    assert query.predict_from(distances, indices)[0] == pytest.approx(price)
+    bounds = query.intervals(distances, indices)
+    assert bounds['lower'][0] <= price <= bounds['upper'][0]
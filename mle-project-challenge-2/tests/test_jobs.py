@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import jobs
+from conftest import DEMOGRAPHICS_CSV, MODEL_DIR, PROJECT_DIR
+from jobs import JobStore
+from validation import ValidationError
+
+CSV = ("id,bedrooms,bathrooms,sqft_living,sqft_lot,floors,sqft_above,sqft_basement,zipcode\n"
+       "1,3,2,1800,5000,1,1800,0,98103\n"
+       "2,4,2.5,2500,6000,2,2500,0,98052\n"
+       "3,x,2,1800,5000,1,1800,0,98103\n"
+       "4,3,2,1800,5000,1,1800,0,10001\n")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path), lease_seconds=30)
+
+
+def create(store, text=CSV):
+    def write_input(path):
+        with open(path, 'w') as f:
+            f.write(text)
+    return store.create('default', 'v1', write_input)
+
+
+def test_create_queues_an_active_job(store):
+    job = create(store)
+    assert job['state'] == 'queued'
+    assert job['lease_expires_at'] > time.time()
+    assert store.read(job['id']) == job
+    assert store.active_ids() == [job['id']]
+
+
+def test_failed_input_leaves_nothing(store):
+    def write_input(path):
+        raise ValueError("no zipcode")
+    with pytest.raises(ValueError):
+        store.create('default', 'v1', write_input)
+    assert store.jobs() == [] and store.active_ids() == []
+
+
+def test_unknown_and_malformed_ids(store):
+    assert store.read('0' * 32) is None
+    assert store.read('../etc') is None
+    with pytest.raises(KeyError):
+        store.path('../etc')
+
+
+def test_running_to_succeeded(store):
+    job_id = create(store)['id']
+    assert store.update(job_id, state='running', started_at='t')['state'] == 'running'
+    assert store.update(job_id, rows_done=2)['rows_done'] == 2
+    assert store.active_ids() == [job_id]
+    finished = store.update(job_id, state='succeeded', finished_at='t')
+    assert finished['state'] == 'succeeded'
+    assert store.active_ids() == []
+
+
+def test_updates_renew_the_lease(store):
+    job_id = create(store)['id']
+    store.lease_seconds = 300
+    assert store.update(job_id, rows_done=1)['lease_expires_at'] > time.time() + 200
+    store.lease_seconds = 600
+    assert store.renew(job_id)['lease_expires_at'] > time.time() + 500
+
+
+@pytest.mark.parametrize('final', ['succeeded', 'failed', 'cancelled'])
+def test_finished_jobs_are_immutable(store, final):
+    job_id = create(store)['id']
+    store.update(job_id, state='running')
+    store.update(job_id, state=final)
+    # A late progress write or failure report does not undo the outcome
+    assert store.update(job_id, rows_done=99)['state'] == final
+    assert store.update(job_id, state='failed', error='late')['state'] == final
+    job = store.read(job_id)
+    assert job['state'] == final and 'error' not in job and job['rows_done'] == 0
+    assert store.renew(job_id)['state'] == final
+
+
+def test_concurrent_updates_are_serialized(store):
+    job_id = create(store)['id']
+
+    def increment():
+        for _ in range(50):
+            store._modify(job_id, lambda job: {"rows_done": job['rows_done'] + 1})
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.read(job_id)['rows_done'] == 400
+
+
+def test_expire_fails_only_stale_leases(store):
+    stale = create(store)['id']
+    fresh = create(store)['id']
+    store.lease_seconds = -1
+    store.renew(stale)
+    store.lease_seconds = 30
+    assert store.expire() == [stale]
+    job = store.read(stale)
+    assert job['state'] == 'failed' and 'lease' in job['error']
+    assert store.read(fresh)['state'] == 'queued'
+    assert store.active_ids() == [fresh]
+
+
+def test_expire_drops_index_entries_of_removed_jobs(store):
+    job_id = create(store)['id']
+    jobs.shutil.rmtree(store.path(job_id))
+    assert store.expire() == []
+    assert store.active_ids() == []
+
+
+def test_prune_removes_old_finished_jobs_only(store):
+    old = create(store)['id']
+    store.update(old, state='succeeded')
+    active = create(store)['id']
+    recent = create(store)['id']
+    store.update(recent, state='failed')
+    past = time.time() - 7200
+    for job_id in (old, active):
+        os.utime(store.path(job_id, jobs.JOB_FILE), (past, past))
+    store.prune(3600)
+    assert store.read(old) is None
+    assert store.read(active)['state'] == 'queued'
+    assert store.read(recent)['state'] == 'failed'
+
+
+def test_prune_is_throttled(store):
+    store.prune(3600)
+    job_id = create(store)['id']
+    store.update(job_id, state='succeeded')
+    past = time.time() - 7200
+    os.utime(store.path(job_id, jobs.JOB_FILE), (past, past))
+    store.prune(3600)
+    assert store.read(job_id) is not None
+    store.prune(3600, interval_seconds=0)
+    assert store.read(job_id) is None
+
+
+def test_cancel_marker(store):
+    job_id = create(store)['id']
+    assert not store.cancel_requested(job_id)
+    store.request_cancel(job_id)
+    assert store.cancel_requested(job_id)
+
+
+@pytest.fixture
+def scoring_process(registry):
+    # run_job as a pool process runs it, with this process as the worker
+    jobs._init_worker(PROJECT_DIR, DEMOGRAPHICS_CSV, False, 0)
+    yield registry.get()
+    jobs._registry = None
+
+
+def run(store, job_id, entry, chunk_rows=2):
+    return jobs.run_job(store.root, store.lease_seconds, job_id, entry.name,
+                        MODEL_DIR, entry.version, chunk_rows)
+
+
+def test_run_job_scores_every_row(store, scoring_process):
+    entry = scoring_process
+    job_id = create(store)['id']
+    assert run(store, job_id, entry) == 'succeeded'
+    job = store.read(job_id)
+    assert (job['rows'], job['rows_done'], job['invalid_rows']) == (4, 4, 2)
+    assert job['errors'] == {"2": "bedrooms: not a number: 'x'",
+                             "3": "zipcode: Zipcode 10001 not found in demographics data"}
+    assert store.active_ids() == []
+    assert store.result_columns(job_id) == ['predicted_price', 'valid', 'id']
+    valid = np.load(store.result_path(job_id, 'valid'))
+    prices = np.load(store.result_path(job_id, 'predicted_price'))
+    assert valid.tolist() == [True, True, False, False]
+    houses = [dict(zip(CSV.splitlines()[0].split(','), map(float, line.split(','))))
+              for line in CSV.splitlines()[1:3]]
+    np.testing.assert_allclose(
+        prices[:2], entry.model.predict(entry.prepare_features_batch(houses)))
+    assert np.isnan(prices[2:]).all()
+    lines = ''.join(store.iter_result_csv(job_id)).splitlines()
+    assert lines[0] == 'row,id,predicted_price'
+    assert lines[3:] == ['2,3,', '3,4,']
+
+
+def test_run_job_cancelled_before_start(store, scoring_process):
+    job_id = create(store)['id']
+    store.request_cancel(job_id)
+    assert run(store, job_id, scoring_process) == 'cancelled'
+    assert store.result_columns(job_id) == []
+
+
+def test_run_job_of_an_expired_job_does_not_start(store, scoring_process):
+    job_id = create(store)['id']
+    store.update(job_id, state='failed', error='lease ran out')
+    assert run(store, job_id, scoring_process) == 'failed'
+    assert 'started_at' not in store.read(job_id)
+
+
+def test_run_job_without_zipcode_fails(store, scoring_process):
+    job_id = create(store, "id,bedrooms\n1,3\n")['id']
+    assert run(store, job_id, scoring_process) == 'failed'
+    assert store.read(job_id)['error'] == "ValueError: input has no zipcode column"
+
+
+def test_score_chunk_matches_predict_batch(registry):
+    import pandas
+    entry = registry.get()
+    chunk = pandas.DataFrame({'bedrooms': [3, None, 'x', 3], 'sqft_living': [1800, 900, 1, 1],
+                              'zipcode': [98103, 98052, 98103, 98103.5]})
+    prices, valid, errors = jobs.score_chunk(entry, chunk)
+    assert valid.tolist() == [True, True, False, False]
+    houses = [{'bedrooms': 3, 'sqft_living': 1800, 'zipcode': 98103},
+              {'sqft_living': 900, 'zipcode': 98052},
+              {'bedrooms': 'x', 'sqft_living': 1, 'zipcode': 98103},
+              {'bedrooms': 3, 'sqft_living': 1, 'zipcode': 98103.5}]
+    np.testing.assert_allclose(
+        prices[:2], entry.model.predict(entry.prepare_features_batch(houses[:2])))
+    with pytest.raises(ValidationError) as info:
+        entry.prepare_features_batch(houses)
+    assert errors == info.value.errors
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+import pytest
+from sklearn import neighbors
+
+import memory
+from memory import TraceRunning, collect_arrays, memory_report, trace_allocations
+
+
+def test_collect_arrays_follows_estimators_and_containers():
+    shared = np.arange(10.0)
+    knn = neighbors.KNeighborsRegressor(algorithm='kd_tree').fit(np.ones((20, 2)),
+                                                               np.arange(20.0))
+    arrays = collect_arrays({'a': [shared, (shared, {'b': shared[2:]})], 'model': knn})
+    assert sum(a is shared for a in arrays) == 1
+    assert any(a.shape == (20, 2) for a in arrays)
+    assert len(collect_arrays(np.array([shared, None], dtype=object))) == 1
+
+
+def test_report_counts_a_shared_buffer_once():
+    table = np.ones((512, 512))
+    report = memory_report({'first': [table], 'view': [table[10:20]],
+                            'cache': (1000, "entries")}, {'imports': 1})
+    components = report['components']
+    assert components['first']['bytes'] == table.nbytes
+    assert components['view']['bytes'] == 0
+    assert components['cache'] == {"bytes": 1000, "estimate": "entries"}
+    assert report['baseline'] == {'imports': 1}
+    if report['process'].get('rss') is not None:
+        assert components['first']['resident'] >= table.nbytes - memory.PAGE_SIZE
+        assert report['other'] == report['process']['rss'] - 1000 - \
+            components['first']['resident']
+
+
+def test_trace_allocations_reports_spans_and_retained_output():
+    def build(trace):
+        with trace.span('assemble'):
+            scratch = np.ones(100_000)
+        return scratch[:1000].copy()
+
+    result = trace_allocations(build, calls=20)
+    assert result['calls'] == 20
+    assert result['span_peak_bytes']['assemble'] >= 800_000
+    assert result['call_peak_bytes'] >= 800_000
+    assert any(site['bytes'] >= 8000 for site in result['retained_per_call'])
+
+
+def test_one_trace_at_a_time():
+    started, release = threading.Event(), threading.Event()
+
+    def slow(trace):
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=trace_allocations, args=(slow, 1))
+    thread.start()
+    assert started.wait(5)
+    try:
+        with pytest.raises(TraceRunning, match='already running'):
+            trace_allocations(lambda trace: None, calls=1)
+    finally:
+        release.set()
+        thread.join()
+    assert trace_allocations(lambda trace: None, calls=1)['calls'] == 1
+
+
+def test_concurrent_trace_request_gets_409(app):
+    client = app.app.test_client()
+    house = {'bedrooms': 3, 'sqft_living': 1800, 'zipcode': 98103}
+    url = '/admin/memory/allocations?calls=2'
+    assert client.post(url, json=house).status_code == 200
+    assert client.post(url, json=house,
+                       environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code == 403
+    with memory._trace_lock:
+        response = client.post(url, json=house)
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "An allocation trace is already running"}
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn import linear_model, neighbors, pipeline, preprocessing
+
+from neighbors import NeighborQuery, load_side_table
+
+
+def fit(weights, n=100, k=5, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, 3))
+    y = 300000 + 100000 * x[:, 0] + rng.normal(scale=20000, size=n)
+    model = pipeline.make_pipeline(preprocessing.RobustScaler(),
+                                   neighbors.KNeighborsRegressor(k, weights=weights))
+    return model.fit(x, y), x
+
+
+def test_supports_only_euclidean_knn_pipelines():
+    model, x = fit('uniform')
+    assert NeighborQuery.supports(model)
+    manhattan = pipeline.make_pipeline(neighbors.KNeighborsRegressor(metric='manhattan'))
+    assert not NeighborQuery.supports(manhattan.fit(x, x[:, 0]))
+    assert not NeighborQuery.supports(linear_model.LinearRegression().fit(x, x[:, 0]))
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+def test_explanation_reproduces_the_prediction(weights):
+    model, x = fit(weights)
+    side_table = np.zeros(len(x), dtype=[('id', 'i8'), ('zipcode', 'i4')])
+    side_table['id'] = np.arange(len(x)) + 1000
+    side_table['zipcode'] = 98103
+    query = NeighborQuery(model, side_table)
+    row = x[:1] + 0.01
+    distances, indices = query.query(row)
+    explanation = query.explain(distances[0], indices[0])
+
+    assert len(explanation) == 5
+    assert [n['distance'] for n in explanation] == sorted(n['distance'] for n in explanation)
+    assert sum(n['weight'] for n in explanation) == pytest.approx(1.0)
+    price = sum(n['weight'] * n['price'] for n in explanation)
+    assert price == pytest.approx(model.predict(row)[0])
+    first = explanation[0]
+    assert first['id'] == first['training_row'] + 1000 and first['zipcode'] == 98103
+
+
+def test_side_table_is_memory_mapped(tmp_path):
+    assert load_side_table(str(tmp_path)) is None
+    np.save(tmp_path / 'neighbors.npy', np.arange(5))
+    table = load_side_table(str(tmp_path))
+    assert isinstance(table, np.memmap) and table.tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,65 @@
+import os
+import re
+import runpy
+
+import capacity
+from conftest import SRC_DIR
+
+
+def config():
+    with open(os.path.join(SRC_DIR, 'nginx.conf')) as f:
+        return re.sub(r'#.*', '', f.read())
+
+
+def block(text, header):
+    """Body of the first `header { ... }` block."""
+    start = text.index(header)
+    depth = 0
+    for i in range(text.index('{', start), len(text)):
+        depth += {'{': 1, '}': -1}.get(text[i], 0)
+        if depth == 0:
+            return text[text.index('{', start) + 1:i]
+    raise AssertionError(f"unterminated block {header}")
+
+
+def test_upstream_re_resolves_the_replicas():
+    text = config()
+    assert re.search(r'^\s*resolver \S+', text, re.M)
+    upstream = block(text, 'upstream soundrealty_api')
+    assert re.search(r'^\s*zone soundrealty_api \S+;', upstream, re.M)
+    servers = re.findall(r'^\s*server (\S+)([^;]*);', upstream, re.M)
+    assert servers == [('api:5005', ' resolve max_fails=3 fail_timeout=5s')]
+
+
+def test_features_cache_key_includes_the_model_selecting_headers():
+    features = block(config(), 'location ~ ^/(models/[^/]+/)?features$')
+    assert 'proxy_cache soundrealty_features;' in features
+    key = re.search(r'proxy_cache_key "([^"]+)";', features).group(1)
+    for variable in ('$request_uri', '$http_x_model_name', '$http_x_split_key'):
+        assert variable in key
+
+
+def gunicorn_settings(monkeypatch, environ):
+    # The config exports WEB_WORKERS; keep it out of this process's environment
+    monkeypatch.setattr(os, 'environ', environ)
+    return runpy.run_path(os.path.join(SRC_DIR, 'gunicorn.conf.py'))
+
+
+def test_upstream_connections_are_kept_alive(monkeypatch):
+    text = config()
+    server = block(text, 'server {')
+    assert 'proxy_http_version 1.1;' in server
+    assert 'proxy_set_header Connection "";' in server
+    upstream = block(text, 'upstream soundrealty_api')
+    nginx_idle = int(re.search(r'keepalive_timeout (\d+)s;', upstream).group(1))
+    settings = gunicorn_settings(monkeypatch, {})
+    # gunicorn must not close an idle connection nginx is about to reuse
+    assert settings['worker_class'] == 'gthread'
+    assert settings['keepalive'] > nginx_idle
+
+
+def test_gunicorn_workers_follow_the_cpu_quota(monkeypatch):
+    environ = {}
+    monkeypatch.setattr(capacity, 'available_cpus', lambda: 3)
+    settings = gunicorn_settings(monkeypatch, environ)
+    assert settings['workers'] == 3 and environ['WEB_WORKERS'] == '3'
@@ -0,0 +1,141 @@
+import collections
+import types
+
+import numpy as np
+import pytest
+
+import prescore
+from prescore import EMPTY_ID, PrescoredTable, build_table
+
+
+def colliding_ids(shift, count):
+    """`count` ids sharing one home slot, and the slot."""
+    by_slot = collections.defaultdict(list)
+    for house_id in range(1, 100000):
+        slot = prescore._home_slot(house_id, shift)
+        by_slot[slot].append(house_id)
+        if len(by_slot[slot]) == count:
+            return by_slot[slot], slot
+    raise AssertionError("no collisions found")
+
+
+def lookup_table(ids, prices, meta=None):
+    return PrescoredTable(build_table(np.array(ids, dtype=np.int64),
+                                      np.array(prices, dtype=np.float64)),
+                          meta or {"model_version": "v1", "rows": len(ids)})
+
+
+def test_hits_and_misses():
+    ids = np.arange(1000, 2000, 7, dtype=np.int64)
+    table = lookup_table(ids, ids * 10.0)
+    for house_id in ids.tolist():
+        assert table.lookup(house_id) == house_id * 10.0
+    for house_id in (0, 1001, 5000, 2 ** 40):
+        assert table.lookup(house_id) is None
+
+
+def test_load_factor_at_most_half():
+    for n in (0, 1, 8, 9, 1000):
+        table = build_table(np.arange(n, dtype=np.int64), np.zeros(n))
+        assert len(table) >= 2 * n and len(table) & (len(table) - 1) == 0
+        assert np.count_nonzero(table['id'] != EMPTY_ID) == n
+
+
+def test_colliding_ids_probe_linearly():
+    # Eight ids give a 16-slot table (shift 60)
+    ids, slot = colliding_ids(60, 4)
+    others = [i for i in range(200000, 200100)
+              if prescore._home_slot(i, 60) != slot][:4]
+    table = build_table(np.array(ids + others, dtype=np.int64),
+                        np.arange(8, dtype=np.float64))
+    assert len(table) == 16
+    # Inserted first, the colliding ids fill their home slot and the next three
+    assert table['id'][[(slot + k) % 16 for k in range(4)]].tolist() == ids
+    lookup = PrescoredTable(table, {"model_version": "v1"})
+    for price, house_id in enumerate(ids + others):
+        assert lookup.lookup(house_id) == price
+    # A missing id with the same home slot probes past all of them
+    missing = next(i for i in range(max(ids) + 1, 10 ** 6)
+                   if prescore._home_slot(i, 60) == slot)
+    assert lookup.lookup(missing) is None
+
+
+def test_probing_wraps_around_the_end():
+    last = [i for i in range(1, 100000) if prescore._home_slot(i, 60) == 15][:3]
+    table = lookup_table(last, [1.0, 2.0, 3.0])
+    assert table.lookup(last[2]) == 3.0
+    assert build_table(np.array(last), np.zeros(3))['id'][[15, 0, 1]].tolist() == last
+
+
+def test_later_duplicates_overwrite():
+    table = lookup_table([5, 6, 5], [1.0, 2.0, 3.0])
+    assert table.lookup(5) == 3.0
+    assert table.lookup(6) == 2.0
+
+
+def test_write_and_load_round_trip(tmp_path):
+    ids = np.array([11, 22, 33], dtype=np.int64)
+    meta = {"model_version": "v7", "rows": 3, "source": "inventory.csv"}
+    prescore.write_prescored(build_table(ids, ids * 1.5), meta, str(tmp_path))
+    loaded = prescore.load_prescored(str(tmp_path))
+    assert loaded.version == "v7" and loaded.rows == 3
+    assert [loaded.lookup(i) for i in (11, 22, 33, 44)] == [16.5, 33.0, 49.5, None]
+    # Only the table, metadata and nothing half-written
+    assert sorted(p.name for p in tmp_path.iterdir()) == [prescore.META_FILE,
+                                                          prescore.TABLE_FILE]
+
+
+def test_load_prescored_without_table(tmp_path):
+    assert prescore.load_prescored(str(tmp_path)) is None
+
+
+def test_stale_reason(tmp_path):
+    inventory = tmp_path / 'inventory.csv'
+    inventory.write_text('id,zipcode\n1,98103\n')
+    meta = {"model_version": "v1", "source": "inventory.csv",
+            "source_sha1": prescore._sha1(str(inventory))}
+    table = lookup_table([1], [1.0], meta)
+    entry = types.SimpleNamespace(version="v1", path=str(tmp_path))
+    assert prescore.stale_reason(table, entry) is None
+    assert prescore.stale_reason(table, types.SimpleNamespace(
+        version="v2", path=str(tmp_path))) == "scored with model v1, serving v2"
+    inventory.write_text('id,zipcode\n2,98103\n')
+    assert prescore.stale_reason(table, entry) == "inventory changed since scoring"
+
+
+def test_rescore_lock_creates_lock_file(tmp_path):
+    with prescore.rescore_lock(str(tmp_path)):
+        assert (tmp_path / prescore.LOCK_FILE).exists()
+
+
+def test_rescore_lock_without_writable_directory(tmp_path):
+    with prescore.rescore_lock(str(tmp_path / 'missing')):
+        pass
+
+
+def test_negative_ids_are_rejected():
+    with pytest.raises(ValueError, match="non-negative"):
+        build_table(np.array([3, -1], dtype=np.int64), np.zeros(2))
+    assert lookup_table([1], [1.0]).lookup(EMPTY_ID) is None
+
+
+def test_score_inventory_skips_bad_rows(tmp_path, registry):
+    entry = registry.get()
+    inventory = tmp_path / 'inventory.csv'
+    inventory.write_text(
+        "id,bedrooms,sqft_living,zipcode\n"
+        "10,3,1800,98103\n"
+        ",3,1800,98103\n"
+        "abc,3,1800,98103\n"
+        "-5,3,1800,98103\n"
+        "11,x,1800,98103\n"
+        "12,3,1800,10001\n"
+        "13,4,2500,98052\n")
+    ids, prices, skipped = prescore.score_inventory(
+        entry, prescore.read_inventory(str(inventory), entry.feature_plan.house_fields,
+                                       chunk_rows=3))
+    assert ids.tolist() == [10, 13] and skipped == 5
+    houses = [{'bedrooms': 3, 'sqft_living': 1800, 'zipcode': 98103},
+              {'bedrooms': 4, 'sqft_living': 2500, 'zipcode': 98052}]
+    np.testing.assert_allclose(
+        prices, entry.model.predict(entry.prepare_features_batch(houses)))
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import profiling
+from profiling import RequestProfiler, parse_networks
+
+
+def test_only_trusted_callers_force_profiling():
+    profiler = RequestProfiler(trusted_networks=parse_networks('10.0.0.0/8, 127.0.0.1'))
+    assert profiler.enabled
+    assert profiler.is_trusted('10.1.2.3') and profiler.is_trusted('127.0.0.1')
+    assert not profiler.is_trusted('192.168.0.1')
+    assert not profiler.is_trusted('not-an-address') and not profiler.is_trusted(None)
+    assert profiler.should_profile('10.1.2.3', '1')
+    assert not profiler.should_profile('10.1.2.3', None)
+    assert not profiler.should_profile('192.168.0.1', '1')
+
+
+def test_disabled_without_sampling_or_trusted_networks():
+    profiler = RequestProfiler()
+    assert not profiler.enabled
+    assert not profiler.is_trusted('127.0.0.1')
+
+
+def busy_request(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collapsed_stacks_of_a_profiled_thread():
+    profiler = RequestProfiler(interval_ms=1)
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_request, args=(stop,))
+    thread.start()
+    profiler.begin(thread.ident)
+    time.sleep(0.1)
+    profiler.end(thread.ident)
+    stop.set()
+    thread.join()
+
+    lines = profiler.collapsed().splitlines()
+    assert lines and profiler.profiled_requests == 1
+    stack, count = lines[0].rsplit(' ', 1)
+    assert stack.endswith('test_profiling.py:busy_request') and int(count) > 0
+    profiler.reset()
+    assert profiler.collapsed() == '' and profiler.profiled_requests == 0
+
+
+def test_new_stacks_beyond_the_limit_are_truncated(monkeypatch):
+    monkeypatch.setattr(profiling, 'MAX_STACKS', 0)
+    profiler = RequestProfiler(interval_ms=1)
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_request, args=(stop,))
+    thread.start()
+    profiler.begin(thread.ident)
+    time.sleep(0.05)
+    profiler.end(thread.ident)
+    stop.set()
+    thread.join()
+    assert set(profiler.stacks) == {profiling.TRUNCATED_STACK}
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas
+import pytest
+
+from conftest import DEMOGRAPHICS_CSV, MODEL_DIR, PROJECT_DIR
+from registry import ModelRegistry, parse_registry_spec
+from validation import ValidationError
+
+HOUSE = {'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000, 'floors': 1,
+         'sqft_above': 1800, 'sqft_basement': 0, 'zipcode': '98103'}
+
+
+def test_parse_registry_spec():
+    assert parse_registry_spec(' default=model, rich = model/rich ,') == \
+        [('default', 'model'), ('rich', 'model/rich')]
+    with pytest.raises(ValueError, match='Invalid MODEL_REGISTRY entry'):
+        parse_registry_spec('default')
+
+
+@pytest.fixture(scope='module')
+def models():
+    if not os.path.exists(os.path.join(MODEL_DIR, 'rich', 'model.pkl')):
+        pytest.skip("no model/rich; see the README")
+    models = ModelRegistry(PROJECT_DIR, DEMOGRAPHICS_CSV)
+    for name, model_dir in parse_registry_spec('default=model,rich=model/rich'):
+        models.load(name, model_dir)
+    return models
+
+
+def test_models_share_the_demographics_table(models):
+    assert models.default_name == 'default'
+    assert models.get() is models.get('default')
+    with pytest.raises(KeyError):
+        models.get('missing')
+    default, rich = models.get('default'), models.get('rich')
+    assert default.demographics is rich.demographics
+    assert len(models.demographics_tables) == 1
+    assert 'grade' in rich.simple_features and 'grade' not in default.simple_features
+
+
+def test_features_match_a_demographics_merge(models):
+    demographics = pandas.read_csv(DEMOGRAPHICS_CSV, dtype={'zipcode': str})
+    for name in ('default', 'rich'):
+        entry = models.get(name)
+        house = {**HOUSE, 'grade': 7, 'view': 0, 'sqft_living15': 1700}
+        merged = pandas.DataFrame([house]).merge(demographics, on='zipcode')
+        expected = merged[entry.model_features].to_numpy(dtype=np.float64)
+        np.testing.assert_array_equal(entry.prepare_features(house), expected)
+
+
+def test_unknown_zipcode_and_missing_simple_fields(models):
+    entry = models.get()
+    with pytest.raises(ValueError, match='Zipcode 10001 not found'):
+        entry.prepare_features({**HOUSE, 'zipcode': 10001})
+    with pytest.raises(ValidationError) as info:
+        entry.prepare_features({'zipcode': 98103}, simple=True)
+    assert info.value.errors['bedrooms'] == 'missing required field'
+
+
+def test_float32_model_gets_its_own_float32_demographics():
+    if not os.path.exists(os.path.join(MODEL_DIR, 'f32', 'model.pkl')):
+        pytest.skip("no model/f32; see the README")
+    models = ModelRegistry(PROJECT_DIR, DEMOGRAPHICS_CSV)
+    default = models.load('default', MODEL_DIR)
+    f32 = models.load('f32', os.path.join(MODEL_DIR, 'f32'))
+    assert f32.dtype == np.float32 and f32.demographics.values.dtype == np.float32
+    assert f32.demographics is not default.demographics
+    assert len(models.demographics_tables) == 2
+    features = f32.prepare_features(HOUSE)
+    assert features.dtype == np.float32
+    np.testing.assert_allclose(f32.model.predict(features),
+                               default.model.predict(default.prepare_features(HOUSE)),
+                               rtol=0.05)
@@ -0,0 +1,90 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from shadow import ComparisonStats, ShadowScorer, TrafficSplit, parse_weights
+
+HOUSE = {'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000, 'floors': 1,
+         'sqft_above': 1800, 'sqft_basement': 0, 'zipcode': 98103}
+
+
+def test_parse_weights_and_split_shares():
+    split = TrafficSplit(parse_weights('a=3, b=1'))
+    choices = [split.choose(str(i)) for i in range(4000)]
+    assert 0.7 < choices.count('a') / len(choices) < 0.8
+    with pytest.raises(ValueError):
+        TrafficSplit({'a': 0})
+
+
+def test_split_keys_are_sticky():
+    split = TrafficSplit({'a': 1, 'b': 1})
+    assert all(split.choose(f'user-{i}') == split.choose(f'user-{i}') for i in range(100))
+    assert TrafficSplit({'a': 1, 'b': 0}).choose('any') == 'a'
+
+
+def test_comparison_stats():
+    stats = ComparisonStats()
+    assert stats.summary() == {"count": 0}
+    stats.update([100.0, 200.0], [110.0, 180.0])
+    summary = stats.summary()
+    assert summary['count'] == 2 and summary['mean_diff'] == -5.0
+    assert summary['mean_abs_diff'] == 15.0 and summary['max_abs_diff'] == 20.0
+    assert summary['mean_abs_relative_diff'] == pytest.approx(0.1)
+
+
+class BlockingModel:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict(self, rows):
+        self.release.wait(5)
+        return np.full(len(rows), 1.0)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    model = BlockingModel()
+    candidate = SimpleNamespace(name='rich', version='v', model=model,
+                                prepare_features=lambda house, simple=False: np.zeros((1, 2)))
+    scorer = ShadowScorer(candidate, sample_rate=1, max_pending=2)
+    assert not scorer.maybe_submit('rich', HOUSE, 1.0)
+    assert scorer.maybe_submit('default', HOUSE, 1.0)
+    assert scorer.maybe_submit('default', HOUSE, 1.0)
+    assert not scorer.maybe_submit('default', HOUSE, 1.0)
+    model.release.set()
+    scorer._executor.shutdown(wait=True)
+    assert (scorer.submitted, scorer.dropped, scorer.failed) == (2, 1, 0)
+    assert scorer.stats.summary()['mean_diff'] == 0.0
+
+
+def assignments(app):
+    return sum(value for _, value in app.ab_assignments_total.samples())
+
+
+def test_ab_split_routes_only_prediction_requests(app):
+    client = app.app.test_client()
+    before = assignments(app)
+    for _ in range(20):
+        assert client.get('/features').get_json()['model'] == 'default'
+    assert client.get('/models').status_code == 200
+    assert assignments(app) == before
+
+    seen = set()
+    for i in range(20):
+        key = f'user-{i}'
+        response = client.post('/predict', json=HOUSE, headers={'X-Split-Key': key})
+        assert response.status_code == 200
+        assert response.get_json()['model'] == app.traffic_split.choose(key)
+        seen.add(response.get_json()['model'])
+    assert seen == {'default', 'rich'}
+    assert assignments(app) == before + 20
+
+
+def test_requested_model_bypasses_the_split(app):
+    client = app.app.test_client()
+    before = assignments(app)
+    response = client.post('/predict', json=HOUSE, headers={'X-Model-Name': 'rich'})
+    assert response.get_json()['model'] == 'rich'
+    assert client.post('/models/default/predict', json=HOUSE).get_json()['model'] == 'default'
+    assert assignments(app) == before
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+WAIT = 5
+
+
+def blocked_leader(flight, key, release, result=None, error=None):
+    """Start a leader thread whose call blocks until `release` is set."""
+    started = threading.Event()
+    outcome = {}
+
+    def compute():
+        started.set()
+        assert release.wait(WAIT)
+        if error is not None:
+            raise error
+        return result
+
+    def run():
+        try:
+            outcome['value'] = flight.do(key, compute)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(WAIT)
+    return thread, outcome
+
+
+def wait_for_followers(flight, count):
+    # Followers register before blocking on the leader's future
+    for _ in range(WAIT * 1000):
+        if flight.followers >= count:
+            return
+        time.sleep(0.001)
+    raise AssertionError(f"{flight.followers} followers joined, expected {count}")
+
+
+def test_single_caller_is_leader():
+    flight = SingleFlight()
+    assert flight.do('k', lambda: 42) == (42, False)
+    assert (flight.leaders, flight.followers, flight.in_flight) == (1, 0, 0)
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    leader, outcome = blocked_leader(flight, 'k', release, result='price')
+    with ThreadPoolExecutor(4) as pool:
+        followers = [pool.submit(flight.do, 'k', lambda: calls.append(1)) for _ in range(4)]
+        wait_for_followers(flight, 4)
+        assert flight.in_flight == 1
+        release.set()
+        results = [f.result(WAIT) for f in followers]
+    leader.join(WAIT)
+    assert outcome['value'] == ('price', False)
+    assert results == [('price', True)] * 4
+    # Only the leader computed
+    assert calls == []
+    assert (flight.leaders, flight.followers, flight.in_flight) == (1, 4, 0)
+    assert flight.collapse_ratio == pytest.approx(0.8)
+
+
+def test_different_keys_do_not_collapse():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader, _ = blocked_leader(flight, 'a', release, result=1)
+    assert flight.do('b', lambda: 2) == (2, False)
+    release.set()
+    leader.join(WAIT)
+    assert (flight.leaders, flight.followers) == (2, 0)
+
+
+def test_leader_error_propagates_to_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+    error = ValueError("bad row")
+    leader, outcome = blocked_leader(flight, 'k', release, error=error)
+    with ThreadPoolExecutor(2) as pool:
+        followers = [pool.submit(flight.do, 'k', lambda: 'unused') for _ in range(2)]
+        wait_for_followers(flight, 2)
+        release.set()
+        for future in followers:
+            with pytest.raises(ValueError, match="bad row"):
+                future.result(WAIT)
+    leader.join(WAIT)
+    assert outcome['error'] is error
+
+
+def test_key_is_released_after_an_error():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do('k', fail)
+    assert flight.in_flight == 0
+    assert flight.do('k', lambda: 'retried') == ('retried', False)
+
+
+def test_nothing_is_cached_after_completion():
+    flight = SingleFlight()
+    assert flight.do('k', lambda: 1) == (1, False)
+    assert flight.do('k', lambda: 2) == (2, False)
+    assert flight.followers == 0
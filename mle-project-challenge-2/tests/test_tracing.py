@@ -0,0 +1,72 @@
+import json
+import logging
+
+import pytest
+
+from tracing import JsonFormatter, Tracer
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(JsonFormatter().format(record)))
+
+
+@pytest.fixture
+def make_tracer(request):
+    def make(**options):
+        tracer = Tracer(logger_name=f"test.{request.node.name}", **options)
+        records = Records()
+        tracer.logger.addHandler(records)
+        return tracer, records.lines
+    return make
+
+
+def test_unsampled_requests_are_not_logged_but_5xx_are(make_tracer):
+    tracer, lines = make_tracer(log_sample_rate=0)
+    tracer.finish(tracer.start(), 'POST', '/predict', 200)
+    tracer.finish(tracer.start('abc'), 'POST', '/predict', 503)
+    assert len(lines) == 1
+    assert lines[0]['level'] == 'WARNING'
+    assert (lines[0]['request_id'], lines[0]['status']) == ('abc', 503)
+
+
+def test_spans_are_logged_and_formatted_as_server_timing(make_tracer):
+    tracer, lines = make_tracer()
+    trace = tracer.start()
+    with trace.span('parse'):
+        pass
+    with trace.span('parse'):
+        pass
+    tracer.finish(trace, 'GET', '/health', 200)
+    assert list(lines[0]['spans_ms']) == ['parse']
+    assert trace.server_timing().startswith('parse;dur=')
+    assert ', total;dur=' in trace.server_timing()
+
+
+def test_exceptions_are_logged_once_with_their_stack(make_tracer):
+    tracer, lines = make_tracer(log_sample_rate=0)
+    trace = tracer.start()
+    try:
+        raise KeyError('zipcode')
+    except KeyError as e:
+        tracer.log_exception(trace, 'POST', '/predict', e)
+    tracer.finish(trace, 'POST', '/predict', 500)
+    assert len(lines) == 1
+    assert lines[0]['message'] == "KeyError: 'zipcode'"
+    assert 'Traceback' in lines[0]['exception']
+
+
+def test_error_logs_are_capped_and_suppressed_ones_reported(make_tracer, monkeypatch):
+    tracer, lines = make_tracer(error_logs_per_sec=2)
+    now = [1000.0]
+    monkeypatch.setattr('tracing.time.time', lambda: now[0])
+    for _ in range(5):
+        tracer.finish(tracer.start(), 'POST', '/predict', 503)
+    assert len(lines) == 2
+    now[0] += 1
+    tracer.finish(tracer.start(), 'POST', '/predict', 503)
+    assert len(lines) == 3 and lines[2]['errors_suppressed'] == 3
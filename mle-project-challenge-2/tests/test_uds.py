@@ -0,0 +1,192 @@
+import io
+import json
+import socket
+
+import numpy as np
+import pytest
+
+import uds
+from uds import (BinaryPredictionService, COUNT, FRAME, OP_PREDICT, OP_SCHEMA,
+                 PREDICT_HEADER, ProtocolError, REQUEST_HEADER, STATUS_BAD_REQUEST,
+                 STATUS_OK, UnixSocketServer, VERSION, frame, read_frame)
+from uds_client import PriceClient, PriceServiceError
+from validation import ValidationError, describe_row
+
+HOUSE = {'bedrooms': 3, 'bathrooms': 2, 'sqft_living': 1800, 'sqft_lot': 5000,
+         'floors': 1, 'sqft_above': 1800, 'sqft_basement': 0, 'zipcode': 98103}
+
+
+def request(op, payload=b'', model=b'', version=VERSION):
+    return REQUEST_HEADER.pack(version, op, len(model)) + model + payload
+
+
+def predict_request(rows):
+    rows = np.ascontiguousarray(rows, dtype='<f8')
+    return request(OP_PREDICT, PREDICT_HEADER.pack(*rows.shape) + rows.tobytes())
+
+
+def test_frames_round_trip():
+    stream = io.BytesIO(frame(b'first') + frame(b'') + frame(b'third'))
+    assert [read_frame(stream) for _ in range(3)] == [b'first', b'', b'third']
+    assert read_frame(stream) is None
+
+
+def test_frame_header_is_little_endian_length():
+    assert frame(b'abc') == b'\x03\x00\x00\x00abc'
+
+
+@pytest.mark.parametrize('data', [b'\x05', b'\x05\x00\x00'])
+def test_truncated_header(data):
+    with pytest.raises(EOFError, match="frame header"):
+        read_frame(io.BytesIO(data))
+
+
+def test_truncated_body():
+    with pytest.raises(EOFError, match="inside a frame"):
+        read_frame(io.BytesIO(FRAME.pack(10) + b'short'))
+
+
+def test_oversized_frame_is_rejected_before_reading(monkeypatch):
+    monkeypatch.setattr(uds, 'MAX_FRAME_BYTES', 8)
+    stream = io.BytesIO(FRAME.pack(9) + b'123456789')
+    with pytest.raises(ProtocolError, match="9 bytes exceeds 8"):
+        read_frame(stream)
+    assert stream.tell() == FRAME.size
+    assert read_frame(io.BytesIO(frame(b'12345678'))) == b'12345678'
+
+
+@pytest.fixture(scope='module')
+def service(registry):
+    return BinaryPredictionService(registry, max_rows=4)
+
+
+@pytest.fixture(scope='module')
+def columns(service):
+    status, payload = service.handle(request(OP_SCHEMA))
+    assert status == STATUS_OK
+    return json.loads(payload)['columns']
+
+
+def rows_of(columns, *houses):
+    return np.array([[float(h.get(c, np.nan)) for c in columns] for h in houses])
+
+
+def test_schema(service, registry, columns):
+    entry = registry.get()
+    schema = json.loads(service.handle(request(OP_SCHEMA))[1])
+    assert schema == {"model": "default", "model_version": entry.version,
+                      "columns": entry.feature_plan.house_fields + ['zipcode'],
+                      "max_rows": 4}
+
+
+def test_predict_matches_the_model(service, registry, columns):
+    houses = [HOUSE, {**HOUSE, 'sqft_living': 2500, 'zipcode': 98052}]
+    status, payload = service.handle(predict_request(rows_of(columns, *houses)))
+    assert status == STATUS_OK
+    (count,) = COUNT.unpack_from(payload)
+    prices = np.frombuffer(payload, dtype='<f8', count=count, offset=COUNT.size)
+    entry = registry.get()
+    expected = entry.model.predict(entry.prepare_features_batch(houses))
+    np.testing.assert_allclose(prices, expected)
+
+
+def test_nan_house_fields_default_to_zero(service, registry, columns):
+    rows = rows_of(columns, {'sqft_living': 1800, 'zipcode': 98103})
+    payload = service.handle(predict_request(rows))[1]
+    entry = registry.get()
+    expected = entry.model.predict(entry.prepare_features_batch(
+        [{'sqft_living': 1800, 'zipcode': 98103}]))
+    assert np.frombuffer(payload, dtype='<f8', offset=COUNT.size)[0] == \
+        pytest.approx(expected[0])
+
+
+def bad_request(service, body):
+    status, payload = service.handle(body)
+    assert status == STATUS_BAD_REQUEST
+    return payload.decode()
+
+
+def test_malformed_requests(service, columns):
+    good = rows_of(columns, HOUSE)
+    assert bad_request(service, b'\x01') == "truncated request header"
+    assert bad_request(service, request(OP_SCHEMA, version=2)) == \
+        "unsupported protocol version 2"
+    assert bad_request(service, request(9)) == "unknown op 9"
+    assert bad_request(service, request(OP_SCHEMA, model=b'nope')) == "Unknown model: nope"
+    assert bad_request(service, request(OP_PREDICT, b'\x01\x00')) == \
+        "truncated predict header"
+    assert bad_request(service, predict_request(good[:, 1:])).endswith(
+        f"expects {len(columns)} columns, got {len(columns) - 1}")
+    assert bad_request(service, predict_request(good)[:-8]) == \
+        "row data does not match the row and column counts"
+    assert bad_request(service, predict_request(np.repeat(good, 5, axis=0))) == \
+        "row count must be between 1 and 4"
+
+
+def test_invalid_rows(service, columns):
+    bad_zipcode = rows_of(columns, HOUSE, {**HOUSE, 'zipcode': 98103.5})
+    assert bad_request(service, predict_request(bad_zipcode)) == \
+        "row 1: zipcode: not a 5-digit zipcode: 98103.5"
+    unknown = rows_of(columns, {**HOUSE, 'zipcode': 10001}, {'sqft_living': 900})
+    assert bad_request(service, predict_request(unknown)) == \
+        "row 0: zipcode: Zipcode 10001 not found in demographics data; " \
+        "row 1: zipcode: missing required field"
+    infinite = rows_of(columns, {**HOUSE, 'sqft_living': np.inf})
+    assert bad_request(service, predict_request(infinite)) == \
+        "row 0: sqft_living: not a finite number: inf"
+
+
+def test_rows_are_validated_like_predict_batch(service, registry, columns):
+    # Errors of the JSON batch path and of the binary rows name the same fields
+    entry = registry.get()
+    houses = [{**HOUSE, 'zipcode': 10001}, {'sqft_living': 900}]
+    with pytest.raises(ValidationError) as info:
+        entry.prepare_features_batch(houses)
+    message = bad_request(service, predict_request(rows_of(columns, *houses)))
+    assert message == '; '.join(f"row {i}: {describe_row(info.value.errors[i])}"
+                                for i in sorted(info.value.errors))
+
+
+def test_counts_responses_by_status(registry):
+    service = BinaryPredictionService(registry)
+    service.handle(request(OP_SCHEMA))
+    service.handle(b'')
+    assert service.responses[STATUS_OK] == 1
+    assert service.responses[STATUS_BAD_REQUEST] == 1
+
+
+@pytest.fixture
+def server(service, tmp_path):
+    path = str(tmp_path / 'api.sock')
+    server = UnixSocketServer(service, path)
+    server.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_over_socket(server, registry):
+    with PriceClient(server) as client:
+        assert client.columns[-1] == 'zipcode'
+        prices = client.predict([HOUSE, HOUSE])
+        entry = registry.get()
+        np.testing.assert_allclose(
+            prices, entry.model.predict(entry.prepare_features_batch([HOUSE, HOUSE])))
+        with pytest.raises(PriceServiceError, match="not found") as info:
+            client.predict([{**HOUSE, 'zipcode': 10001}])
+        assert not info.value.retryable
+        # The connection stays usable after an error
+        assert len(client.predict([HOUSE])) == 1
+
+
+def test_oversized_frame_over_socket_closes_connection(server, monkeypatch):
+    monkeypatch.setattr(uds, 'MAX_FRAME_BYTES', 64)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    sock.connect(server)
+    with sock, sock.makefile('rb') as stream:
+        sock.sendall(FRAME.pack(65))
+        response = read_frame(stream)
+        assert response[0] == STATUS_BAD_REQUEST
+        assert b"exceeds 64" in response
+        assert read_frame(stream) is None
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from validation import MISSING, RequestSchema, ValidationError, validate_location
+
+FIELDS = ['bedrooms', 'bathrooms', 'sqft_living']
+HOUSE = {'bedrooms': 3, 'bathrooms': '2.5', 'sqft_living': 1800, 'zipcode': '98103'}
+
+
+@pytest.fixture
+def schema():
+    return RequestSchema(FIELDS, required=['sqft_living'])
+
+
+def errors_of(call, *args):
+    with pytest.raises(ValidationError) as info:
+        call(*args)
+    return info.value
+
+
+def test_validate_coerces_numbers_and_zipcode(schema):
+    assert schema.validate(HOUSE) == ([3.0, 2.5, 1800.0], 98103)
+
+
+def test_optional_fields_default_to_zero(schema):
+    assert schema.validate({'sqft_living': 900, 'zipcode': 98103.0}) == \
+        ([0.0, 0.0, 900.0], 98103)
+
+
+def test_missing_required_fields(schema):
+    error = errors_of(schema.validate, {'bedrooms': 3})
+    assert error.errors == {'sqft_living': MISSING, 'zipcode': MISSING}
+    assert str(error) == "Missing required features: ['sqft_living', 'zipcode']"
+
+
+@pytest.mark.parametrize('value, message', [
+    ('three', "not a number: 'three'"),
+    ([3], "expected a number, got list"),
+    (True, "expected a number, got bool"),
+    (float('inf'), "not a finite number: inf"),
+    ('nan', "not a finite number: 'nan'"),
+])
+def test_invalid_field_messages(schema, value, message):
+    error = errors_of(schema.validate, {**HOUSE, 'bedrooms': value})
+    assert error.errors == {'bedrooms': message}
+    assert str(error) == "Invalid request fields: ['bedrooms']"
+
+
+@pytest.mark.parametrize('zipcode', ['9810x', 98103.5, -1, 100000, 'abc'])
+def test_invalid_zipcode(schema, zipcode):
+    error = errors_of(schema.validate, {**HOUSE, 'zipcode': zipcode})
+    assert list(error.errors) == ['zipcode']
+
+
+def test_body_must_be_an_object(schema):
+    assert errors_of(schema.validate, [HOUSE]).errors == {'body': "expected a JSON object"}
+    assert errors_of(schema.validate_batch, HOUSE).errors == \
+        {'body': "expected a list of JSON objects"}
+
+
+def test_validate_batch_matches_single_rows(schema):
+    records = [HOUSE, {'sqft_living': '900', 'zipcode': 98052}]
+    matrix, zipcodes = schema.validate_batch(records)
+    assert matrix.dtype == np.float64
+    assert matrix.tolist() == [schema.validate(r)[0] for r in records]
+    assert zipcodes.tolist() == [98103, 98052]
+
+
+def test_validate_batch_errors_by_row_and_field(schema):
+    records = [HOUSE,
+               {'bedrooms': 'x', 'sqft_living': 1000, 'zipcode': '98103'},
+               {'bedrooms': True, 'zipcode': '98103'},
+               {'sqft_living': 1000, 'zipcode': 98103.5}]
+    error = errors_of(schema.validate_batch, records)
+    assert error.errors == {
+        1: {'bedrooms': "not a number: 'x'"},
+        2: {'bedrooms': "expected a number, got bool", 'sqft_living': MISSING},
+        3: {'zipcode': "not a 5-digit zipcode: 98103.5"},
+    }
+    assert str(error) == "Invalid rows: [1, 2, 3]"
+
+
+def test_validate_batch_reports_missing_zipcode_once(schema):
+    error = errors_of(schema.validate_batch, [{'sqft_living': 1000}])
+    assert error.errors == {0: {'zipcode': MISSING}}
+
+
+def test_validate_location():
+    assert validate_location({'lat': '47.6', 'long': -122.3}) == (47.6, -122.3)
+    error = errors_of(validate_location, {'lat': 91})
+    assert error.errors == {'lat': "out of range: 91", 'long': MISSING}
+
+
+def test_validate_columns_matches_validate_batch(schema):
+    nan = np.nan
+    errors = {}
+    matrix, zipcodes = schema.validate_columns(
+        np.array([[3, 2.5, 1800], [nan, nan, 900], [1, 1, nan], [np.inf, 1, 1]]),
+        np.array([98103, 98052.0, 98103, nan]), errors)
+    assert matrix.tolist()[:2] == [[3.0, 2.5, 1800.0], [0.0, 0.0, 900.0]]
+    assert zipcodes.tolist() == [98103, 98052, 98103, 0]
+    assert errors == {2: {'sqft_living': MISSING},
+                      3: {'bedrooms': "not a finite number: inf", 'zipcode': MISSING}}
+
+
+def test_validate_columns_keeps_parse_errors(schema):
+    errors = {0: {'bedrooms': "not a number: 'x'"}}
+    schema.validate_columns(np.array([[0.0, 1, 1]]), np.array([98103.5]), errors)
+    assert errors == {0: {'bedrooms': "not a number: 'x'",
+                          'zipcode': "not a 5-digit zipcode: 98103.5"}}
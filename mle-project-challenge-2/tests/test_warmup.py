@@ -0,0 +1,55 @@
+import numpy as np
+
+from warmup import SYNTHETIC_RANGES, Warmup, synthetic_houses
+
+
+def test_synthetic_houses_are_valid_requests():
+    houses = synthetic_houses(50, [98103, 98052])
+    assert houses == synthetic_houses(50, [98052, 98103])
+    for house in houses:
+        assert house['zipcode'] in (98103, 98052)
+        assert house['sqft_above'] + house['sqft_basement'] == house['sqft_living']
+        low, high = SYNTHETIC_RANGES['bedrooms']
+        assert low <= house['bedrooms'] <= high
+
+
+class CountingModel:
+    def __init__(self):
+        self.rows = []
+
+    def predict(self, features):
+        self.rows.append(len(features))
+        return np.zeros(len(features))
+
+
+def prepare_features(house):
+    return np.array([[house['bedrooms'], house['sqft_living']]], dtype=float)
+
+
+def test_run_warms_batches_then_single_rows_and_reports_ready():
+    warmup = Warmup(max_rounds=30, window=5, tolerance=10.0, batch_size=8, batch_rounds=2)
+    model = CountingModel()
+    assert not warmup.ready
+    report = warmup.run({'default': (prepare_features, model)}, [98103])
+    assert warmup.ready and report['status'] == 'complete'
+    # Any two windows are within a 1000% tolerance: stable after the second
+    assert report['stabilized'] and report['models']['default']['rounds'] == 10
+    assert model.rows == [8, 8] + [1] * 10
+
+
+def test_unstable_latency_still_reports_ready_after_max_rounds():
+    warmup = Warmup(max_rounds=12, window=5, tolerance=-1, batch_size=4, batch_rounds=1)
+    report = warmup.run({'default': (prepare_features, CountingModel())}, [98103])
+    assert warmup.ready and not report['stabilized']
+    assert report['models']['default']['rounds'] == 12
+
+
+def test_failing_model_keeps_the_pod_not_ready():
+    class Broken:
+        def predict(self, features):
+            raise RuntimeError("bad artifact")
+
+    warmup = Warmup(max_rounds=5, window=5)
+    warmup.start({'default': (prepare_features, Broken())}, [98103]).join()
+    assert not warmup.ready
+    assert warmup.report == {"status": "failed", "error": "bad artifact"}